@@ -0,0 +1,326 @@
+import random
+import time
+from datetime import date, datetime, timedelta, time as time_of_day
+
+import pytz
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Avg
+
+from challenges.models import GroupChallenge, Level, LevelGroup, UNIT_STEPS
+from fitness.models import ActivityByDay, ActivityByMinute, BULK_BATCH_SIZE
+from people.models import Person, Group
+
+# CONSTANTS
+DEFAULT_NUM_PEOPLE = 40  # type: int
+DEFAULT_NUM_DAYS = 365  # type: int
+DEFAULT_NUM_MINUTE_DAYS = 7  # type: int
+DEFAULT_NUM_CHALLENGES = 52  # type: int
+DEFAULT_REPEAT = 50  # type: int
+GROUP_SIZE = 4  # type: int
+MINUTES_PER_DAY = 24 * 60  # type: int
+BENCHMARK_NAME = "Query benchmark"
+BENCHMARK_LAST_DATE = date(2017, 12, 31)  # type: date
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+ANALYZE_STATEMENTS = {
+    "mysql": "ANALYZE TABLE {0}",
+    "postgresql": "ANALYZE {0}",
+    "sqlite": "ANALYZE {0}",
+}
+INDEXED_MODELS = (ActivityByDay, GroupChallenge)
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic People, Groups, activities and challenges, then " \
+           "print the EXPLAIN plan and the mean time of each hot query, " \
+           "first without the composite indexes of ActivityByDay and " \
+           "GroupChallenge and then with them. The indexes are dropped " \
+           "for the first run, so use a copy of the database. The seeded " \
+           "rows are deleted afterwards unless --keep is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--people", type=int, default=DEFAULT_NUM_PEOPLE,
+                            help="Number of synthetic People, in groups of "
+                                 "%d" % GROUP_SIZE)
+        parser.add_argument("--days", type=int, default=DEFAULT_NUM_DAYS,
+                            help="Days of ActivityByDay per Person")
+        parser.add_argument("--minute-days", type=int,
+                            default=DEFAULT_NUM_MINUTE_DAYS,
+                            help="Days of ActivityByMinute per Person")
+        parser.add_argument("--challenges", type=int,
+                            default=DEFAULT_NUM_CHALLENGES,
+                            help="Number of weekly challenges per Group")
+        parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                            help="Number of times each query is timed")
+        parser.add_argument("--after-only", action="store_true",
+                            help="Keep the indexes and only run the "
+                                 "queries once")
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the seeded rows")
+
+    def handle(self, *args, **options):
+        start = time.time()
+        person_ids, group_ids, level = self.__seed(options)
+        self.stdout.write("Seeded in %.1f s" % (time.time() - start))
+        queries = get_hot_queries(person_ids, group_ids, options)
+
+        try:
+            analyze_tables()
+            if not options["after_only"]:
+                indexes = [(model, index) for model in INDEXED_MODELS
+                           for index in model._meta.indexes]
+                with connection.schema_editor() as editor:
+                    for model, index in indexes:
+                        editor.remove_index(model, index)
+                try:
+                    analyze_tables()
+                    self.__run("Before", queries, options["repeat"])
+                finally:
+                    with connection.schema_editor() as editor:
+                        for model, index in indexes:
+                            editor.add_index(model, index)
+                    analyze_tables()
+            self.__run("After", queries, options["repeat"])
+        finally:
+            if not options["keep"]:
+                ActivityByMinute.objects \
+                    .filter(person_id__in=person_ids).delete()
+                Group.objects.filter(id__in=list(group_ids)).delete()
+                Person.objects.filter(id__in=person_ids).delete()
+                level.group.delete()
+
+    def __run(self, name, queries, repeat):
+        # type: (str, list(tuple), int) -> None
+        self.stdout.write("%s (%s)" % (name, connection.vendor))
+        for query_name, get_queryset in queries:
+            rng = random.Random(query_name)
+            querysets = [get_queryset(rng) for _ in range(repeat)]
+            self.stdout.write("  %s" % query_name)
+            for row in explain(querysets[0]):
+                self.stdout.write("    %s" % " | ".join(
+                    str(value) for value in row))
+
+            start = time.time()
+            for queryset in querysets:
+                list(queryset)
+            self.stdout.write("    %.3f ms" % (
+                (time.time() - start) * 1000 / repeat))
+
+    @staticmethod
+    def __seed(options):
+        # type: (dict) -> tuple
+        """
+        :return: a tuple of (list of Person ids, dict of Group id to the
+        Person ids of its members, the Level of the challenges)
+        """
+        persons = [Person.objects.create(name="%s %d" % (BENCHMARK_NAME, i),
+                                         internal_name=BENCHMARK_NAME,
+                                         birth_date=date(2000, 1, 1))
+                   for i in range(options["people"])]
+        person_ids = [person.id for person in persons]
+        for person_id in person_ids:
+            ActivityByDay.objects.bulk_create(
+                [get_synthetic_day(person_id, activity_date)
+                 for activity_date in get_dates(options["days"])],
+                batch_size=BULK_BATCH_SIZE)
+            for activity_date in get_dates(options["minute_days"]):
+                ActivityByMinute.objects.bulk_create(
+                    [get_synthetic_minute(person_id, activity_date, minute)
+                     for minute in range(MINUTES_PER_DAY)],
+                    batch_size=BULK_BATCH_SIZE)
+
+        level = Level.objects.create(
+            order=1, name=BENCHMARK_NAME,
+            group=LevelGroup.objects.create(name=BENCHMARK_NAME[:32]),
+            goal=5000, unit=UNIT_STEPS, unit_duration="1d",
+            total_duration="7d", subgoal_1=5000, subgoal_2=7500,
+            subgoal_3=10000)
+        group_ids = dict()  # type: dict
+        for i in range(0, len(person_ids), GROUP_SIZE):
+            group = Group.objects.create(name="%s %d" % (BENCHMARK_NAME, i))
+            group_ids[group.id] = person_ids[i:i + GROUP_SIZE]
+            GroupChallenge.objects.bulk_create(
+                [get_synthetic_challenge(group.id, level, week,
+                                         options["challenges"])
+                 for week in range(options["challenges"])],
+                batch_size=BULK_BATCH_SIZE)
+        return person_ids, group_ids, level
+
+
+# HELPER METHODS
+def get_hot_queries(person_ids, group_ids, options):
+    # type: (list(int), dict, dict) -> list(tuple)
+    """
+    :return: a list of (name, function of a Random to a QuerySet) of the
+    queries that the endpoints and the syncs run the most, written like
+    they are in fitness.models and challenges.models
+    """
+    days = options["days"]
+    minute_days = options["minute_days"]
+    now = datetime.combine(BENCHMARK_LAST_DATE, time_of_day(12)) \
+        .replace(tzinfo=pytz.utc)
+
+    def get_start_date(rng, num_days, window_days):
+        return BENCHMARK_LAST_DATE - timedelta(
+            days=rng.randint(window_days - 1, max(window_days, num_days) - 1))
+
+    def get_person_days(rng):
+        start_date = get_start_date(rng, days, 7)
+        return ActivityByDay.objects \
+            .filter(date__gte=start_date) \
+            .filter(date__lte=start_date + timedelta(days=7)) \
+            .filter(person_id__exact=rng.choice(person_ids)) \
+            .order_by("date") \
+            .only("date", "steps", "calories", "distance")
+
+    def get_group_days(rng):
+        start_date = get_start_date(rng, days, 7)
+        return ActivityByDay.objects \
+            .filter(date__gte=start_date) \
+            .filter(date__lte=start_date + timedelta(days=7)) \
+            .filter(person_id__in=group_ids[rng.choice(list(group_ids))]) \
+            .order_by("person_id", "date") \
+            .only("person_id", "date", "steps", "calories", "distance")
+
+    def get_changed_days(rng):
+        start_date = get_start_date(rng, days, 2)
+        return ActivityByDay.objects \
+            .filter(person_id=rng.choice(person_ids),
+                    date__in=[start_date, start_date + timedelta(days=1)]) \
+            .values_list("date", "steps", "calories", "active_minutes",
+                         "distance")
+
+    def get_week_average(rng):
+        start_date = get_start_date(rng, days, 7)
+        return ActivityByDay.objects \
+            .filter(person_id=rng.choice(person_ids),
+                    date__gte=start_date,
+                    date__lt=start_date + timedelta(days=7)) \
+            .values("person_id") \
+            .annotate(steps=Avg("steps"), calories=Avg("calories"),
+                      active_minutes=Avg("active_minutes"),
+                      distance=Avg("distance")) \
+            .order_by()
+
+    def get_day_minutes(rng):
+        activity_date = get_start_date(rng, minute_days, 1)
+        return ActivityByMinute.objects \
+            .filter(person_id=rng.choice(person_ids), date=activity_date) \
+            .order_by("time")
+
+    def get_upserted_minutes(rng):
+        activity_date = get_start_date(rng, minute_days, 1)
+        start_minute = rng.randint(0, MINUTES_PER_DAY - 61)
+        return ActivityByMinute.objects \
+            .filter(person_id=rng.choice(person_ids),
+                    date=activity_date,
+                    time__gte=get_time(start_minute),
+                    time__lte=get_time(start_minute + 60)) \
+            .values_list("id")
+
+    def get_running_challenge(rng):
+        return GroupChallenge.objects \
+            .filter(group=rng.choice(list(group_ids)),
+                    end_datetime__gte=now,
+                    completed_datetime__isnull=True)[:1]
+
+    def get_passed_challenge(rng):
+        return GroupChallenge.objects \
+            .filter(group=rng.choice(list(group_ids)),
+                    end_datetime__lt=now,
+                    completed_datetime__isnull=True)[:1]
+
+    def get_latest_challenge(rng):
+        return GroupChallenge.objects \
+            .filter(group=rng.choice(list(group_ids))) \
+            .order_by("-end_datetime")[:1]
+
+    return [
+        ("Person's days", get_person_days),
+        ("Group's days", get_group_days),
+        ("Changed days", get_changed_days),
+        ("7-day average", get_week_average),
+        ("Minutes of a day", get_day_minutes),
+        ("Minutes to upsert", get_upserted_minutes),
+        ("Running challenge", get_running_challenge),
+        ("Passed challenge", get_passed_challenge),
+        ("Latest challenge", get_latest_challenge),
+    ]
+
+
+def explain(queryset):
+    # type: (QuerySet) -> list(tuple)
+    """
+    :return: the rows of the database's plan of *queryset*
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(EXPLAIN_PREFIXES.get(connection.vendor, "EXPLAIN ")
+                       + sql, params)
+        return cursor.fetchall()
+
+
+def analyze_tables():
+    # type: () -> None
+    """
+    Refresh the statistics that the planner chooses the indexes with
+    """
+    statement = ANALYZE_STATEMENTS.get(connection.vendor)
+    if statement is None:
+        return
+    with connection.cursor() as cursor:
+        for model in INDEXED_MODELS + (ActivityByMinute,):
+            cursor.execute(statement.format(
+                connection.ops.quote_name(model._meta.db_table)))
+            if connection.vendor == "mysql":
+                cursor.fetchall()
+
+
+def get_dates(num_days):
+    # type: (int) -> list(date)
+    return [BENCHMARK_LAST_DATE - timedelta(days=day)
+            for day in range(num_days)]
+
+
+def get_time(minute):
+    # type: (int) -> time_of_day
+    return time_of_day(minute // 60, minute % 60)
+
+
+def get_synthetic_day(person_id, activity_date):
+    # type: (int, date) -> ActivityByDay
+    return ActivityByDay(date=activity_date, person_id=person_id,
+                         steps=random.randint(0, 20000),
+                         calories=random.uniform(1500, 3000),
+                         active_minutes=random.randint(0, 120),
+                         distance=random.uniform(0, 10))
+
+
+def get_synthetic_minute(person_id, activity_date, minute):
+    # type: (int, date, int) -> ActivityByMinute
+    steps = random.randint(0, 120) if 7 * 60 <= minute < 22 * 60 else 0
+    return ActivityByMinute(date=activity_date, time=get_time(minute),
+                            person_id=person_id, steps=steps,
+                            calories=1.0 + steps / 100.0,
+                            level=min(steps // 40, 3),
+                            distance=steps * 0.0007)
+
+
+def get_synthetic_challenge(group_id, level, week, num_challenges):
+    # type: (int, Level, int, int) -> GroupChallenge
+    """
+    :return: the challenge of the *week*, counting from the oldest. All but
+    the last one are completed.
+    """
+    start_datetime = datetime.combine(
+        BENCHMARK_LAST_DATE - timedelta(weeks=num_challenges - week - 1,
+                                        days=3),
+        time_of_day(4)).replace(tzinfo=pytz.utc)
+    end_datetime = start_datetime + timedelta(days=7, seconds=-1)
+    is_last = week == num_challenges - 1
+    return GroupChallenge(
+        group_id=group_id, duration="7d", start_datetime=start_datetime,
+        end_datetime=end_datetime, level=level,
+        completed_datetime=None if is_last else end_datetime)
@@ -0,0 +1,170 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import pytz
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.settings import api_settings
+
+from challenges.serializers import ChallengeViewModelSerializer, \
+    FAST_CHALLENGE_VIEW_MODEL_SERIALIZER
+from fitness.models import ActivityByDay, PersonFitness, GroupFitness
+from fitness.serializers import GroupFitnessSerializer, \
+    FAST_GROUP_FITNESS_SERIALIZER
+from people.models import Person, Group
+from story_manager.models import Story, GroupStory, GroupStoryList
+from story_manager.serializers import GroupStoryListSerializer, \
+    FAST_GROUP_STORY_LIST_SERIALIZER
+
+# CONSTANTS
+DEFAULT_REPEAT = 200  # type: int
+DEFAULT_NUM_MEMBERS = 6  # type: int
+DEFAULT_NUM_DAYS = 7  # type: int
+DEFAULT_NUM_STORIES = 20  # type: int
+BENCHMARK_START_DATE = date(2017, 5, 1)  # type: date
+
+
+class Command(BaseCommand):
+    help = "Time the DRF serializers of the group activities, challenges " \
+           "and stories against their fast paths on synthetic payloads, " \
+           "rendering both with the default renderer, and check that they " \
+           "produce the same bytes. Nothing is saved."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                            help="Number of payloads to serialize with "
+                                 "each path")
+        parser.add_argument("--members", type=int,
+                            default=DEFAULT_NUM_MEMBERS,
+                            help="Number of members in the group")
+        parser.add_argument("--days", type=int, default=DEFAULT_NUM_DAYS,
+                            help="Number of days of activities")
+
+    def handle(self, *args, **options):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        repeat = options["repeat"]
+        payloads = [
+            ("Group activities", GroupFitnessSerializer,
+             FAST_GROUP_FITNESS_SERIALIZER, get_synthetic_group_fitness(
+                 options["members"], options["days"])),
+            ("Challenges", ChallengeViewModelSerializer,
+             FAST_CHALLENGE_VIEW_MODEL_SERIALIZER,
+             get_synthetic_challenge_view_model(
+                 options["members"], options["days"])),
+            ("Stories", GroupStoryListSerializer,
+             FAST_GROUP_STORY_LIST_SERIALIZER,
+             get_synthetic_group_story_list(DEFAULT_NUM_STORIES)),
+        ]
+
+        self.stdout.write("Renderer: %s" % renderer.__class__.__name__)
+        for name, serializer_class, fast_serializer, instance in payloads:
+            drf_json = renderer.render(serializer_class(instance).data)
+            fast_json = renderer.render(
+                fast_serializer.to_representation(instance))
+            if drf_json != fast_json:
+                raise CommandError("%s: the fast path renders different "
+                                   "JSON" % name)
+
+            before = self.__time(repeat, lambda: renderer.render(
+                serializer_class(instance).data))
+            after = self.__time(repeat, lambda: renderer.render(
+                fast_serializer.to_representation(instance)))
+            self.stdout.write("%s (%d bytes)" % (name, len(drf_json)))
+            self.stdout.write("  DRF:       %.3f ms" % (before * 1000))
+            self.stdout.write("  Fast path: %.3f ms" % (after * 1000))
+            self.stdout.write("  Speed-up:  %.1fx" % (before / after))
+
+    @staticmethod
+    def __time(repeat, serialize):
+        start = time.time()
+        for _ in range(repeat):
+            serialize()
+        return (time.time() - start) / repeat
+
+
+# HELPER METHODS
+def get_synthetic_group_fitness(num_members, num_days):
+    # type: (int, int) -> GroupFitness
+    """
+    :return: a GroupFitness of *num_members* where every member misses one
+    of the days, as None like GroupFitnessFactory leaves missing days
+    """
+    last_pull_time = datetime(2017, 5, 1, 12, 30, tzinfo=pytz.utc)
+    member_activities = list()
+    for person_id in range(1, num_members + 1):
+        activities = [ActivityByDay(
+            date=BENCHMARK_START_DATE + timedelta(days=day),
+            person_id=person_id,
+            steps=random.randint(0, 20000),
+            calories=random.uniform(1500, 3000),
+            active_minutes=random.randint(0, 120),
+            distance=random.uniform(0, 10)) for day in range(num_days)]
+        activities[person_id % num_days] = None
+        member_activities.append(PersonFitness(
+            person_id, activities, "P" if person_id <= 2 else "C",
+            person=Person(id=person_id, name="Member %d" % person_id),
+            last_pull_time=last_pull_time))
+    return GroupFitness(1, member_activities,
+                        group=Group(id=1, name="Benchmark"))
+
+
+def get_synthetic_challenge_view_model(num_members, num_days):
+    # type: (int, int) -> SyntheticObject
+    """
+    :return: an object with the attributes of a ChallengeViewModel of a
+    running challenge
+    """
+    start_datetime = datetime(2017, 5, 1, 4, 0, tzinfo=pytz.utc)
+    challenges = [SyntheticObject(
+        option=option, goal=5000 * option, unit="steps",
+        unit_duration="daily", total_duration="7 days",
+        start_datetime_utc=start_datetime,
+        text="Walk %d steps every day" % (5000 * option), level_id=option)
+        for option in range(1, 4)]
+    progress = list()
+    for person_id in range(1, num_members + 1):
+        steps = [random.randint(0, 10000) for _ in range(num_days)]
+        progress.append(SyntheticObject(
+            person_id=person_id, goal=5000, unit="steps",
+            unit_duration="daily", progress=steps,
+            progress_percent=[value / 5000.0 for value in steps],
+            progress_achieved=[value >= 5000 for value in steps],
+            total_progress=sum(steps)))
+    challenge = dict(
+        is_currently_running=True, text="Walk together",
+        subtext="Every day this week", total_duration="7 days",
+        start_datetime=start_datetime,
+        end_datetime=start_datetime + timedelta(days=7, seconds=-1),
+        level_id=1, level_order=1)
+    return SyntheticObject(
+        status="RUNNING",
+        available=SyntheticObject(
+            challenges=challenges,
+            challenges_by_person=dict(
+                (str(person_id), challenges)
+                for person_id in range(1, num_members + 1)),
+            **challenge),
+        running=SyntheticObject(progress=progress, **challenge),
+        passed=None)
+
+
+def get_synthetic_group_story_list(num_stories):
+    # type: (int) -> GroupStoryList
+    group_stories = [GroupStory(
+        story=Story(id=story_id, title="Story %d" % story_id,
+                    cover_url="https://example.com/%d.png" % story_id,
+                    def_url="https://example.com/%d.json" % story_id,
+                    is_locked=story_id > 5, next_story_id=story_id + 1),
+        is_current=story_id == 1, current_page=story_id % 4)
+        for story_id in range(1, num_stories + 1)]
+    return GroupStoryList(group_stories, 1)
+
+
+class SyntheticObject(object):
+    """
+    An object with the given attributes, standing in for the view models
+    that need the database to be built
+    """
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
@@ -4,9 +4,10 @@ from rest_framework.urlpatterns import format_suffix_patterns
 from api.views import FirebaseToken
 from challenges.api import Challenges, ChallengeCompletion, Create, \
     IndividualizedChallenges, IndividualizedChallengesCustomSteps
-from fitness.api import UserGroupActivities
+from fitness.api import UserGroupActivities, RangeActivities, \
+    IntradayActivities
 from fitness_connector.api import PersonFitnessDataSync, \
-    AllUsersFitnessDataSync, RefreshAllToken
+    AllUsersFitnessDataSync, RefreshAllToken, SyncMetricsReport
 from people.api import UserInfo, UserGroupInfo, UserCircleInfo, PersonInfo, \
     PersonProfileInfo, UserCircleListInfo
 from story_manager.api import UserStory, UserStoryList
@@ -39,6 +40,14 @@ urlpatterns = [
         r'(?P<start_date_string>\d{4}-\d{2}-\d{2})$',
         UserGroupActivities.as_view()),
 
+    # Logged Family's Activities in any range, e.g.
+    # /group/activities/range?start_date=2017-05-01&end_date=2017-05-31
+    url(r'^group/activities/range$', RangeActivities.as_view()),
+
+    # Logged Family's minutes resampled into buckets, e.g. hourly with
+    # /group/activities/intraday?start_date=2017-05-01&buckets=24
+    url(r'^group/activities/intraday$', IntradayActivities.as_view()),
+
     # Logged Family's: All Stories
     url(r'^group/stories/all$', UserStoryList.as_view()),
 
@@ -73,6 +82,7 @@ urlpatterns = [
     url(r'^fitbit/update/person/(?P<person_id>[0-9]+)/$', PersonFitnessDataSync.as_view()),
     url(r'^fitbit/update/all$', AllUsersFitnessDataSync.as_view()),
     url(r'^fitbit/token/update/all$', RefreshAllToken.as_view()),
+    url(r'^fitbit/metrics$', SyncMetricsReport.as_view()),
 
     # Logged Family's: Challenges
     # url(r'^group/challenges2$', Challenges.as_view()),
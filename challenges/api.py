@@ -6,8 +6,9 @@ from challenges.classes import ListOfAvailableChallenges, CurrentChallenge, Chal
 from challenges.models import GroupChallenge
 from challenges.serializers import ListOfAvailableChallengestSerializer, \
     AvailableChallengeSerializer, \
-    CurrentChallengeSerializer, ChallengeViewModelSerializer, \
-    IndividualizedGroupChallengeSerializer, AverageStepsSerializers
+    CurrentChallengeSerializer, \
+    IndividualizedGroupChallengeSerializer, AverageStepsSerializers, \
+    FAST_CHALLENGE_VIEW_MODEL_SERIALIZER
 from fitness.models import DATE_DELTA_7D, DATE_DELTA_1D
 from people import helpers as people_helper
 
@@ -24,8 +25,9 @@ class Challenges(APIView):
     def get(self, request, steps_average=None, format=None):
         group = people_helper.get_group(request.user.id)
         challenge_view_model = ChallengeViewModel(group, steps_average=steps_average)
-        serializer = ChallengeViewModelSerializer(challenge_view_model)
-        return Response(serializer.data)
+        view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+            .to_representation(challenge_view_model)
+        return Response(view_model_data)
 
     def post(self, request, steps_average=None, format=None):
         """
@@ -43,10 +45,11 @@ class Challenges(APIView):
             validated_data = validator.validated_data
             challenge = GroupChallenge.create_from_data(group, validated_data, steps_average=steps_average)
             challenge_view_model = ChallengeViewModel(group)
-            serializer = ChallengeViewModelSerializer(challenge_view_model)
+            view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+                .to_representation(challenge_view_model)
             # current_challenge = CurrentChallenge(challenge, is_new=True)
             # serializer = CurrentChallengeSerializer(current_challenge)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(view_model_data, status=status.HTTP_201_CREATED)
         else:
             errors = validator.errors
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
@@ -60,8 +63,9 @@ class IndividualizedChallengesCustomSteps(APIView):
     def get(self, request, format=None):
         group = people_helper.get_group(request.user.id)
         challenge_view_model = ChallengeViewModel(group)
-        serializer = ChallengeViewModelSerializer(challenge_view_model)
-        return Response(serializer.data)
+        view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+            .to_representation(challenge_view_model)
+        return Response(view_model_data)
 
     def post(self, request, format=None):
         """
@@ -81,8 +85,9 @@ class IndividualizedChallengesCustomSteps(APIView):
             step_averages = validated_data["step_averages"]  # type: dict(int)
 
             challenge_view_model = ChallengeViewModel(group, steps_dict=step_averages)
-            serializer = ChallengeViewModelSerializer(challenge_view_model)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+                .to_representation(challenge_view_model)
+            return Response(view_model_data, status=status.HTTP_201_CREATED)
         else:
             errors = validator.errors
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
@@ -100,8 +105,9 @@ class IndividualizedChallenges(APIView):
     def get(self, request, format=None):
         group = people_helper.get_group(request.user.id)
         challenge_view_model = ChallengeViewModel(group)
-        serializer = ChallengeViewModelSerializer(challenge_view_model)
-        return Response(serializer.data)
+        view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+            .to_representation(challenge_view_model)
+        return Response(view_model_data)
 
     def post(self, request, format=None):
         """
@@ -120,8 +126,9 @@ class IndividualizedChallenges(APIView):
             step_averages = validated_data["step_averages"]  # type: dict(int)
 
             challenge_view_model = ChallengeViewModel(group, steps_dict=step_averages)
-            serializer = ChallengeViewModelSerializer(challenge_view_model)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+                .to_representation(challenge_view_model)
+            return Response(view_model_data, status=status.HTTP_201_CREATED)
         else:
             errors = validator.errors
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
@@ -134,8 +141,9 @@ class IndividualizedChallenges(APIView):
             GroupChallenge.create_individualized(group, validated_data)
 
             challenge_view_model = ChallengeViewModel(group)
-            serializer = ChallengeViewModelSerializer(challenge_view_model)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            view_model_data = FAST_CHALLENGE_VIEW_MODEL_SERIALIZER \
+                .to_representation(challenge_view_model)
+            return Response(view_model_data, status=status.HTTP_201_CREATED)
         else:
             errors = validator.errors
             return Response(errors, status=status.HTTP_400_BAD_REQUEST)
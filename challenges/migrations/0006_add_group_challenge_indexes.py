@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 04:04
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0005_add_level_to_group_challenge'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupchallenge',
+            index=models.Index(fields=['group', 'completed_datetime', 'end_datetime'], name='challenges_group_open_end'),
+        ),
+        migrations.AddIndex(
+            model_name='groupchallenge',
+            index=models.Index(fields=['group', 'end_datetime'], name='challenges_group_end'),
+        ),
+    ]
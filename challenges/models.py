@@ -128,6 +128,14 @@ class GroupChallenge(models.Model):
 
     class Meta:
         get_latest_by = "end_datetime"
+        # For the running and passed challenges of a Group, and its latest
+        indexes = [
+            models.Index(fields=["group", "completed_datetime",
+                                 "end_datetime"],
+                         name="challenges_group_open_end"),
+            models.Index(fields=["group", "end_datetime"],
+                         name="challenges_group_end"),
+        ]
 
     def __str__(self):
         return GroupChallenge.MEMBERSHIP_STRING.format(
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 
+from api.fast_serializers import FastSerializer
 from challenges.models import PersonChallenge
 
 
@@ -85,4 +86,9 @@ class ChallengeViewModelSerializer(serializers.Serializer):
 
 
 class AverageStepsSerializers(serializers.Serializer):
-    step_averages = serializers.DictField(child=serializers.IntegerField())
\ No newline at end of file
+    step_averages = serializers.DictField(child=serializers.IntegerField())
+
+
+# FAST SERIALIZERS
+FAST_CHALLENGE_VIEW_MODEL_SERIALIZER = FastSerializer(
+    ChallengeViewModelSerializer)
@@ -1,14 +1,28 @@
 from dateutil import parser
-from django.http import Http404
-from rest_framework import permissions
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import permissions, status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
+from fitness.cache import GroupActivitiesCache
 from fitness.models import DATE_DELTA_1D, DATE_DELTA_7D
-from fitness.models import GroupFitnessFactory, PersonFitnessFactory
-from fitness.serializers import GroupFitnessSerializer, PersonFitnessSerializer
+from fitness.models import GroupFitnessFactory, PersonFitnessFactory, \
+    get_last_date
+from fitness.ranges import ActivityRange, RESOLUTION_DAY, RESOLUTIONS, \
+    MAX_RANGE_DAYS, get_cursor, parse_cursor, get_range_days
+from fitness.resampling import IntradayResampler, ResolutionUnavailable, \
+    AGGREGATE_SUM, AGGREGATES, MAX_INTRADAY_DAYS, MAX_BUCKETS
+from fitness.serializers import PersonFitnessSerializer, \
+    FAST_GROUP_FITNESS_SERIALIZER
 from fitness_connector.activity import PersonActivity
+from people import helpers as people_helper
 from people.models import Person, Group, Membership
+from people.versions import GroupVersions, RESOURCE_ACTIVITIES, \
+    get_not_modified_response, set_validators
+
+# CONSTANTS
+HOURS_PER_DAY = 24  # type: int
 
 
 # CLASSES
@@ -31,13 +45,118 @@ class UserGroupActivities(APIView):
 
     def get(self, request, start_date_string, format=None):
         group = self.get_group(request.user.id)
-        start_date = parser.parse(start_date_string)
-        end_date = start_date + DATE_DELTA_7D
-        group_activities = GroupFitnessFactory.get(group.id,
-                                                  start_date,
-                                                  end_date)
-        serializer = GroupFitnessSerializer(group_activities)
-        return Response(serializer.data)
+        start_date = parser.parse(start_date_string).date()
+        etag, last_modified = GroupVersions.get_validators(
+            [(group.id, RESOURCE_ACTIVITIES)],
+            start_date, get_last_date(start_date + DATE_DELTA_7D))
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        response = Response(get_group_activities_data(group.id, start_date))
+        return set_validators(response, etag, last_modified)
+
+
+class RangeActivities(APIView):
+    """
+    Stream the activities of the logged User's Group, or of one Person in
+    it, from start_date to end_date at the resolution of a day or of 1, 15
+    or 60 minutes. Admins can ask for any person_id or group_id. With
+    *limit*, a page holds that many days of a Person, and next_cursor
+    continues it; next_cursor is null once the range is done.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, format=None):
+        params = request.query_params
+        try:
+            start_date = parser.parse(params["start_date"]).date()
+            end_date = parser.parse(params["end_date"]).date()
+            resolution = params.get("resolution", RESOLUTION_DAY)
+            after = parse_cursor(params["cursor"]) \
+                if "cursor" in params else None
+            limit = int(params["limit"]) if "limit" in params else None
+        except (KeyError, ValueError, OverflowError):
+            return self.__get_bad_request(
+                "Give start_date and end_date as YYYY-MM-DD, an integer "
+                "limit, and a cursor from next_cursor")
+        if not 0 < get_range_days(start_date, end_date) <= MAX_RANGE_DAYS:
+            return self.__get_bad_request(
+                "The range must have 1 to %d days" % MAX_RANGE_DAYS)
+        if resolution not in RESOLUTIONS:
+            return self.__get_bad_request(
+                "The resolution must be one of " + ", ".join(RESOLUTIONS))
+        if limit is not None and limit < 1:
+            return self.__get_bad_request("The limit must be positive")
+
+        interval = None if resolution == RESOLUTION_DAY else int(resolution)
+        activity_range = ActivityRange(get_requested_person_ids(request),
+                                       start_date, end_date, interval)
+        return StreamingHttpResponse(
+            stream_range_activities(activity_range, resolution, after, limit),
+            content_type="application/json")
+
+    def __get_bad_request(self, message):
+        output = {"message": message}
+        return Response(output, status.HTTP_400_BAD_REQUEST)
+
+
+class IntradayActivities(APIView):
+    """
+    Retrieve the minutes of the logged User's Group, or of one Person in
+    it, from start_date to end_date resampled into *buckets* buckets of the
+    same length, e.g. 24 for the hours of a day. Each member gets a series
+    of the sum, mean or max of every field per bucket, aligned to the same
+    buckets. Admins can ask for any person_id or group_id.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, format=None):
+        params = request.query_params
+        try:
+            start_date = parser.parse(params["start_date"]).date()
+            end_date = parser.parse(params.get("end_date",
+                                               params["start_date"])).date()
+            num_buckets = int(params.get("buckets", HOURS_PER_DAY
+                                         * get_range_days(start_date,
+                                                          end_date)))
+        except (KeyError, ValueError, OverflowError):
+            return self.__get_bad_request(
+                "Give start_date and end_date as YYYY-MM-DD, and an "
+                "integer number of buckets")
+        aggregate = params.get("aggregate", AGGREGATE_SUM)
+        if not 0 < get_range_days(start_date, end_date) \
+                <= MAX_INTRADAY_DAYS:
+            return self.__get_bad_request(
+                "The range must have 1 to %d days" % MAX_INTRADAY_DAYS)
+        if not 0 < num_buckets <= MAX_BUCKETS:
+            return self.__get_bad_request(
+                "The number of buckets must be 1 to %d" % MAX_BUCKETS)
+        if aggregate not in AGGREGATES:
+            return self.__get_bad_request(
+                "The aggregate must be one of " + ", ".join(AGGREGATES))
+
+        resampler = IntradayResampler(start_date, end_date, num_buckets,
+                                      aggregate)
+        try:
+            series = [resampler.get_series(person_id) for person_id
+                      in get_requested_person_ids(request)]
+        except ResolutionUnavailable as error:
+            return self.__get_bad_request(str(error))
+        return Response({
+            "start_date": start_date,
+            "end_date": end_date,
+            "buckets": num_buckets,
+            "bucket_minutes": resampler.get_bucket_minutes(),
+            "aggregate": aggregate,
+            "series": series
+        })
+
+    def __get_bad_request(self, message):
+        output = {"message": message}
+        return Response(output, status.HTTP_400_BAD_REQUEST)
 
 
 # CLASSES FOR ADMIN VIEW (CURRENTLY UNUSED)
@@ -141,10 +260,105 @@ class GroupActivities(APIView):
 
     def get(self, request, group_id, start_date_string, format=None):
         group = self.get_group(group_id)
-        start_date = parser.parse(start_date_string)
-        end_date = start_date + DATE_DELTA_7D
-        group_activities = GroupFitnessFactory.get(group.id,
+        start_date = parser.parse(start_date_string).date()
+        return Response(get_group_activities_data(group.id, start_date))
+
+
+# HELPER METHODS
+def get_requested_person_ids(request):
+    # type: (Request) -> list(int)
+    """
+    :return: the ids of the members of the logged User's Group, or of its
+    member with the person_id parameter. Admins can also ask for any
+    person_id or group_id.
+    """
+    params = request.query_params
+    if request.user.is_staff and "person_id" in params:
+        return [get_object(Person, params["person_id"]).id]
+    if request.user.is_staff and "group_id" in params:
+        group = get_object(Group, params["group_id"])
+    else:
+        group = people_helper.get_group(request.user.id)
+        if params.get("group_id", str(group.id)) != str(group.id):
+            raise Http404
+    person_ids = list(Membership.objects
+                      .filter(group=group)
+                      .order_by("pk")
+                      .values_list("person_id", flat=True))
+    if "person_id" in params:
+        if params["person_id"] not in [str(person_id)
+                                       for person_id in person_ids]:
+            raise Http404
+        return [int(params["person_id"])]
+    return person_ids
+
+
+def get_object(model, object_id):
+    try:
+        return model.objects.get(pk=object_id)
+    except (model.DoesNotExist, ValueError):
+        raise Http404
+
+
+def get_group_activities_data(group_id, start_date):
+    # type: (int, date) -> dict
+    """
+    :return: the serialized GroupFitness of the Group from start_date to
+    seven days later, from GroupActivitiesCache when it has them
+    """
+    end_date = start_date + DATE_DELTA_7D
+    last_date = get_last_date(end_date)
+    version = GroupVersions.get_version(group_id, RESOURCE_ACTIVITIES)
+    data = GroupActivitiesCache.get(group_id, start_date, last_date, version)
+    if data is None:
+        group_activities = GroupFitnessFactory.get(group_id,
                                                   start_date,
                                                   end_date)
-        serializer = GroupFitnessSerializer(group_activities)
-        return Response(serializer.data)
+        data = FAST_GROUP_FITNESS_SERIALIZER.to_representation(
+            group_activities)
+        GroupActivitiesCache.set(group_id, start_date, last_date, version,
+                                 data)
+    return data
+
+
+def stream_range_activities(activity_range, resolution, after, limit):
+    # type: (ActivityRange, str, tuple, int) -> iter
+    """
+    :return: an iterator of the chunks of the JSON document of the days of
+    *activity_range* after *after*, rendered one day at a time with the
+    default renderer so the keys are cased like the other endpoints
+    """
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    header = renderer.render(dict(start_date=activity_range.start_date,
+                                  end_date=activity_range.end_date,
+                                  resolution=resolution))
+    yield header[:-1] + b',"activities":['
+
+    num_days = 0
+    last_key = None
+    next_cursor = None
+    for key, activities in activity_range.iter_days(after):
+        if num_days == limit:
+            # The page is full and there is at least one more day
+            next_cursor = get_cursor(last_key)
+            break
+        rows = renderer.render([get_range_activity_row(activity,
+                                                       activity_range)
+                                for activity in activities])
+        yield (b"," if num_days else b"") + rows[1:-1]
+        num_days += 1
+        last_key = key
+    yield b"]," + renderer.render(dict(next_cursor=next_cursor))[1:]
+
+
+def get_range_activity_row(activity, activity_range):
+    # type: (object, ActivityRange) -> dict
+    row = dict(person_id=activity.person_id, date=activity.date)
+    if activity_range.interval is not None:
+        row["time"] = activity.time
+        row["interval"] = activity.interval
+    row["steps"] = activity.steps
+    row["calories"] = activity.calories
+    row["active_minutes"] = activity.active_minutes
+    row["distance"] = activity.distance
+    return row
@@ -0,0 +1,74 @@
+from django.core.cache import cache
+
+from people.signals import get_group_ids
+from people.versions import GroupVersions, RESOURCE_ACTIVITIES, \
+    is_shared_cache
+
+# CONSTANTS
+GROUP_ACTIVITIES_KEY = "fitness:group_activities:{0}:{1}:{2}"
+GROUP_ACTIVITIES_TIMEOUT = 7 * 24 * 60 * 60  # type: int
+
+
+# CLASSES
+class GroupActivitiesCache(object):
+    """
+    Caches the serialized GroupFitness of a Group's 7-day window in Django's
+    cache. Entries are keyed on the Group's RESOURCE_ACTIVITIES version, so
+    they are dropped by everything that changes the ETag of the endpoint:
+    a member's ActivityByDay being written or pulled, and the changes to
+    the Group, its memberships and its members in people.signals.
+    Entries also record the date the window was cut at, so they expire when
+    the window grows with the current date. Nothing is cached when the
+    cache is per process, since the sync workers' bumps would not reach
+    the web processes.
+    """
+
+    @staticmethod
+    def get(group_id, start_date, last_date, version):
+        # type: (int, date, date, int) -> dict
+        """
+        :return: the cached data of the window at *version*, or None
+        """
+        if not is_shared_cache():
+            return None
+        entry = cache.get(get_group_activities_key(group_id, start_date,
+                                                   version))
+        if entry is None or entry["last_date"] != last_date:
+            return None
+        return entry["data"]
+
+    @staticmethod
+    def set(group_id, start_date, last_date, version, data):
+        # type: (int, date, date, int, dict) -> None
+        """
+        *version* must be read before *data* is, so data from before a
+        change is never cached under the version that follows it
+        """
+        if not is_shared_cache():
+            return
+        cache.set(get_group_activities_key(group_id, start_date, version),
+                  {"last_date": last_date, "data": data},
+                  GROUP_ACTIVITIES_TIMEOUT)
+
+    @staticmethod
+    def invalidate(person_id, dates, group_ids=None):
+        # type: (int, iter, list(int)) -> None
+        """
+        Bump the activities version of the Groups of the Person once the
+        current transaction commits, if any *dates* were written. Callers
+        that write many times, like a pull, pass the Person's *group_ids*
+        so they are not looked up every time.
+        """
+        if not list(dates):
+            return
+        if group_ids is None:
+            group_ids = get_group_ids(person_id)
+        GroupVersions.bump(group_ids, [RESOURCE_ACTIVITIES])
+
+
+# HELPER METHODS
+def get_group_activities_key(group_id, start_date, version):
+    # type: (int, date, int) -> str
+    return GROUP_ACTIVITIES_KEY.format(group_id, version,
+                                       start_date.strftime("%Y-%m-%d"))
+
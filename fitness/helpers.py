@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count
+
+# CONSTANTS
+DEFAULT_CHUNK_SIZE = 1000  # type: int
+
+
+# HELPER METHODS
+def remove_duplicate_minutes(model, chunk_size=DEFAULT_CHUNK_SIZE,
+                             stdout=None):
+    # type: (type, int, object) -> int
+    """
+    Remove the ActivityByMinute rows that share a (person, date, time) with a
+    newer row. The work is done one person and *chunk_size* rows at a time,
+    each chunk in its own short transaction, so it can run on a live table.
+    :param model: ActivityByMinute, or its historical version in a migration
+    :return: the number of rows deleted
+    """
+    num_deleted = 0
+    person_ids = model.objects.values_list("person_id", flat=True) \
+        .order_by("person_id").distinct()
+
+    for person_id in list(person_ids):
+        dates = model.objects \
+            .filter(person_id=person_id) \
+            .values("date") \
+            .annotate(num_rows=Count("id"),
+                      num_times=Count("time", distinct=True)) \
+            .order_by("date")
+        dates = [row["date"] for row in dates
+                 if row["num_rows"] > row["num_times"]]
+
+        for date in dates:
+            rows = model.objects \
+                .filter(person_id=person_id, date=date) \
+                .order_by("-id") \
+                .values_list("id", "time")
+            seen_times = set()
+            duplicate_ids = list()
+            for row_id, row_time in rows:
+                if row_time in seen_times:
+                    duplicate_ids.append(row_id)
+                else:
+                    seen_times.add(row_time)
+
+            for start in range(0, len(duplicate_ids), chunk_size):
+                chunk = duplicate_ids[start:start + chunk_size]
+                with transaction.atomic():
+                    model.objects.filter(id__in=chunk).delete()
+                num_deleted += len(chunk)
+
+        if stdout and dates:
+            stdout.write("Person %s: cleaned %d days" % (person_id,
+                                                         len(dates)))
+
+    return num_deleted
+
+
+def remove_duplicate_days(model, chunk_size=DEFAULT_CHUNK_SIZE):
+    # type: (type, int) -> int
+    """
+    Remove the ActivityByDay rows that share a (person, date) with a newer
+    row, *chunk_size* rows per transaction
+    :param model: ActivityByDay, or its historical version in a migration
+    :return: the number of rows deleted
+    """
+    duplicates = model.objects \
+        .values("person_id", "date") \
+        .annotate(num_rows=Count("id")) \
+        .filter(num_rows__gt=1) \
+        .order_by()
+
+    duplicate_ids = list()
+    for duplicate in duplicates:
+        row_ids = model.objects \
+            .filter(person_id=duplicate["person_id"], date=duplicate["date"]) \
+            .order_by("-id") \
+            .values_list("id", flat=True)
+        duplicate_ids.extend(list(row_ids)[1:])
+
+    for start in range(0, len(duplicate_ids), chunk_size):
+        with transaction.atomic():
+            model.objects \
+                .filter(id__in=duplicate_ids[start:start + chunk_size]) \
+                .delete()
+
+    return len(duplicate_ids)
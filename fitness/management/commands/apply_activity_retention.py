@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fitness.tiers import Retention, DOWNSAMPLE_AFTER_DAYS, \
+    MINUTE_RETENTION_DAYS, QUARTER_HOUR_RETENTION_DAYS, DELETE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Downsample old minute data into the 15-minute and hourly " \
+           "tiers, then delete the minutes and 15-minute intervals that " \
+           "are past their retention. Run it daily, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--downsample-after", type=int,
+                            default=DOWNSAMPLE_AFTER_DAYS,
+                            help="Age in days after which a day is "
+                                 "downsampled")
+        parser.add_argument("--minute-days", type=int,
+                            default=MINUTE_RETENTION_DAYS,
+                            help="Age in days after which minutes are "
+                                 "deleted")
+        parser.add_argument("--quarter-hour-days", type=int,
+                            default=QUARTER_HOUR_RETENTION_DAYS,
+                            help="Age in days after which 15-minute "
+                                 "intervals are deleted")
+        parser.add_argument("--chunk-size", type=int,
+                            default=DELETE_CHUNK_SIZE,
+                            help="Number of rows per DELETE")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only count what would be done")
+
+    def handle(self, *args, **options):
+        try:
+            retention = Retention(options["downsample_after"],
+                                  options["minute_days"],
+                                  options["quarter_hour_days"],
+                                  options["chunk_size"])
+        except ValueError as error:
+            raise CommandError(error)
+
+        counts = retention.run(options["dry_run"])
+        self.stdout.write(
+            "%s%d days downsampled, %d minutes, %d packed days and %d "
+            "15-minute intervals deleted" % (
+                "Dry run: " if options["dry_run"] else "",
+                counts["days_downsampled"], counts["minutes_deleted"],
+                counts["packed_days_deleted"],
+                counts["quarter_hours_deleted"]))
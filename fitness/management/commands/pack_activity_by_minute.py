@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from fitness.models import ActivityByMinute, ActivityMinutesByDay
+
+
+class Command(BaseCommand):
+    help = "Copy ActivityByMinute rows into ActivityMinutesByDay, one " \
+           "packed row per (person, date). Days already packed are merged."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--person", type=int, action="append",
+                            help="Only pack this person; may be repeated")
+
+    def handle(self, *args, **options):
+        person_ids = ActivityByMinute.objects \
+            .values_list("person_id", flat=True) \
+            .order_by("person_id") \
+            .distinct()
+        if options["person"]:
+            person_ids = person_ids.filter(person_id__in=options["person"])
+
+        for person_id in list(person_ids):
+            dates = ActivityByMinute.objects \
+                .filter(person_id=person_id) \
+                .values_list("date", flat=True) \
+                .order_by("date") \
+                .distinct()
+            num_minutes = 0
+            for activity_date in list(dates):
+                activities = list(ActivityByMinute.objects
+                                  .filter(person_id=person_id,
+                                          date=activity_date))
+                ActivityMinutesByDay.upsert(person_id, activity_date,
+                                            activities)
+                num_minutes += len(activities)
+            self.stdout.write("Person %s: packed %d minutes" % (person_id,
+                                                                num_minutes))
@@ -0,0 +1,101 @@
+from dateutil import parser as date_parser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from fitness.models import ActivityByMinute
+from fitness.partitions import PARTITION_FUTURE, get_month_start, \
+    add_months, get_months, get_partition_name, get_partition_month, \
+    get_setup_sql, get_add_partitions_sql, get_archive_sql, get_drop_sql, \
+    get_partitions
+
+# CONSTANTS
+MONTHS_AHEAD = 3  # type: int
+
+
+class Command(BaseCommand):
+    help = "Maintain the monthly partitions of ActivityByMinute on MySQL: " \
+           "partition the table, add the coming months, and archive or " \
+           "drop the old ones. Run it monthly, e.g. from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--setup", action="store_true",
+                            help="Partition the table by month, from the "
+                                 "month of its oldest row")
+        parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD,
+                            help="Number of future months to keep a "
+                                 "partition ready for")
+        parser.add_argument("--archive-before",
+                            help="Move the months before this date, as "
+                                 "YYYY-MM-DD, to archive tables")
+        parser.add_argument("--drop-before",
+                            help="Drop the months before this date, as "
+                                 "YYYY-MM-DD, with their rows")
+        parser.add_argument("--status", action="store_true",
+                            help="Only list the partitions")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Print the SQL instead of running it")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "mysql":
+            raise CommandError("Partitioning needs MySQL, not %s"
+                               % connection.vendor)
+
+        table = ActivityByMinute._meta.db_table
+        with connection.cursor() as cursor:
+            partitions = get_partitions(cursor, table)
+            if options["status"]:
+                self.__write_status(partitions)
+                return
+
+            statements = list()
+            this_month = get_month_start(timezone.localdate())
+            last_month = add_months(this_month, options["months_ahead"])
+            if not partitions:
+                if not options["setup"]:
+                    raise CommandError("%s is not partitioned yet, "
+                                       "run with --setup" % table)
+                first_date = ActivityByMinute.objects \
+                    .order_by("date").values_list("date", flat=True).first()
+                statements += get_setup_sql(
+                    table, get_months(first_date or this_month, last_month))
+            else:
+                months = [get_partition_month(name) for name, _ in partitions
+                          if name != PARTITION_FUTURE]
+                next_month = add_months(max(months), 1) \
+                    if months else this_month
+                statements += get_add_partitions_sql(
+                    table, get_months(next_month, last_month))
+                statements += self.__get_removal_sql(table, months, options)
+
+            for statement in statements:
+                self.stdout.write(statement)
+                if not options["dry_run"]:
+                    cursor.execute(statement)
+
+    def __get_removal_sql(self, table, months, options):
+        # type: (str, list(date), dict) -> list(str)
+        """
+        Months are removed whole, once every one of their dates is before
+        the given date. Archiving goes first, so --drop-before only drops
+        what is left.
+        """
+        statements = list()
+        for option, get_sql in (("archive_before", get_archive_sql),
+                                ("drop_before", get_drop_sql)):
+            if not options[option]:
+                continue
+            before = date_parser.parse(options[option]).date()
+            old_months = [month for month in months
+                          if add_months(month, 1) <= before]
+            for month in old_months:
+                statements += get_sql(table, get_partition_name(month))
+            months = [month for month in months if month not in old_months]
+        return statements
+
+    def __write_status(self, partitions):
+        # type: (list(tuple)) -> None
+        if not partitions:
+            self.stdout.write("Not partitioned")
+        for name, num_rows in partitions:
+            self.stdout.write("%-10s %12d rows" % (name, num_rows or 0))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from fitness.helpers import DEFAULT_CHUNK_SIZE, remove_duplicate_minutes
+from fitness.models import ActivityByMinute
+
+
+class Command(BaseCommand):
+    help = "Remove duplicate ActivityByMinute rows, keeping the newest one " \
+           "for every (person, date, time). Safe to run on a live database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int,
+                            default=DEFAULT_CHUNK_SIZE,
+                            help="Number of rows deleted per transaction")
+
+    def handle(self, *args, **options):
+        num_deleted = remove_duplicate_minutes(ActivityByMinute,
+                                               options["chunk_size"],
+                                               stdout=self.stdout)
+        self.stdout.write("Deleted %d duplicate rows" % num_deleted)
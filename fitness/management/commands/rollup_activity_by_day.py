@@ -0,0 +1,36 @@
+from dateutil import parser as date_parser
+from django.core.management.base import BaseCommand
+
+from fitness.models import ActivityByMinute, ActivityMinutesByDay
+from fitness.rollup import DayRollup, ROLLUP_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Recompute ActivityByDay, including active minutes, from the " \
+           "minute data of every day that has some."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--person", type=int, action="append",
+                            help="Only roll up this person; may be repeated")
+        parser.add_argument("--start", help="First date, as YYYY-MM-DD")
+        parser.add_argument("--end", help="Last date, as YYYY-MM-DD")
+        parser.add_argument("--batch-size", type=int,
+                            default=ROLLUP_BATCH_SIZE,
+                            help="Number of days per aggregate query")
+
+    def handle(self, *args, **options):
+        person_dates = set()
+        for model in (ActivityByMinute, ActivityMinutesByDay):
+            days = model.objects.values_list("person_id", "date").distinct()
+            if options["person"]:
+                days = days.filter(person_id__in=options["person"])
+            if options["start"]:
+                days = days.filter(
+                    date__gte=date_parser.parse(options["start"]).date())
+            if options["end"]:
+                days = days.filter(
+                    date__lte=date_parser.parse(options["end"]).date())
+            person_dates.update(days.order_by())
+
+        num_written = DayRollup.rollup(person_dates, options["batch_size"])
+        self.stdout.write("Rolled up %d days" % num_written)
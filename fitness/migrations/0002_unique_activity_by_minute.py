@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from fitness.helpers import remove_duplicate_minutes
+
+
+def remove_duplicates(apps, schema_editor):
+    ActivityByMinute = apps.get_model("fitness", "ActivityByMinute")
+    remove_duplicate_minutes(ActivityByMinute)
+
+
+class Migration(migrations.Migration):
+
+    # The duplicates are removed in small transactions of their own
+    atomic = False
+
+    dependencies = [
+        ('fitness', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='activitybyminute',
+            unique_together=set([('person', 'date', 'time')]),
+        ),
+    ]
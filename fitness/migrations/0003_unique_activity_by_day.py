@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from fitness.helpers import remove_duplicate_days
+
+
+def remove_duplicates(apps, schema_editor):
+    ActivityByDay = apps.get_model("fitness", "ActivityByDay")
+    remove_duplicate_days(ActivityByDay)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('fitness', '0002_unique_activity_by_minute'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='activitybyday',
+            unique_together=set([('person', 'date')]),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 03:43
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0006_add_internal_name'),
+        ('fitness', '0003_unique_activity_by_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityMinutesByDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('minutes', models.BinaryField()),
+                ('steps', models.BinaryField()),
+                ('calories', models.BinaryField()),
+                ('level', models.BinaryField()),
+                ('distance', models.BinaryField()),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='people.Person')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='activityminutesbyday',
+            unique_together=set([('person', 'date')]),
+        ),
+    ]
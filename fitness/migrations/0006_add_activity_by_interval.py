@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 03:55
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('people', '0006_add_internal_name'),
+        ('fitness', '0005_activity_by_minute_without_fk_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityByInterval',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('interval', models.PositiveSmallIntegerField()),
+                ('steps', models.IntegerField()),
+                ('calories', models.FloatField()),
+                ('active_minutes', models.IntegerField()),
+                ('distance', models.FloatField()),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='people.Person')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='activitybyinterval',
+            unique_together=set([('person', 'interval', 'date', 'time')]),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 04:04
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0006_add_activity_by_interval'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitybyminute',
+            name='person',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, to='people.Person'),
+        ),
+        migrations.AddIndex(
+            model_name='activitybyday',
+            index=models.Index(fields=['person', 'date', 'steps', 'calories', 'active_minutes', 'distance'], name='fitness_day_person_totals'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 04:37
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness', '0007_add_activity_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitybyinterval',
+            name='is_stale',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,10 +1,12 @@
 # from typing import List, Set, Dict, Tuple, Text, Optional
 
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, time as time_of_day
 
 import pytz
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from fitness.cache import GroupActivitiesCache
+from fitness.packing import PackedDay, get_minute_of_day
 from fitness_connector.models import Account
 from people.models import Person, Group, Membership
 
@@ -13,6 +15,7 @@ from people.models import Person, Group, Membership
 DATE_DELTA_1D = timedelta(days=1)  # type: timedelta
 DATE_DELTA_7D = timedelta(days=7)  # type: timedelta
 DATE_DELTA_1S = timedelta(seconds=1)  # type: timedelta
+BULK_BATCH_SIZE = 500  # type: int
 STAGE_PRECONTEMPLATIVE = 1
 STAGE_CONTEMPLATIVE = 2
 STAGE_PREPARATION = 3
@@ -28,6 +31,8 @@ STAGES = (
 
 ACTIVITY_BYMINS_STRING = "{0} on {1} {2}"
 ACTIVITY_BYDAY_STRING = "{0} on {1}"
+MINUTES_BYDAY_STRING = "{0}'s minutes on {1}"
+ACTIVITY_BYINTERVAL_STRING = "{0} on {1} {2} ({3} min)"
     
 
 # Django Models
@@ -36,17 +41,207 @@ class ActivityByMinute(models.Model):
     #date_time = models.DateTimeField()
     date = models.DateField()
     time = models.TimeField()
-    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    # Partitioned MySQL tables cannot have foreign keys, see partitions.py.
+    # The unique (person, date, time) index also serves lookups by person.
+    person = models.ForeignKey(Person, on_delete=models.CASCADE,
+                               db_constraint=False, db_index=False)
     steps = models.IntegerField()
     calories = models.FloatField()
     level = models.IntegerField()
     distance = models.FloatField()
-    
+
+    class Meta:
+        unique_together = ("person", "date", "time")
+
     def __str__(self):
         return ACTIVITY_BYMINS_STRING.format(self.person.name,
                                              self.date,
                                              self.time)
 
+    @staticmethod
+    def upsert(person_id, activity_date, activities):
+        # type: (int, date, list(ActivityByMinute)) -> tuple
+        """
+        Write *activities* of one person on one date. Rows that already
+        exist between the earliest and the latest time of *activities* are
+        replaced, so pulling an overlapping window twice is harmless.
+        :return: a tuple of (number of rows inserted, number of rows updated)
+        """
+        if not activities:
+            return 0, 0
+
+        times = [activity.time for activity in activities]
+        with transaction.atomic():
+            lock_person(person_id)
+            num_deleted, _ = ActivityByMinute.objects \
+                .filter(person_id=person_id,
+                        date=activity_date,
+                        time__gte=min(times),
+                        time__lte=max(times)) \
+                .delete()
+            ActivityByMinute.objects.bulk_create(activities,
+                                                 batch_size=BULK_BATCH_SIZE)
+            mark_tiers_stale(person_id, activity_date)
+        num_updated = min(num_deleted, len(activities))
+        return len(activities) - num_updated, num_updated
+
+
+class ActivityMinutesByDay(models.Model):
+    """
+    A Person's minute-by-minute activity in one day, stored as one row of
+    packed arrays instead of one ActivityByMinute row per minute. See
+    fitness.packing for the layout.
+    """
+    date = models.DateField()
+    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    minutes = models.BinaryField()
+    steps = models.BinaryField()
+    calories = models.BinaryField()
+    level = models.BinaryField()
+    distance = models.BinaryField()
+
+    class Meta:
+        unique_together = ("person", "date")
+
+    def __str__(self):
+        return MINUTES_BYDAY_STRING.format(self.person.name, self.date)
+
+    def get_packed_day(self):
+        # type: () -> PackedDay
+        return PackedDay.decode(self.minutes, self.steps, self.calories,
+                                self.level, self.distance)
+
+    def set_packed_day(self, packed_day):
+        # type: (PackedDay) -> None
+        for field_name, value in packed_day.encode().items():
+            setattr(self, field_name, value)
+
+    def get_size(self):
+        # type: () -> int
+        """
+        :return: the number of bytes of the packed arrays
+        """
+        return sum(len(getattr(self, field_name)) for field_name in
+                   ("minutes", "steps", "calories", "level", "distance"))
+
+    def get_activities(self):
+        # type: () -> list(ActivityByMinute)
+        """
+        :return: unsaved ActivityByMinute objects of the minutes that have
+        data, in order of time
+        """
+        packed_day = self.get_packed_day()
+        activities = list()
+        for minute in packed_day.get_minutes():
+            activities.append(ActivityByMinute(
+                date=self.date,
+                time=time_of_day(minute // 60, minute % 60),
+                person_id=self.person_id,
+                steps=packed_day.steps[minute],
+                calories=packed_day.calories[minute],
+                level=packed_day.level[minute],
+                distance=packed_day.distance[minute]))
+        return activities
+
+    @staticmethod
+    def get_activities_between(person_id, start_date, end_date):
+        # type: (int, date, date) -> list(ActivityByMinute)
+        """
+        Read API that matches ActivityByMinute.objects.filter(person_id=...,
+        date__range=(start_date, end_date)).order_by("date", "time"). Each
+        day is loaded with a single row.
+        """
+        days = ActivityMinutesByDay.objects \
+            .filter(person_id=person_id,
+                    date__gte=start_date,
+                    date__lte=end_date) \
+            .order_by("date")
+        activities = list()
+        for one_day in days:
+            activities.extend(one_day.get_activities())
+        return activities
+
+    @staticmethod
+    def upsert(person_id, activity_date, activities):
+        # type: (int, date, list(ActivityByMinute)) -> tuple
+        """
+        Merge *activities* of one person on one date into the day's row.
+        Minutes already saved are overwritten and the other minutes are kept.
+        :return: a tuple of (number of minutes inserted, number of minutes
+        updated)
+        """
+        if not activities:
+            return 0, 0
+
+        with transaction.atomic():
+            lock_person(person_id)
+            one_day = ActivityMinutesByDay.objects \
+                .select_for_update() \
+                .filter(person_id=person_id, date=activity_date) \
+                .first()
+            if one_day:
+                packed_day = one_day.get_packed_day()
+            else:
+                one_day = ActivityMinutesByDay(person_id=person_id,
+                                               date=activity_date)
+                packed_day = PackedDay()
+
+            num_updated = 0
+            for activity in activities:
+                minute = get_minute_of_day(activity.time)
+                num_updated += packed_day.minutes[minute]
+                packed_day.set_minute(minute, activity.steps,
+                                      activity.calories, activity.level,
+                                      activity.distance)
+
+            one_day.set_packed_day(packed_day)
+            one_day.save()
+            mark_tiers_stale(person_id, activity_date)
+        return len(activities) - num_updated, num_updated
+
+
+class ActivityByInterval(models.Model):
+    """
+    A Person's activity summed over an interval of *interval* minutes that
+    starts at *time*. These are the downsampled tiers of ActivityByMinute,
+    see fitness.tiers. The tiers of a day are stale once minutes of that day
+    are written after it was downsampled, until it is downsampled again.
+    """
+    date = models.DateField()
+    time = models.TimeField()
+    person = models.ForeignKey(Person, on_delete=models.CASCADE)
+    interval = models.PositiveSmallIntegerField()
+    steps = models.IntegerField()
+    calories = models.FloatField()
+    active_minutes = models.IntegerField()
+    distance = models.FloatField()
+    is_stale = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("person", "interval", "date", "time")
+
+    def __str__(self):
+        return ACTIVITY_BYINTERVAL_STRING.format(self.person.name, self.date,
+                                                 self.time, self.interval)
+
+    @staticmethod
+    def upsert(person_id, interval, dates, activities):
+        # type: (int, int, list(date), list(ActivityByInterval)) -> int
+        """
+        Replace the *interval* tier of one person on *dates* with
+        *activities*
+        :return: the number of rows written
+        """
+        with transaction.atomic():
+            lock_person(person_id)
+            ActivityByInterval.objects \
+                .filter(person_id=person_id, interval=interval,
+                        date__in=dates) \
+                .delete()
+            ActivityByInterval.objects.bulk_create(
+                activities, batch_size=BULK_BATCH_SIZE)
+        return len(activities)
+
 
 class ActivityByDay(models.Model):
     """A Person's activity information per day"""
@@ -57,24 +252,96 @@ class ActivityByDay(models.Model):
     active_minutes = models.IntegerField()
     distance = models.FloatField()
 
+    class Meta:
+        unique_together = ("person", "date")
+        # Covers the date range reads of a Person, so they skip the table rows
+        indexes = [
+            models.Index(fields=["person", "date", "steps", "calories",
+                                 "active_minutes", "distance"],
+                         name="fitness_day_person_totals"),
+        ]
+
     def __str__(self):
         return ACTIVITY_BYDAY_STRING.format(self.person.name, self.date)
 
+    @staticmethod
+    def get_changed(person_id, activities):
+        # type: (int, list(ActivityByDay)) -> list(ActivityByDay)
+        """
+        :return: the *activities* whose totals differ from the saved ones,
+        or that are not saved yet
+        """
+        if not activities:
+            return []
+
+        saved = ActivityByDay.objects \
+            .filter(person_id=person_id,
+                    date__in=[activity.date for activity in activities]) \
+            .values_list("date", "steps", "calories", "active_minutes",
+                         "distance")
+        saved_totals = dict((row[0], row[1:]) for row in saved)
+        return [activity for activity in activities
+                if not ActivityByDay._is_same_totals(
+                    saved_totals.get(activity.date), activity)]
+
+    @staticmethod
+    def _is_same_totals(saved_totals, activity):
+        # type: (tuple, ActivityByDay) -> bool
+        """
+        The saved totals are the ones Fitbit reported, so they match an
+        unchanged day exactly. Active minutes are counted from the minutes
+        and are not part of Fitbit's totals.
+        """
+        if saved_totals is None:
+            return False
+        steps, calories, _, distance = saved_totals
+        return (steps, calories, distance) == \
+            (activity.steps, activity.calories, activity.distance)
+
+    @staticmethod
+    def upsert(person_id, activities, group_ids=None):
+        # type: (int, list(ActivityByDay), list(int)) -> tuple
+        """
+        Write the daily *activities* of one person, replacing the saved rows
+        on the same dates
+        :param group_ids: the ids of the person's Groups, if already known
+        :return: a tuple of (number of rows inserted, number of rows updated)
+        """
+        if not activities:
+            return 0, 0
+
+        with transaction.atomic():
+            lock_person(person_id)
+            num_deleted, _ = ActivityByDay.objects \
+                .filter(person_id=person_id,
+                        date__in=[activity.date for activity in activities]) \
+                .delete()
+            ActivityByDay.objects.bulk_create(activities,
+                                              batch_size=BULK_BATCH_SIZE)
+            GroupActivitiesCache.invalidate(
+                person_id, [activity.date for activity in activities],
+                group_ids)
+        num_updated = min(num_deleted, len(activities))
+        return len(activities) - num_updated, num_updated
+
 
 # Standard Classes
 class PersonFitness:
     """
-    Describes a Person's Fitness
+    Describes a Person's Fitness. The Person and their Account are queried
+    unless *person* and *last_pull_time* are given.
     """
 
-    def __init__(self, person_id, activities, role=None):
-        person = Person.objects.get(pk=person_id)
+    def __init__(self, person_id, activities, role=None, person=None,
+                 last_pull_time=None):
+        if person is None:
+            person = Person.objects.get(pk=person_id)
 
-        try:
-            account = Account.objects.get(person__pk=person_id)
-            last_pull_time = account.last_pull_time
-        except Account.DoesNotExist:
-            last_pull_time = 0
+            try:
+                account = Account.objects.get(person__pk=person_id)
+                last_pull_time = account.last_pull_time
+            except Account.DoesNotExist:
+                last_pull_time = 0
 
         self.id = person_id  # type: int
         self.name = person.name  # type: str
@@ -88,8 +355,9 @@ class GroupFitness:
     Describes every Person's Fitness in a Group group_id
     """
 
-    def __init__(self, group_id, activities):
-        group = Group.objects.get(pk=group_id)
+    def __init__(self, group_id, activities, group=None):
+        if group is None:
+            group = Group.objects.get(pk=group_id)
         self.id = group.id  # type: int
         self.name = group.name  # type: str
         self.activities = activities  # type: list(PersonFitness)
@@ -114,32 +382,8 @@ class PersonFitnessFactory:
             .order_by('date') \
             .only("date", "steps", "calories", "distance"))
 
-        dict_of_activities = dict()  # type: dict
-
-        for activity_by_day in daily_activities:
-            date_string = activity_by_day.date.strftime("%Y-%m-%d")
-            dict_of_activities[date_string] = activity_by_day
-
-        list_of_daily_activities = list()  # type: list
-        this_date = start_date  # type: date
-
-        tomorrow_datetime = timezone.localtime() + DATE_DELTA_1D  # type: datetime
-        tomorrow_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow_datetime = tomorrow_datetime.astimezone(pytz.utc)
-
-        tomorrow_date = tomorrow_datetime.date()  # type: date
-
-        if tomorrow_date > end_date:
-            tomorrow_date = end_date
-
-        while this_date < tomorrow_date:
-            date_string = this_date.strftime("%Y-%m-%d")
-            if date_string in dict_of_activities:
-                activity_on_date = dict_of_activities[date_string]
-                list_of_daily_activities.append(activity_on_date)
-            else:
-                list_of_daily_activities.append(None)
-            this_date += DATE_DELTA_1D
+        list_of_daily_activities = get_list_of_daily_activities(
+            daily_activities, start_date, get_last_date(end_date))
 
         return PersonFitness(person.id, list_of_daily_activities, role)
 
@@ -165,14 +409,113 @@ class GroupFitnessFactory:
     def get(group_id, start_date, end_date):
         # type: (int, date, date) -> GroupFitness
         """
-        :return: GroupFitness between start_date to end_date
+        :return: GroupFitness between start_date to end_date. The members,
+        their Accounts and their activities are loaded with one query each,
+        whatever the size of the Group.
         """
+        memberships = list(Membership.objects
+                           .filter(group=group_id)
+                           .select_related("person", "group")
+                           .order_by("pk"))
+        if not memberships:
+            return GroupFitness(group_id, [])
+
+        person_ids = [membership.person_id for membership in memberships]
+        last_pull_times = dict(Account.objects
+                               .filter(person_id__in=person_ids)
+                               .values_list("person_id", "last_pull_time"))
+
+        daily_activities_by_person = dict()  # type: dict
+        for activity_by_day in ActivityByDay.objects \
+                .filter(date__gte=start_date) \
+                .filter(date__lte=end_date) \
+                .filter(person_id__in=person_ids) \
+                .order_by("person_id", "date") \
+                .only("person_id", "date", "steps", "calories", "distance"):
+            daily_activities_by_person \
+                .setdefault(activity_by_day.person_id, list()) \
+                .append(activity_by_day)
+
+        last_date = get_last_date(end_date)
         member_activities = []  # type: list(PersonFitness)
+        for membership in memberships:
+            list_of_daily_activities = get_list_of_daily_activities(
+                daily_activities_by_person.get(membership.person_id, []),
+                start_date, last_date)
+            member_activities.append(PersonFitness(
+                membership.person_id,
+                list_of_daily_activities,
+                membership.role,
+                person=membership.person,
+                last_pull_time=last_pull_times.get(membership.person_id, 0)))
+        return GroupFitness(group_id, member_activities,
+                            group=memberships[0].group)
+
+
+# HELPER METHODS
+def lock_person(person_id):
+    # type: (int) -> None
+    """
+    Lock the Person's row until the current transaction ends. The upserts
+    replace a Person's rows by deleting and inserting them, so they take
+    this lock first: two writers of the same rows then take turns instead
+    of both inserting and hitting the unique constraint.
+    """
+    list(Person.objects.select_for_update()
+         .filter(pk=person_id)
+         .values_list("pk", flat=True))
+
+
+def mark_tiers_stale(person_id, activity_date):
+    # type: (int, date) -> None
+    """
+    Mark the downsampled tiers of one person on one date as stale, so the
+    retention downsamples the day again from its minutes
+    """
+    ActivityByInterval.objects \
+        .filter(person_id=person_id, date=activity_date, is_stale=False) \
+        .update(is_stale=True)
+
+
+def get_last_date(end_date):
+    # type: (date) -> date
+    """
+    :return: the date after which a range ending on end_date has no
+    activities yet, i.e. tomorrow in UTC or end_date if it comes first
+    """
+    tomorrow_datetime = timezone.localtime() + DATE_DELTA_1D  # type: datetime
+    tomorrow_datetime.replace(hour=0, minute=0, second=0, microsecond=0)
+    tomorrow_datetime = tomorrow_datetime.astimezone(pytz.utc)
+
+    tomorrow_date = tomorrow_datetime.date()  # type: date
+
+    if tomorrow_date > end_date:
+        tomorrow_date = end_date
+    return tomorrow_date
+
+
+def get_list_of_daily_activities(daily_activities, start_date, last_date):
+    # type: (list(ActivityByDay), date, date) -> list
+    """
+    :return: one item per date from start_date until before last_date,
+    the ActivityByDay of that date or None if there is none
+    """
+    dict_of_activities = dict()  # type: dict
+
+    for activity_by_day in daily_activities:
+        date_string = activity_by_day.date.strftime("%Y-%m-%d")
+        dict_of_activities[date_string] = activity_by_day
+
+    list_of_daily_activities = list()  # type: list
+    this_date = start_date  # type: date
+
+    while this_date < last_date:
+        date_string = this_date.strftime("%Y-%m-%d")
+        if date_string in dict_of_activities:
+            activity_on_date = dict_of_activities[date_string]
+            list_of_daily_activities.append(activity_on_date)
+        else:
+            list_of_daily_activities.append(None)
+        this_date += DATE_DELTA_1D
 
-        for membership in Membership.objects.filter(group=group_id):
-            member_activities.append(PersonFitnessFactory.get(
-                membership.person,
-                start_date,
-                end_date,
-                membership.role))
-        return GroupFitness(group_id, member_activities)
\ No newline at end of file
+    return list_of_daily_activities
@@ -0,0 +1,169 @@
+import struct
+import zlib
+
+# CONSTANTS
+MINUTES_PER_DAY = 24 * 60  # type: int
+MASK_LENGTH = MINUTES_PER_DAY // 8  # type: int
+STEPS_FORMAT = "<%dI" % MINUTES_PER_DAY
+LEVEL_FORMAT = "<%dB" % MINUTES_PER_DAY
+FLOAT_FORMAT = "<%dd" % MINUTES_PER_DAY
+FLOAT_BITS_FORMAT = "<%dQ" % MINUTES_PER_DAY
+MAX_STEPS_PER_MINUTE = 2 ** 32 - 1  # type: int
+MAX_LEVEL = 2 ** 8 - 1  # type: int
+COMPRESSION_LEVEL = 6  # type: int
+
+
+# CLASSES
+class PackedDay(object):
+    """
+    One day of minute-by-minute activity held in fixed-length arrays of
+    MINUTES_PER_DAY items, indexed by minute of the day. *minutes* tells
+    which minutes have data.
+
+    Each array is encoded on its own and zlib-compressed: steps and level as
+    the differences between consecutive minutes, calories and distance as
+    the XOR of consecutive doubles, so the idle minutes of a day compress to
+    almost nothing and the values read back are the ones that were set.
+    """
+
+    def __init__(self):
+        self.minutes = [False] * MINUTES_PER_DAY
+        self.steps = [0] * MINUTES_PER_DAY
+        self.calories = [0.0] * MINUTES_PER_DAY
+        self.level = [0] * MINUTES_PER_DAY
+        self.distance = [0.0] * MINUTES_PER_DAY
+
+    def set_minute(self, minute, steps, calories, level, distance):
+        # type: (int, int, float, int, float) -> None
+        """
+        Raises ValueError if *steps* or *level* do not fit their arrays
+        """
+        steps, level = int(steps), int(level)
+        if not 0 <= steps <= MAX_STEPS_PER_MINUTE:
+            raise ValueError("Steps out of range: %d" % steps)
+        if not 0 <= level <= MAX_LEVEL:
+            raise ValueError("Level out of range: %d" % level)
+        self.minutes[minute] = True
+        self.steps[minute] = steps
+        self.calories[minute] = float(calories)
+        self.level[minute] = level
+        self.distance[minute] = float(distance)
+
+    def get_minutes(self):
+        # type: () -> list(int)
+        """
+        :return: the minutes of the day that have data, in order
+        """
+        return [minute for minute, has_data in enumerate(self.minutes)
+                if has_data]
+
+    def encode(self):
+        # type: () -> dict
+        """
+        :return: a dict of field name to the compressed bytes of each array
+        """
+        return {
+            "minutes": compress(encode_mask(self.minutes)),
+            "steps": compress(encode_integers(
+                STEPS_FORMAT, self.steps, MAX_STEPS_PER_MINUTE + 1)),
+            "calories": compress(encode_floats(self.calories)),
+            "level": compress(encode_integers(
+                LEVEL_FORMAT, self.level, MAX_LEVEL + 1)),
+            "distance": compress(encode_floats(self.distance)),
+        }
+
+    @staticmethod
+    def decode(minutes, steps, calories, level, distance):
+        # type: (bytes, bytes, bytes, bytes, bytes) -> PackedDay
+        packed_day = PackedDay()
+        packed_day.minutes = decode_mask(decompress(minutes))
+        packed_day.steps = decode_integers(
+            STEPS_FORMAT, decompress(steps), MAX_STEPS_PER_MINUTE + 1)
+        packed_day.calories = decode_floats(decompress(calories))
+        packed_day.level = decode_integers(
+            LEVEL_FORMAT, decompress(level), MAX_LEVEL + 1)
+        packed_day.distance = decode_floats(decompress(distance))
+        return packed_day
+
+
+# HELPER METHODS
+def get_minute_of_day(time_of_day):
+    # type: (time) -> int
+    return time_of_day.hour * 60 + time_of_day.minute
+
+
+def encode_mask(minutes):
+    # type: (list(bool)) -> bytes
+    mask = bytearray(MASK_LENGTH)
+    for minute, has_data in enumerate(minutes):
+        if has_data:
+            mask[minute // 8] |= 1 << (minute % 8)
+    return bytes(mask)
+
+
+def decode_mask(mask):
+    # type: (bytes) -> list(bool)
+    mask = bytearray(mask)
+    return [bool(mask[minute // 8] & (1 << (minute % 8)))
+            for minute in range(MINUTES_PER_DAY)]
+
+
+def encode_integers(struct_format, values, modulus):
+    # type: (str, list(int), int) -> bytes
+    """
+    :return: the differences between consecutive *values*, modulo
+    *modulus*, packed with *struct_format*
+    """
+    deltas = list()
+    previous = 0
+    for value in values:
+        deltas.append((value - previous) % modulus)
+        previous = value
+    return struct.pack(struct_format, *deltas)
+
+
+def decode_integers(struct_format, data, modulus):
+    # type: (str, bytes, int) -> list(int)
+    values = list()
+    previous = 0
+    for delta in struct.unpack(struct_format, data):
+        previous = (previous + delta) % modulus
+        values.append(previous)
+    return values
+
+
+def encode_floats(values):
+    # type: (list(float)) -> bytes
+    """
+    :return: the bits of each double XORed with those of the previous one.
+    Runs of the same value turn into zeros, and nothing is rounded.
+    """
+    bits = struct.unpack(FLOAT_BITS_FORMAT, struct.pack(FLOAT_FORMAT,
+                                                        *values))
+    previous = 0
+    deltas = list()
+    for value in bits:
+        deltas.append(value ^ previous)
+        previous = value
+    return struct.pack(FLOAT_BITS_FORMAT, *deltas)
+
+
+def decode_floats(data):
+    # type: (bytes) -> list(float)
+    previous = 0
+    bits = list()
+    for delta in struct.unpack(FLOAT_BITS_FORMAT, data):
+        previous ^= delta
+        bits.append(previous)
+    return list(struct.unpack(FLOAT_FORMAT, struct.pack(FLOAT_BITS_FORMAT,
+                                                        *bits)))
+
+
+def compress(data):
+    # type: (bytes) -> bytes
+    return zlib.compress(data, COMPRESSION_LEVEL)
+
+
+def decompress(data):
+    # type: (bytes) -> bytes
+    return zlib.decompress(bytes(data))
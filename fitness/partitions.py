@@ -0,0 +1,130 @@
+from datetime import date
+
+# CONSTANTS
+PARTITION_FUTURE = "p_future"
+PARTITION_NAME_FORMAT = "p%Y%m"
+PARTITION_BOUND_FORMAT = "%Y-%m-%d"
+ARCHIVE_TABLE_FORMAT = "{0}_{1}"
+
+
+# HELPER METHODS
+def get_month_start(day):
+    # type: (date) -> date
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, num_months):
+    # type: (date, int) -> date
+    month_index = month.year * 12 + month.month - 1 + num_months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_months(first_month, last_month):
+    # type: (date, date) -> list(date)
+    """
+    :return: the first days of every month from *first_month* to
+    *last_month*, both included
+    """
+    months = list()
+    month = get_month_start(first_month)
+    while month <= last_month:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def get_partition_name(month):
+    # type: (date) -> str
+    return month.strftime(PARTITION_NAME_FORMAT)
+
+
+def get_partition_month(partition_name):
+    # type: (str) -> date
+    """
+    :return: the month of a monthly partition, or None for p_future
+    """
+    if partition_name == PARTITION_FUTURE:
+        return None
+    return date(int(partition_name[1:5]), int(partition_name[5:7]), 1)
+
+
+def get_partition_definitions(months):
+    # type: (list(date)) -> str
+    """
+    :return: one partition per month in *months*, and p_future for the rows
+    after the last one
+    """
+    definitions = ["PARTITION %s VALUES LESS THAN ('%s')" % (
+        get_partition_name(month),
+        add_months(month, 1).strftime(PARTITION_BOUND_FORMAT))
+        for month in months]
+    definitions.append("PARTITION %s VALUES LESS THAN (MAXVALUE)"
+                       % PARTITION_FUTURE)
+    return ", ".join(definitions)
+
+
+def get_setup_sql(table, months):
+    # type: (str, list(date)) -> list(str)
+    """
+    MySQL wants the partitioning column in every unique key, so the primary
+    key becomes (id, date) before the table is partitioned by month
+    """
+    return [
+        "ALTER TABLE `%s` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `date`)"
+        % table,
+        "ALTER TABLE `%s` PARTITION BY RANGE COLUMNS(`date`) (%s)"
+        % (table, get_partition_definitions(months)),
+    ]
+
+
+def get_add_partitions_sql(table, months):
+    # type: (str, list(date)) -> list(str)
+    """
+    Split the new *months* off p_future, which must not hold rows of them
+    yet for the split to be cheap
+    """
+    if not months:
+        return []
+    return ["ALTER TABLE `%s` REORGANIZE PARTITION %s INTO (%s)" % (
+        table, PARTITION_FUTURE, get_partition_definitions(months))]
+
+
+def get_archive_table(table, partition_name):
+    # type: (str, str) -> str
+    return ARCHIVE_TABLE_FORMAT.format(table, partition_name)
+
+
+def get_archive_sql(table, partition_name):
+    # type: (str, str) -> list(str)
+    """
+    Swap the partition's rows into an archive table of their own, which can
+    be dumped and dropped separately, then drop the empty partition
+    """
+    archive_table = get_archive_table(table, partition_name)
+    return [
+        "CREATE TABLE `%s` LIKE `%s`" % (archive_table, table),
+        "ALTER TABLE `%s` REMOVE PARTITIONING" % archive_table,
+        "ALTER TABLE `%s` EXCHANGE PARTITION %s WITH TABLE `%s`"
+        % (table, partition_name, archive_table),
+        "ALTER TABLE `%s` DROP PARTITION %s" % (table, partition_name),
+    ]
+
+
+def get_drop_sql(table, partition_name):
+    # type: (str, str) -> list(str)
+    return ["ALTER TABLE `%s` DROP PARTITION %s" % (table, partition_name)]
+
+
+def get_partitions(cursor, table):
+    # type: (object, str) -> list(tuple)
+    """
+    :return: a list of (partition name, approximate number of rows) of
+    *table* in the current MySQL database, in order
+    """
+    cursor.execute(
+        "SELECT PARTITION_NAME, TABLE_ROWS "
+        "FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY PARTITION_ORDINAL_POSITION", [table])
+    return list(cursor.fetchall())
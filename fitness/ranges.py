@@ -0,0 +1,124 @@
+import base64
+
+from dateutil import parser
+
+from fitness.models import ActivityByDay, DATE_DELTA_1D
+from fitness.tiers import INTERVALS, get_activities_by_interval, \
+    get_stored_intervals
+
+# CONSTANTS
+RESOLUTION_DAY = "day"
+RESOLUTIONS = (RESOLUTION_DAY,) + tuple(str(interval)
+                                        for interval in INTERVALS)
+MAX_RANGE_DAYS = 366  # type: int
+DAYS_PER_QUERY = 500  # type: int
+INTERVAL_DAYS_PER_QUERY = 7  # type: int
+CURSOR_FORMAT = "{0}:{1}"
+
+
+# CLASSES
+class ActivityRange(object):
+    """
+    The activities of some People from start_date to end_date, either their
+    ActivityByDay or their buckets of *interval* minutes, in order of person
+    id and date. Reading continues after a (person id, date) key instead of
+    skipping rows, so every page costs the same however deep it is, and no
+    more than one query's rows are held at a time.
+    """
+
+    def __init__(self, person_ids, start_date, end_date, interval=None):
+        # type: (list(int), date, date, int) -> None
+        self.person_ids = sorted(set(person_ids))
+        self.start_date = start_date
+        self.end_date = end_date
+        self.interval = interval
+
+    def iter_days(self, after=None):
+        # type: (tuple) -> iter
+        """
+        :param after: the (person id, date) to continue after, or None
+        :return: an iterator of ((person id, date), list of activities) of
+        every day with data. The activities are ActivityByDay, or unsaved
+        ActivityByInterval for a minute resolution.
+        """
+        for person_id in self.person_ids:
+            start_date = self.start_date
+            if after is not None:
+                if person_id < after[0]:
+                    continue
+                if person_id == after[0]:
+                    start_date = max(start_date, after[1] + DATE_DELTA_1D)
+            if start_date > self.end_date:
+                continue
+            if self.interval is None:
+                days = self.__iter_daily(person_id, start_date)
+            else:
+                days = self.__iter_intervals(person_id, start_date)
+            for key, activities in days:
+                yield key, activities
+
+    def __iter_daily(self, person_id, start_date):
+        # type: (int, date) -> iter
+        while True:
+            activities = list(ActivityByDay.objects
+                              .filter(person_id=person_id,
+                                      date__gte=start_date,
+                                      date__lte=self.end_date)
+                              .order_by("date")
+                              [:DAYS_PER_QUERY])
+            for activity in activities:
+                yield (person_id, activity.date), [activity]
+            if len(activities) < DAYS_PER_QUERY:
+                return
+            start_date = activities[-1].date + DATE_DELTA_1D
+
+    def __iter_intervals(self, person_id, start_date):
+        # type: (int, date) -> iter
+        """
+        Days are read INTERVAL_DAYS_PER_QUERY at a time, each time at the
+        finest interval from self.interval up that all of them still have
+        """
+        dates = sorted(get_stored_intervals(person_id, start_date,
+                                            self.end_date))
+        for start in range(0, len(dates), INTERVAL_DAYS_PER_QUERY):
+            chunk = dates[start:start + INTERVAL_DAYS_PER_QUERY]
+            _, activities = get_activities_by_interval(
+                person_id, chunk[0], chunk[-1], min_interval=self.interval)
+            activities_by_date = dict()  # type: dict
+            for activity in activities:
+                activities_by_date.setdefault(activity.date, list()) \
+                    .append(activity)
+            for activity_date in sorted(activities_by_date):
+                yield (person_id, activity_date), \
+                    activities_by_date[activity_date]
+
+
+# HELPER METHODS
+def get_cursor(key):
+    # type: (tuple) -> str
+    """
+    :return: an opaque cursor of the (person id, date) *key*
+    """
+    person_id, activity_date = key
+    value = CURSOR_FORMAT.format(person_id, activity_date.isoformat())
+    return base64.urlsafe_b64encode(value.encode("ascii")).decode("ascii")
+
+
+def parse_cursor(cursor):
+    # type: (str) -> tuple
+    """
+    :return: the (person id, date) key of *cursor*. Raises ValueError if it
+    is not a cursor.
+    """
+    try:
+        value = base64.urlsafe_b64decode(cursor.encode("ascii")) \
+            .decode("ascii")
+        person_id, date_string = value.split(":")
+        return int(person_id), parser.parse(date_string).date()
+    except (TypeError, UnicodeError, OverflowError) as error:
+        raise ValueError(str(error))
+
+
+def get_range_days(start_date, end_date):
+    # type: (date, date) -> int
+    return (end_date - start_date).days + 1
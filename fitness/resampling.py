@@ -0,0 +1,165 @@
+import numpy as np
+
+from fitness.models import ActivityByInterval
+from fitness.packing import MINUTES_PER_DAY, get_minute_of_day
+from fitness.rollup import get_person_dates_filter
+from fitness.tiers import INTERVALS, INTERVAL_MINUTE, get_stored_intervals, \
+    iter_minutes
+
+# CONSTANTS
+AGGREGATE_SUM = "sum"
+AGGREGATE_MEAN = "mean"
+AGGREGATE_MAX = "max"
+AGGREGATES = (AGGREGATE_SUM, AGGREGATE_MEAN, AGGREGATE_MAX)
+ACTIVITY_FIELDS = ("steps", "calories", "active_minutes", "distance")
+COUNT_FIELDS = ("steps", "active_minutes")
+MAX_INTRADAY_DAYS = 31  # type: int
+MAX_BUCKETS = 1440  # type: int
+
+
+# CLASSES
+class ResolutionUnavailable(Exception):
+    """
+    Raised when a day is no longer stored as finely as the buckets need
+    """
+
+    def __init__(self, person_id, activity_date, stored_interval, interval):
+        super(ResolutionUnavailable, self).__init__(
+            "Activity of person %s on %s is only stored at %d-minute "
+            "intervals, %d-minute intervals are needed" % (
+                person_id, activity_date, stored_interval, interval))
+        self.person_id = person_id
+        self.activity_date = activity_date
+        self.stored_interval = stored_interval
+        self.interval = interval
+
+
+class IntradayResampler(object):
+    """
+    Resamples the minutes of a Person from start_date to end_date into
+    *num_buckets* buckets of the same length, with the sum, the mean per
+    minute, or the maximum of each field. Sums and means read each day from
+    the coarsest tier whose interval divides the buckets, so the rows read
+    grow with the number of buckets rather than with the minutes. Maximums
+    read the minutes, since a peak can not be told from a total. Days that
+    are no longer stored that finely raise ResolutionUnavailable. Buckets
+    without data are None.
+    """
+
+    def __init__(self, start_date, end_date, num_buckets,
+                 aggregate=AGGREGATE_SUM):
+        # type: (date, date, int, str) -> None
+        self.start_date = start_date
+        self.end_date = end_date
+        self.num_buckets = num_buckets
+        self.aggregate = aggregate
+        self.num_minutes = ((end_date - start_date).days + 1) \
+            * MINUTES_PER_DAY  # type: int
+        if aggregate == AGGREGATE_MAX:
+            self.interval = INTERVAL_MINUTE  # type: int
+        else:
+            self.interval = get_dividing_interval(self.num_minutes,
+                                                  num_buckets)
+
+    def get_bucket_minutes(self):
+        # type: () -> float
+        return self.num_minutes / float(self.num_buckets)
+
+    def get_series(self, person_id):
+        # type: (int) -> dict
+        """
+        :return: a dict of the person id, the coarsest interval that was
+        read, and a list of one value per bucket for every field
+        """
+        offsets, values, weights, interval = load_activity_arrays(
+            person_id, self.start_date, self.end_date, self.interval)
+        indexes = offsets * self.num_buckets // self.num_minutes
+        counts = np.bincount(indexes, minlength=self.num_buckets)
+
+        if self.aggregate == AGGREGATE_MAX:
+            buckets = np.full((self.num_buckets, len(ACTIVITY_FIELDS)),
+                              -np.inf)
+            np.maximum.at(buckets, indexes, values)
+        else:
+            buckets = np.column_stack([
+                np.bincount(indexes, weights=values[:, column],
+                            minlength=self.num_buckets)
+                for column in range(len(ACTIVITY_FIELDS))]).astype(float)
+            if self.aggregate == AGGREGATE_MEAN:
+                minutes = np.bincount(indexes, weights=weights,
+                                      minlength=self.num_buckets)
+                buckets /= np.maximum(minutes, 1)[:, np.newaxis]
+
+        series = dict(person_id=person_id, interval=interval)
+        has_data = (counts > 0).tolist()
+        for column, field in enumerate(ACTIVITY_FIELDS):
+            column_values = buckets[:, column]
+            if field in COUNT_FIELDS and self.aggregate != AGGREGATE_MEAN:
+                column_values = np.rint(np.where(counts > 0, column_values,
+                                                 0)).astype(int)
+            series[field] = [value if present else None for value, present
+                             in zip(column_values.tolist(), has_data)]
+        return series
+
+
+# HELPER METHODS
+def get_dividing_interval(num_minutes, num_buckets):
+    # type: (int, int) -> int
+    """
+    :return: the coarsest of INTERVALS that splits each of *num_buckets*
+    buckets of *num_minutes* into whole intervals
+    """
+    if num_minutes % num_buckets:
+        return INTERVAL_MINUTE
+    bucket_minutes = num_minutes // num_buckets
+    return max(interval for interval in INTERVALS
+               if bucket_minutes % interval == 0)
+
+
+def load_activity_arrays(person_id, start_date, end_date, interval):
+    # type: (int, date, date, int) -> tuple
+    """
+    Load the activity of one person, reading each day from the coarsest
+    stored tier that is at least as fine as *interval*. Raises
+    ResolutionUnavailable if a day is only stored at coarser intervals.
+    :return: a tuple of (array of the minutes since start_date at which
+    each row starts, array of the rows' ACTIVITY_FIELDS, array of the
+    minutes each row covers, the coarsest interval read)
+    """
+    dates_by_source = dict()  # type: dict
+    intervals_by_date = get_stored_intervals(person_id, start_date, end_date)
+    for activity_date, intervals in sorted(intervals_by_date.items()):
+        finer = [stored for stored in intervals if stored <= interval]
+        if not finer:
+            raise ResolutionUnavailable(person_id, activity_date,
+                                        min(intervals), interval)
+        dates_by_source.setdefault(max(finer), list()).append(activity_date)
+
+    offsets, values, weights = list(), list(), list()
+    for source, dates in dates_by_source.items():
+        person_dates = [(person_id, activity_date) for activity_date in dates]
+        if source == INTERVAL_MINUTE:
+            rows = [row[1:] for row in iter_minutes(person_dates)]
+        else:
+            rows = list(ActivityByInterval.objects
+                        .filter(get_person_dates_filter(person_dates),
+                                interval=source)
+                        .values_list("date", "time", *ACTIVITY_FIELDS)
+                        .order_by())
+        if not rows:
+            continue
+        columns = list(zip(*rows))
+        offsets.append(np.fromiter(
+            ((activity_date - start_date).days * MINUTES_PER_DAY
+             + get_minute_of_day(activity_time)
+             for activity_date, activity_time in zip(columns[0], columns[1])),
+            dtype=int, count=len(rows)))
+        values.append(np.column_stack([np.array(column, dtype=float)
+                                       for column in columns[2:]]))
+        weights.append(np.full(len(rows), source, dtype=float))
+
+    if not offsets:
+        return np.zeros(0, dtype=int), \
+            np.zeros((0, len(ACTIVITY_FIELDS))), np.zeros(0), None
+    return np.concatenate(offsets), np.concatenate(values), \
+        np.concatenate(weights), max(dates_by_source)
@@ -0,0 +1,165 @@
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Sum, When
+
+from fitness.models import ActivityByMinute, ActivityByDay, \
+    ActivityMinutesByDay
+
+# CONSTANTS
+ACTIVE_LEVEL = 2  # type: int
+ROLLUP_BATCH_SIZE = 500  # type: int
+
+
+# CLASSES
+class DayRollup(object):
+    """
+    Recomputes ActivityByDay from the minute data. The totals of a batch of
+    (person, date) pairs come from one grouped aggregate over
+    ActivityByMinute, which runs on MySQL, SQLite and Postgres alike.
+    Active minutes are the minutes whose level is at least ACTIVE_LEVEL.
+    Days that only have packed ActivityMinutesByDay data are summed from
+    those rows instead.
+
+    The steps, calories and distance Fitbit reports for a day are kept
+    when they are saved: the minutes stored may not cover the whole day,
+    so only the active minutes are taken from them.
+    """
+
+    @staticmethod
+    def rollup(person_dates, batch_size=ROLLUP_BATCH_SIZE):
+        # type: (iter, int) -> int
+        """
+        Recompute the ActivityByDay of every (person id, date) pair in
+        *person_dates*: the active minutes of the days already saved, and
+        every total of the others. Pairs without any minute data are left
+        alone.
+        :return: the number of ActivityByDay written
+        """
+        person_dates = sorted(set(person_dates))
+        num_written = 0
+        for start in range(0, len(person_dates), batch_size):
+            batch = person_dates[start:start + batch_size]
+            activities = DayRollup.get_activities_by_day(batch)
+            DayRollup._keep_saved_totals(batch, activities)
+            DayRollup._save(activities)
+            num_written += len(activities)
+        return num_written
+
+    @staticmethod
+    def get_active_minutes(person_dates):
+        # type: (list(tuple)) -> dict
+        """
+        :return: a dict of the (person id, date) pairs of *person_dates*
+        that have minute data to their number of active minutes
+        """
+        return dict(((activity.person_id, activity.date),
+                     activity.active_minutes)
+                    for activity in DayRollup.get_activities_by_day(
+                        sorted(set(person_dates))))
+
+    @staticmethod
+    def get_activities_by_day(person_dates):
+        # type: (list(tuple)) -> list(ActivityByDay)
+        """
+        :return: unsaved ActivityByDay of the *person_dates* that have
+        minute data
+        """
+        if not person_dates:
+            return []
+
+        totals = ActivityByMinute.objects \
+            .filter(get_person_dates_filter(person_dates)) \
+            .values("person_id", "date") \
+            .annotate(total_steps=Sum("steps"),
+                      total_calories=Sum("calories"),
+                      total_distance=Sum("distance"),
+                      active_minutes=Sum(Case(
+                          When(level__gte=ACTIVE_LEVEL, then=1),
+                          default=0,
+                          output_field=IntegerField()))) \
+            .order_by()
+
+        activities = list()
+        for total in totals:
+            activities.append(ActivityByDay(
+                person_id=total["person_id"],
+                date=total["date"],
+                steps=total["total_steps"],
+                calories=total["total_calories"],
+                active_minutes=total["active_minutes"],
+                distance=total["total_distance"]))
+
+        rolled_up = set((activity.person_id, activity.date)
+                        for activity in activities)
+        missing = [person_date for person_date in person_dates
+                   if person_date not in rolled_up]
+        if missing:
+            packed_days = ActivityMinutesByDay.objects \
+                .filter(get_person_dates_filter(missing))
+            for packed_day in packed_days:
+                activities.append(get_activity_by_day(
+                    packed_day.person_id, packed_day.date,
+                    packed_day.get_activities()))
+        return activities
+
+    @staticmethod
+    def _keep_saved_totals(person_dates, activities):
+        # type: (list(tuple), list(ActivityByDay)) -> None
+        """
+        Put the saved steps, calories and distance of *person_dates* back
+        into their rolled up *activities*
+        """
+        saved = ActivityByDay.objects \
+            .filter(get_person_dates_filter(person_dates)) \
+            .values_list("person_id", "date", "steps", "calories",
+                         "distance")
+        saved_totals = dict(((row[0], row[1]), row[2:]) for row in saved)
+        for activity in activities:
+            totals = saved_totals.get((activity.person_id, activity.date))
+            if totals is not None:
+                activity.steps, activity.calories, activity.distance = totals
+
+    @staticmethod
+    def _save(activities):
+        # type: (list(ActivityByDay)) -> None
+        activities_by_person = dict()  # type: dict
+        for activity in activities:
+            activities_by_person.setdefault(activity.person_id, list()) \
+                .append(activity)
+
+        with transaction.atomic():
+            # People are locked in order, see lock_person
+            for person_id, person_activities in \
+                    sorted(activities_by_person.items()):
+                ActivityByDay.upsert(person_id, person_activities)
+
+
+# HELPER METHODS
+def get_person_dates_filter(person_dates):
+    # type: (list(tuple)) -> Q
+    """
+    :return: a Q that matches the rows of the (person id, date) pairs, with
+    one IN clause per person
+    """
+    dates_by_person = dict()  # type: dict
+    for person_id, activity_date in person_dates:
+        dates_by_person.setdefault(person_id, set()).add(activity_date)
+
+    query = Q()
+    for person_id, dates in sorted(dates_by_person.items()):
+        query |= Q(person_id=person_id, date__in=sorted(dates))
+    return query
+
+
+def get_activity_by_day(person_id, activity_date, activities):
+    # type: (int, date, list(ActivityByMinute)) -> ActivityByDay
+    """
+    :return: an unsaved ActivityByDay summed from the minute *activities*
+    """
+    return ActivityByDay(
+        date=activity_date,
+        person_id=person_id,
+        steps=sum(activity.steps for activity in activities),
+        calories=sum(activity.calories for activity in activities),
+        active_minutes=sum(1 for activity in activities
+                           if activity.level >= ACTIVE_LEVEL),
+        distance=sum(activity.distance for activity in activities))
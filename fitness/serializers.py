@@ -1,8 +1,11 @@
 from rest_framework import serializers
+
+from api.fast_serializers import FastSerializer, NullableSerializerMixin
 from fitness.models import ActivityByDay
 
 
-class PersonActivityByDaySerializer(serializers.ModelSerializer):
+class PersonActivityByDaySerializer(NullableSerializerMixin,
+                                    serializers.ModelSerializer):
     class Meta:
         model = ActivityByDay
         fields = ("date", "steps", "calories", "distance")
@@ -19,4 +22,8 @@ class PersonFitnessSerializer(serializers.Serializer):
 class GroupFitnessSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     name = serializers.CharField(max_length=200)
-    activities = PersonFitnessSerializer(many=True, read_only=True)
\ No newline at end of file
+    activities = PersonFitnessSerializer(many=True, read_only=True)
+
+
+# FAST SERIALIZERS
+FAST_GROUP_FITNESS_SERIALIZER = FastSerializer(GroupFitnessSerializer)
@@ -1,3 +1,203 @@
-from django.test import TestCase
+import json
+import math
+import struct
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from fitness.api import stream_range_activities
+from fitness.models import ActivityByMinute, ActivityMinutesByDay, \
+    ActivityByDay
+from fitness.packing import PackedDay, MINUTES_PER_DAY, \
+    MAX_STEPS_PER_MINUTE
+from fitness.ranges import ActivityRange, RESOLUTION_DAY, parse_cursor
+from fitness.rollup import DayRollup
+from people.models import Person
+
+# CONSTANTS
+TEST_DATE = date(2019, 6, 1)
+FLOAT_EDGE_CASES = (0.0, -0.0, 0.1, 1.0 / 3, 5e-324, 2.2250738585072014e-308,
+                    1.7976931348623157e308, float("inf"), float("-inf"),
+                    float("nan"))
+
+
+# CLASSES
+class PackedDayTests(TestCase):
+
+    def test_round_trip(self):
+        packed_day = PackedDay()
+        for minute in range(0, MINUTES_PER_DAY, 7):
+            packed_day.set_minute(minute, minute * 13 % 200, minute * 0.37,
+                                  minute % 4, minute * 0.0001)
+        packed_day.set_minute(MINUTES_PER_DAY - 1, MAX_STEPS_PER_MINUTE,
+                              1.5, 3, 0.25)
+
+        decoded = PackedDay.decode(**packed_day.encode())
+        self.assertEqual(decoded.minutes, packed_day.minutes)
+        self.assertEqual(decoded.steps, packed_day.steps)
+        self.assertEqual(decoded.calories, packed_day.calories)
+        self.assertEqual(decoded.level, packed_day.level)
+        self.assertEqual(decoded.distance, packed_day.distance)
+
+    def test_round_trip_keeps_float_bits(self):
+        packed_day = PackedDay()
+        for minute, value in enumerate(FLOAT_EDGE_CASES):
+            packed_day.set_minute(minute, 0, value, 0, -value)
+
+        decoded = PackedDay.decode(**packed_day.encode())
+        for minute, value in enumerate(FLOAT_EDGE_CASES):
+            self.assertEqual(get_bits(decoded.calories[minute]),
+                             get_bits(value))
+            self.assertEqual(get_bits(decoded.distance[minute]),
+                             get_bits(-value))
+        self.assertTrue(math.isnan(decoded.calories[len(FLOAT_EDGE_CASES)
+                                                    - 1]))
+
+    def test_out_of_range_values_raise(self):
+        packed_day = PackedDay()
+        with self.assertRaises(ValueError):
+            packed_day.set_minute(0, MAX_STEPS_PER_MINUTE + 1, 0.0, 0, 0.0)
+        with self.assertRaises(ValueError):
+            packed_day.set_minute(0, -1, 0.0, 0, 0.0)
+        with self.assertRaises(ValueError):
+            packed_day.set_minute(0, 0, 0.0, 256, 0.0)
+
+
+class UpsertTests(TestCase):
+
+    def setUp(self):
+        self.person = create_person("Upsert")
+
+    def test_minute_upsert_is_idempotent(self):
+        activities = get_minutes(self.person.id, TEST_DATE, range(60))
+        self.assertEqual(ActivityByMinute.upsert(
+            self.person.id, TEST_DATE, activities), (60, 0))
+        self.assertEqual(ActivityByMinute.upsert(
+            self.person.id, TEST_DATE,
+            get_minutes(self.person.id, TEST_DATE, range(60))), (0, 60))
+        self.assertEqual(ActivityByMinute.objects
+                         .filter(person=self.person).count(), 60)
+
+    def test_packed_upsert_is_idempotent(self):
+        self.assertEqual(ActivityMinutesByDay.upsert(
+            self.person.id, TEST_DATE,
+            get_minutes(self.person.id, TEST_DATE, range(60))), (60, 0))
+        self.assertEqual(ActivityMinutesByDay.upsert(
+            self.person.id, TEST_DATE,
+            get_minutes(self.person.id, TEST_DATE, range(30, 90))), (30, 30))
+
+        activities = ActivityMinutesByDay.get_activities_between(
+            self.person.id, TEST_DATE, TEST_DATE)
+        self.assertEqual(len(activities), 90)
+        self.assertEqual(ActivityMinutesByDay.objects
+                         .filter(person=self.person).count(), 1)
+
+    def test_day_upsert_is_idempotent(self):
+        for expected in ((1, 0), (0, 1)):
+            self.assertEqual(ActivityByDay.upsert(
+                self.person.id, [get_day(self.person.id, TEST_DATE, 100)]),
+                expected)
+        self.assertEqual(ActivityByDay.objects
+                         .filter(person=self.person).count(), 1)
+
+
+class DayRollupTests(TestCase):
+
+    def setUp(self):
+        self.person = create_person("Rollup")
+        minutes = get_minutes(self.person.id, TEST_DATE, range(60))
+        ActivityByMinute.upsert(self.person.id, TEST_DATE, minutes)
+        self.minute_steps = sum(activity.steps for activity in minutes)
+        self.active_minutes = sum(1 for activity in minutes
+                                  if activity.level >= 2)
+
+    def test_rollup_keeps_summary_totals(self):
+        ActivityByDay.upsert(self.person.id,
+                             [get_day(self.person.id, TEST_DATE, 9999)])
+
+        self.assertEqual(DayRollup.rollup([(self.person.id, TEST_DATE)]), 1)
+        activity = ActivityByDay.objects.get(person=self.person)
+        self.assertEqual(activity.steps, 9999)
+        self.assertEqual(activity.calories, 2000.0)
+        self.assertEqual(activity.active_minutes, self.active_minutes)
+
+    def test_rollup_sums_days_without_summary(self):
+        DayRollup.rollup([(self.person.id, TEST_DATE)])
+        activity = ActivityByDay.objects.get(person=self.person)
+        self.assertEqual(activity.steps, self.minute_steps)
+        self.assertEqual(activity.active_minutes, self.active_minutes)
+
+
+@override_settings(REST_FRAMEWORK={
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",)})
+class RangePagingTests(TestCase):
+
+    def setUp(self):
+        self.people = [create_person("Range %d" % i) for i in range(2)]
+        for person in self.people:
+            ActivityByDay.upsert(person.id, [
+                get_day(person.id, TEST_DATE + timedelta(days=i), i)
+                for i in range(3)])
+
+    def get_page(self, person_ids, limit, after=None):
+        activity_range = ActivityRange(person_ids, TEST_DATE,
+                                       TEST_DATE + timedelta(days=6))
+        return json.loads(b"".join(stream_range_activities(
+            activity_range, RESOLUTION_DAY, after, limit)).decode("utf-8"))
+
+    def test_page_ending_on_last_day_has_no_cursor(self):
+        page = self.get_page([self.people[0].id], 3)
+        self.assertEqual(len(page["activities"]), 3)
+        self.assertIsNone(page["next_cursor"])
+
+    def test_page_before_last_day_has_cursor(self):
+        person_id = self.people[0].id
+        page = self.get_page([person_id], 2)
+        self.assertEqual(len(page["activities"]), 2)
+        self.assertEqual(parse_cursor(page["next_cursor"]),
+                         (person_id, TEST_DATE + timedelta(days=1)))
+
+        page = self.get_page([person_id], 2,
+                             parse_cursor(page["next_cursor"]))
+        self.assertEqual([row["date"] for row in page["activities"]],
+                         [(TEST_DATE + timedelta(days=2)).isoformat()])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_page_ending_on_a_person_continues_to_the_next(self):
+        person_ids = [person.id for person in self.people]
+        page = self.get_page(person_ids, 3)
+        self.assertIsNotNone(page["next_cursor"])
+
+        page = self.get_page(person_ids, 3,
+                             parse_cursor(page["next_cursor"]))
+        self.assertEqual(set(row["person_id"] for row in page["activities"]),
+                         set([max(person_ids)]))
+        self.assertIsNone(page["next_cursor"])
+
+
+# HELPER METHODS
+def create_person(name):
+    # type: (str) -> Person
+    return Person.objects.create(name=name, internal_name=name,
+                                 birth_date=date(2000, 1, 1))
+
+
+def get_minutes(person_id, activity_date, minutes):
+    # type: (int, date, iter) -> list(ActivityByMinute)
+    return [ActivityByMinute(person_id=person_id, date=activity_date,
+                             time=time(minute // 60, minute % 60),
+                             steps=minute % 11, calories=1.25,
+                             level=minute % 4, distance=0.001)
+            for minute in minutes]
+
+
+def get_day(person_id, activity_date, steps):
+    # type: (int, date, int) -> ActivityByDay
+    return ActivityByDay(person_id=person_id, date=activity_date,
+                         steps=steps, calories=2000.0, active_minutes=0,
+                         distance=1.5)
+
+
+def get_bits(value):
+    # type: (float) -> int
+    return struct.unpack("<Q", struct.pack("<d", value))[0]
@@ -0,0 +1,306 @@
+from datetime import timedelta, time as time_of_day
+
+from django.db import transaction
+from django.utils import timezone
+
+from fitness.models import ActivityByMinute, ActivityMinutesByDay, \
+    ActivityByInterval
+from fitness.packing import MINUTES_PER_DAY, get_minute_of_day
+from fitness.rollup import ACTIVE_LEVEL, get_person_dates_filter
+from fitness_connector import settings as fitbit_settings
+
+# CONSTANTS
+INTERVAL_MINUTE = 1  # type: int
+INTERVAL_QUARTER_HOUR = 15  # type: int
+INTERVAL_HOUR = 60  # type: int
+INTERVALS = (INTERVAL_MINUTE, INTERVAL_QUARTER_HOUR, INTERVAL_HOUR)
+TIER_INTERVALS = (INTERVAL_QUARTER_HOUR, INTERVAL_HOUR)
+DOWNSAMPLE_AFTER_DAYS = getattr(
+    fitbit_settings, "DOWNSAMPLE_AFTER_DAYS", 7)  # type: int
+MINUTE_RETENTION_DAYS = getattr(
+    fitbit_settings, "MINUTE_RETENTION_DAYS", 180)  # type: int
+QUARTER_HOUR_RETENTION_DAYS = getattr(
+    fitbit_settings, "QUARTER_HOUR_RETENTION_DAYS", 730)  # type: int
+DOWNSAMPLE_BATCH_SIZE = 100  # type: int
+DELETE_CHUNK_SIZE = 10000  # type: int
+
+
+# CLASSES
+class TierDownsampler(object):
+    """
+    Sums the minute data of ActivityByMinute, or of ActivityMinutesByDay for
+    days that are only packed, into the 15-minute and hourly tiers of
+    ActivityByInterval
+    """
+
+    @staticmethod
+    def downsample(person_dates, batch_size=DOWNSAMPLE_BATCH_SIZE):
+        # type: (iter, int) -> int
+        """
+        Rewrite both tiers of every (person id, date) pair in
+        *person_dates*, reading *batch_size* days at a time
+        :return: the number of ActivityByInterval written
+        """
+        person_dates = sorted(set(person_dates))
+        num_written = 0
+        for start in range(0, len(person_dates), batch_size):
+            batch = person_dates[start:start + batch_size]
+            buckets_by_interval = dict(
+                (interval, dict()) for interval in TIER_INTERVALS)
+            for person_id, activity_date, activity_time, steps, calories, \
+                    active_minutes, distance in iter_minutes(batch):
+                minute = get_minute_of_day(activity_time)
+                for interval, buckets in buckets_by_interval.items():
+                    add_to_bucket(buckets, interval,
+                                  (person_id, activity_date, minute), steps,
+                                  calories, active_minutes, distance)
+            num_written += TierDownsampler._save(batch, buckets_by_interval)
+        return num_written
+
+    @staticmethod
+    def _save(person_dates, buckets_by_interval):
+        # type: (list(tuple), dict) -> int
+        dates_by_person = dict()  # type: dict
+        for person_id, activity_date in person_dates:
+            dates_by_person.setdefault(person_id, list()).append(activity_date)
+
+        num_written = 0
+        with transaction.atomic():
+            for interval, buckets in buckets_by_interval.items():
+                activities = get_bucket_activities(buckets, interval)
+                for person_id, dates in dates_by_person.items():
+                    num_written += ActivityByInterval.upsert(
+                        person_id, interval, dates,
+                        [activity for activity in activities
+                         if activity.person_id == person_id])
+        return num_written
+
+
+class Retention(object):
+    """
+    Keeps the storage of intraday data bounded. Days older than
+    *downsample_after_days* are downsampled into the 15-minute and hourly
+    tiers, minutes older than *minute_days* are deleted, and so are
+    15-minute intervals older than *quarter_hour_days*. The hourly tier is
+    kept. Rows are deleted *chunk_size* at a time, so no single DELETE locks
+    the tables for long.
+    """
+
+    def __init__(self, downsample_after_days=DOWNSAMPLE_AFTER_DAYS,
+                 minute_days=MINUTE_RETENTION_DAYS,
+                 quarter_hour_days=QUARTER_HOUR_RETENTION_DAYS,
+                 chunk_size=DELETE_CHUNK_SIZE, today=None):
+        if not downsample_after_days <= minute_days <= quarter_hour_days:
+            raise ValueError("Minutes must be downsampled before they are "
+                             "deleted, and kept no longer than the "
+                             "15-minute tier")
+        today = today or timezone.localdate()
+        self.downsample_before = today - timedelta(days=downsample_after_days)
+        self.minutes_before = today - timedelta(days=minute_days)
+        self.quarter_hours_before = today - timedelta(days=quarter_hour_days)
+        self.chunk_size = chunk_size
+
+    def run(self, dry_run=False):
+        # type: (bool) -> dict
+        """
+        :return: a dict of the number of days downsampled and of the
+        minutes, packed days and 15-minute intervals deleted, or to be
+        deleted with *dry_run*
+        """
+        pending = self.get_pending_days()
+        expired = [
+            ActivityByMinute.objects.filter(date__lt=self.minutes_before),
+            ActivityMinutesByDay.objects.filter(date__lt=self.minutes_before),
+            ActivityByInterval.objects.filter(
+                interval=INTERVAL_QUARTER_HOUR,
+                date__lt=self.quarter_hours_before),
+        ]
+
+        if dry_run:
+            num_deleted = [queryset.count() for queryset in expired]
+        else:
+            TierDownsampler.downsample(pending)
+            num_deleted = [delete_in_chunks(queryset, self.chunk_size)
+                           for queryset in expired]
+        return {
+            "days_downsampled": len(pending),
+            "minutes_deleted": num_deleted[0],
+            "packed_days_deleted": num_deleted[1],
+            "quarter_hours_deleted": num_deleted[2],
+        }
+
+    def get_pending_days(self):
+        # type: () -> set
+        """
+        :return: the (person id, date) pairs old enough to be downsampled
+        that have minute data but no hourly tier yet, or a stale one
+        """
+        person_dates = set()
+        for model in (ActivityByMinute, ActivityMinutesByDay):
+            person_dates.update(model.objects
+                                .filter(date__lt=self.downsample_before)
+                                .values_list("person_id", "date")
+                                .distinct()
+                                .order_by())
+        person_dates.difference_update(
+            ActivityByInterval.objects
+            .filter(interval=INTERVAL_HOUR, date__lt=self.downsample_before,
+                    is_stale=False)
+            .values_list("person_id", "date")
+            .distinct()
+            .order_by())
+        return person_dates
+
+
+# HELPER METHODS
+def get_activities_by_interval(person_id, start_date, end_date,
+                               max_points=None, min_interval=INTERVAL_MINUTE):
+    # type: (int, date, date, int, int) -> tuple
+    """
+    Read the activity of one person from *start_date* to *end_date* at the
+    finest interval, from *min_interval* up, that every day with data still
+    has, and that yields no more than *max_points* intervals. Each day is
+    read from the coarsest stored tier that is at least as fine, so long
+    ranges read few rows.
+    :return: a tuple of (interval in minutes, list of unsaved
+    ActivityByInterval in order of date and time)
+    """
+    num_days = (end_date - start_date).days + 1
+    intervals_by_date = get_stored_intervals(person_id, start_date, end_date)
+    interval = min_interval
+    if max_points:
+        interval = max(interval, next(
+            (candidate for candidate in INTERVALS
+             if num_days * MINUTES_PER_DAY // candidate <= max_points),
+            INTERVAL_HOUR))
+    for intervals in intervals_by_date.values():
+        interval = max(interval, min(intervals))
+
+    dates_by_source = dict()  # type: dict
+    for activity_date, intervals in intervals_by_date.items():
+        source = max(stored for stored in intervals if stored <= interval)
+        dates_by_source.setdefault(source, list()).append(activity_date)
+
+    buckets = dict()  # type: dict
+    person_dates = [(person_id, activity_date) for activity_date
+                    in dates_by_source.pop(INTERVAL_MINUTE, [])]
+    for person_id, activity_date, activity_time, steps, calories, \
+            active_minutes, distance in iter_minutes(person_dates):
+        add_to_bucket(buckets, interval, (
+            person_id, activity_date, get_minute_of_day(activity_time)),
+            steps, calories, active_minutes, distance)
+    for source, dates in dates_by_source.items():
+        for activity in ActivityByInterval.objects.filter(
+                person_id=person_id, interval=source, date__in=dates):
+            add_to_bucket(buckets, interval, (
+                person_id, activity.date, get_minute_of_day(activity.time)),
+                activity.steps, activity.calories, activity.active_minutes,
+                activity.distance)
+    return interval, get_bucket_activities(buckets, interval)
+
+
+def get_stored_intervals(person_id, start_date, end_date):
+    # type: (int, date, date) -> dict
+    """
+    :return: a dict of every date with data to the set of intervals stored
+    for it. Stale tiers are left out, the minutes of their days are read
+    instead.
+    """
+    intervals_by_date = dict()  # type: dict
+    for model in (ActivityByMinute, ActivityMinutesByDay):
+        for activity_date in model.objects \
+                .filter(person_id=person_id, date__gte=start_date,
+                        date__lte=end_date) \
+                .values_list("date", flat=True).distinct().order_by():
+            intervals_by_date.setdefault(activity_date, set()) \
+                .add(INTERVAL_MINUTE)
+    for activity_date, interval in ActivityByInterval.objects \
+            .filter(person_id=person_id, date__gte=start_date,
+                    date__lte=end_date, is_stale=False) \
+            .values_list("date", "interval").distinct().order_by():
+        intervals_by_date.setdefault(activity_date, set()).add(interval)
+    return intervals_by_date
+
+
+def iter_minutes(person_dates):
+    # type: (list(tuple)) -> iter
+    """
+    :return: an iterator of (person id, date, time, steps, calories, active
+    minutes, distance) of the minutes of the (person id, date) pairs, read
+    from ActivityMinutesByDay for the pairs without ActivityByMinute rows
+    """
+    if not person_dates:
+        return
+    found = set()
+    for person_id, activity_date, activity_time, steps, calories, level, \
+            distance in ActivityByMinute.objects \
+            .filter(get_person_dates_filter(person_dates)) \
+            .values_list("person_id", "date", "time", "steps", "calories",
+                         "level", "distance") \
+            .order_by():
+        found.add((person_id, activity_date))
+        yield person_id, activity_date, activity_time, steps, calories, \
+            int(level >= ACTIVE_LEVEL), distance
+
+    missing = [person_date for person_date in person_dates
+               if person_date not in found]
+    if missing:
+        for packed_day in ActivityMinutesByDay.objects \
+                .filter(get_person_dates_filter(missing)):
+            for activity in packed_day.get_activities():
+                yield activity.person_id, activity.date, activity.time, \
+                    activity.steps, activity.calories, \
+                    int(activity.level >= ACTIVE_LEVEL), activity.distance
+
+
+def add_to_bucket(buckets, interval, key, steps, calories, active_minutes,
+                  distance):
+    # type: (dict, int, tuple, int, float, int, float) -> None
+    """
+    Add to the totals in *buckets* of the interval that holds the minute
+    of *key*, a tuple of (person id, date, minute of the day)
+    """
+    person_id, activity_date, minute = key
+    start = minute - minute % interval
+    totals = buckets.setdefault((person_id, activity_date, start),
+                                [0, 0.0, 0, 0.0])
+    totals[0] += steps
+    totals[1] += calories
+    totals[2] += active_minutes
+    totals[3] += distance
+
+
+def get_bucket_activities(buckets, interval):
+    # type: (dict, int) -> list(ActivityByInterval)
+    """
+    :return: unsaved ActivityByInterval of the totals in *buckets*, in order
+    of person, date and time
+    """
+    activities = list()
+    for (person_id, activity_date, minute), totals in sorted(buckets.items()):
+        activities.append(ActivityByInterval(
+            date=activity_date,
+            time=time_of_day(minute // 60, minute % 60),
+            person_id=person_id,
+            interval=interval,
+            steps=totals[0],
+            calories=totals[1],
+            active_minutes=totals[2],
+            distance=totals[3]))
+    return activities
+
+
+def delete_in_chunks(queryset, chunk_size=DELETE_CHUNK_SIZE):
+    # type: (QuerySet, int) -> int
+    """
+    Delete the rows of *queryset* by primary key, *chunk_size* at a time
+    :return: the number of rows deleted
+    """
+    model = queryset.model
+    num_deleted = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:chunk_size])
+        if not ids:
+            return num_deleted
+        model.objects.filter(pk__in=ids).delete()
+        num_deleted += len(ids)
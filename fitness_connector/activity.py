@@ -1,13 +1,24 @@
-from datetime import timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, time as time_of_day
 from dateutil import parser
 from dateutil.rrule import rrule, DAILY
-from django.db.models import Sum
+from django.db import connection
 from django.utils import timezone
-from fitbit.api import Fitbit
-from fitness.models import ActivityByMinute, ActivityByDay
+from oauthlib.oauth2 import TokenExpiredError
+from fitness.cache import GroupActivitiesCache
+from fitness.models import ActivityByMinute, ActivityByDay, \
+    ActivityMinutesByDay
+from fitness.rollup import DayRollup
+from fitness_connector.clients import get_client_factory
 from fitness_connector.device import Device
+from fitness_connector.metrics import SyncMetrics
 from fitness_connector.models import Account
+from fitness_connector.planner import PLAN_FIELDS, PullPlanner
+from fitness_connector.tokens import get_token_manager, \
+    TOKEN_REFRESH_LEAD_SECONDS
 from fitness_connector import settings as fitbit_settings
+from people.signals import get_group_ids
 
 RES_ID_STEPS = "activities/steps"
 RES_ID_CALORIES = "activities/calories"
@@ -17,6 +28,9 @@ RES_IDS_INTRADAY = [
     RES_ID_CALORIES,
     RES_ID_DISTANCE,
 ]
+KEY_STEPS = "activities-steps"
+KEY_CALORIES = "activities-calories"
+KEY_DISTANCE = "activities-distance"
 KEY_INTRA_STEPS = "activities-steps-intraday"
 KEY_INTRA_CALORIES = "activities-calories-intraday"
 KEY_INTRA_DISTANCE = "activities-distance-intraday"
@@ -25,6 +39,21 @@ KEY_DETAIL_LEVEL = "1min"
 TIME_START_OF_DAY = "00:00"
 TIME_END_OF_DAY = "23:59"
 DATETIME_ONE_DAY = timedelta(days=1)
+DATE_FORMAT = "%Y-%m-%d"
+TIME_FORMAT = "%H:%M:%S"
+MINUTES_OF_DAY = dict(
+    (one_minute.strftime(TIME_FORMAT), one_minute)
+    for one_minute in (time_of_day(hour, minute)
+                       for hour in range(24) for minute in range(60)))
+INTRADAY_DAYS_IN_FLIGHT = getattr(
+    fitbit_settings, "INTRADAY_DAYS_IN_FLIGHT", 2)  # type: int
+INTRADAY_MAX_WORKERS = len(RES_IDS_INTRADAY) * INTRADAY_DAYS_IN_FLIGHT
+PULL_FIELDS = ["last_pull_time"] + PLAN_FIELDS
+MINUTE_STORAGE_ROWS = "rows"
+MINUTE_STORAGE_PACKED = "packed"
+MINUTE_STORAGE_BOTH = "both"
+MINUTE_STORAGE = getattr(
+    fitbit_settings, "MINUTE_STORAGE", MINUTE_STORAGE_ROWS)  # type: str
 
 
 class PersonActivity(object):
@@ -32,146 +61,333 @@ class PersonActivity(object):
     Manages a person's fitbit activity
     """
     
-    def __init__(self, person_id):
+    def __init__(self, person_id, throttle=None, metrics=None):
         """
-        Return the object whose person_id is *person_id*
+        Return the object whose person_id is *person_id*. If *throttle* is
+        given, every Fitbit call waits on throttle.acquire() first and every
+        response is passed to throttle.observe(). The timings and row counts
+        of the sync are recorded in *metrics*.
         """
         self.person_id = person_id
+        self.throttle = throttle
+        self.metrics = metrics if metrics is not None else SyncMetrics()
         self.account = Account.objects.get(person__pk=person_id)
-        self.fitbit = Fitbit (
-            fitbit_settings.CLIENT_ID, 
-            fitbit_settings.CLIENT_SECRET,
-            access_token = self.account.access_token,
-            refresh_token = self.account.refresh_token,
-            expires_at = self.account.get_expires_at(),
-            refresh_cb = self._refresh_cb,
-        )
+        self.fitbit = get_client_factory().get_fitbit(self.account)
+        # Fitbit answers 401 expired_token by calling client.refresh_token()
+        self.fitbit.client.refresh_token = self._refresh_token
         self.device = None
+        self.group_ids = None
+
+        if self.throttle is not None:
+            self.fitbit.client.session.hooks["response"].append(
+                self.throttle.observe)
 
     def pull_recent_data(self):
         """
-        Pull the person's data since the last pull and save to database
+        Pull the person's data since the last pull and save to database.
+        Nothing is pulled if the device has not synced since the last pull.
         """
-        self.device = Device(self.fitbit, self.account)
-        self._pull_intraday_data(
-            self.account.last_pull_time, 
-            self.device.last_sync_time
-        )
+        self._refresh_token_if_expiring()
+        self.device = Device(self.fitbit, self.account, self.throttle,
+                             self.metrics)
+        has_new_data = PullPlanner.has_new_data(self.account,
+                                                self.device.last_sync_time)
+        PullPlanner.plan_next_pull(self.account, self.device.last_sync_time)
+
+        if has_new_data:
+            self._pull_intraday_data(
+                self.account.last_pull_time,
+                self.device.last_sync_time
+            )
+        else:
+            self.account.save(update_fields=PLAN_FIELDS)
         return self.device.last_sync_time
-    
+
+    def pull_dates(self, dates):
+        # type: (list(date)) -> datetime
+        """
+        Pull the person's whole-day data on each of *dates* and save to
+        database. Used when Fitbit notifies us which dates have changed, so
+        the device does not need to be asked for its last sync time.
+        The last pull time is left alone, since the days between it and
+        *dates* may not have been pulled.
+        :return: the time of the pull
+        """
+        pull_time = timezone.now()
+        self._pull_list_of_dates([{
+            'date': date.strftime("%Y-%m-%d"),
+            'start_time': TIME_START_OF_DAY,
+            'end_time': TIME_END_OF_DAY
+        } for date in sorted(dates)])
+        return pull_time
+
+    def subscribe(self, subscriber_id, collection):
+        """
+        Ask Fitbit to notify *subscriber_id* whenever the person's
+        *collection* changes. The Account's pk is the subscription id.
+        """
+        return self._call_api(
+            self.fitbit.subscription,
+            str(self.account.pk),
+            subscriber_id,
+            collection=collection,
+        )
+
     def _pull_intraday_data(self, start_datetime, end_datetime):
         """
         Given a start and end datetimes, pull data from Fitbit and
         save to database
         """
         dates = self._get_list_of_dates(start_datetime, end_datetime)
+        self._pull_list_of_dates(dates, self.device.last_sync_time)
 
-        for date in dates:
-            self._pull_one_day_intraday_data(
-                date['date'],
-                date['start_time'],
-                date['end_time']
-            )
-                
-    def _pull_one_day_intraday_data(self, date_string, start_time, end_time):
+    def _pull_list_of_dates(self, dates, pull_time=None):
         """
-        Given a date plus start and end time, pull activities data and save
-        them to database
+        Pull and save the data of *dates*, then set the Account's last pull
+        time to *pull_time* if it is given. The resources of
+        INTRADAY_DAYS_IN_FLIGHT days are fetched concurrently, then the
+        minutes of each day are saved in order, and the daily totals of the
+        window are written with one upsert. The totals are Fitbit's daily
+        summaries, with the active minutes counted from the saved minutes.
+        When catching up on more than one day, the daily summaries of all the
+        dates are fetched first with one range call per resource, and only
+        the days whose totals changed get their intraday data pulled.
+        A day's totals are saved only after its minutes, and the last pull
+        time only moves once every day is saved, so a pull that fails
+        halfway is retried from where it stopped.
         """
-        one_day_data = {}
+        self._refresh_token_if_expiring()
+        summaries = None
+        pulled_dates = dates
+
+        if len(dates) > 1:
+            summaries = self._pull_daily_summaries(dates)
+            dates = [date for date in dates if date['date'] in summaries]
+
+        if not dates:
+            GroupActivitiesCache.invalidate(
+                self.account.person_id,
+                [self._get_date(date['date']) for date in pulled_dates],
+                self._get_group_ids())
+
+        with ThreadPoolExecutor(max_workers=INTRADAY_MAX_WORKERS) as executor:
+            for start in range(0, len(dates), INTRADAY_DAYS_IN_FLIGHT):
+                window = dates[start:start + INTRADAY_DAYS_IN_FLIGHT]
+                pending_days = [
+                    self._fetch_one_day_intraday_data(
+                        executor,
+                        date['date'],
+                        date['start_time'],
+                        date['end_time']
+                    ) for date in window]
+
+                window_summaries = list()
+                for date, pending_day in zip(window, pending_days):
+                    one_day_data = dict(
+                        (key, future.result())
+                        for key, future in pending_day.items())
+                    self._save_one_day_intraday_data(date['date'],
+                                                     one_day_data)
+                    if summaries:
+                        window_summaries.append(summaries[date['date']])
+                    else:
+                        window_summaries.extend(
+                            self._get_daily_summaries(one_day_data))
+                self._save_daily_summaries(window_summaries)
+
+        if pull_time is not None:
+            self.account.last_pull_time = pull_time
+            self.account.save(update_fields=PULL_FIELDS)
+
+    def _pull_daily_summaries(self, dates):
+        """
+        Fetch the daily totals from the first to the last of *dates* with one
+        range call per resource. Nothing is saved, so the totals of a day
+        whose minutes fail to be pulled still differ on the next pull.
+        :return: a dict of the date strings whose totals changed to their
+        unsaved ActivityByDay
+        """
+        first_date = dates[0]['date']
+        last_date = dates[len(dates) - 1]['date']
+        with ThreadPoolExecutor(max_workers=len(RES_IDS_INTRADAY)) as executor:
+            pending_range = dict((key, executor.submit(
+                self._fetch_range_resource, key, first_date, last_date))
+                for key in RES_IDS_INTRADAY)
+            range_data = dict((key, future.result())
+                              for key, future in pending_range.items())
+
+        pulled_dates = set(date['date'] for date in dates)
+        summaries = self._get_daily_summaries(range_data)
+        summaries = [summary for summary in summaries
+                     if summary.date.strftime("%Y-%m-%d") in pulled_dates]
+        changed_summaries = ActivityByDay.get_changed(
+            self.account.person_id, summaries)
+        return dict((summary.date.strftime("%Y-%m-%d"), summary)
+                    for summary in changed_summaries)
+
+    def _get_daily_summaries(self, range_data):
+        """
+        :return: a list of unsaved ActivityByDay from the range responses,
+        or from the totals of one day's intraday responses
+        """
+        summaries = list()
+        for steps, calories, distance in zip(
+                range_data[RES_ID_STEPS][KEY_STEPS],
+                range_data[RES_ID_CALORIES][KEY_CALORIES],
+                range_data[RES_ID_DISTANCE][KEY_DISTANCE]):
+            summaries.append(ActivityByDay(
+                date=self._get_date(steps["dateTime"]),
+                person_id=self.account.person_id,
+                steps=int(steps["value"]),
+                calories=float(calories["value"]),
+                active_minutes=0,
+                distance=float(distance["value"]),
+            ))
+        return summaries
+
+    def _fetch_one_day_intraday_data(self, executor, date_string, start_time,
+                                     end_time):
+        """
+        Submit the intraday requests of one day to *executor*
+        :return: a dict of resource id to the Future of its response
+        """
+        pending_day = {}
         for key in RES_IDS_INTRADAY:
-            one_day_data[key] = self.fitbit.intraday_time_series(
+            pending_day[key] = executor.submit(
+                self._fetch_intraday_resource,
+                key,
+                date_string,
+                start_time,
+                end_time,
+            )
+        return pending_day
+
+    def _fetch_range_resource(self, key, first_date, last_date):
+        try:
+            return self._call_api(
+                self.fitbit.time_series,
+                key,
+                base_date = first_date,
+                end_date = last_date,
+            )
+        finally:
+            connection.close()
+
+    def _fetch_intraday_resource(self, key, date_string, start_time, end_time):
+        try:
+            return self._call_api(
+                self.fitbit.intraday_time_series,
                 key,
                 base_date = date_string,
                 detail_level = KEY_DETAIL_LEVEL,
                 start_time = start_time,
                 end_time = end_time,
             )
+        finally:
+            # Only runs on executor threads, which may have opened a database
+            # connection
+            connection.close()
 
-        self._save_one_day_data(date_string, one_day_data)
-        self._save_one_day_intraday_data(date_string, one_day_data)
-        # self._update_one_day_data(date_string)
-
-        # TODO this may introduce bugs
-        self.account.last_pull_time = self.device.last_sync_time
-        self.account.save()
-        
-        return(1)
-
-    def _save_one_day_data(self, date_string, one_day_data):
-         try:
-             one_day_activity = ActivityByDay.objects.get(
-                 date = self._get_tz_aware(date_string),
-                 person_id=self.account.person_id
-             )
-         except ActivityByDay.DoesNotExist:
-             one_day_activity = ActivityByDay(
-                 date = self._get_tz_aware(date_string),
-                 person_id = self.account.person_id
-             )
-
-         one_day_activity.steps = one_day_data[RES_ID_STEPS]["activities-steps"][0]["value"]
-         one_day_activity.calories = one_day_data[RES_ID_CALORIES]["activities-calories"][0]["value"]
-         one_day_activity.active_minutes = 0
-         one_day_activity.distance = one_day_data[RES_ID_DISTANCE]["activities-distance"][0]["value"]
-         one_day_activity.save()
+    def _save_daily_summaries(self, summaries):
+        """
+        Save Fitbit's daily *summaries*, with the active minutes of each day
+        counted from its saved minutes
+        """
+        with self.metrics.time_db_write():
+            active_minutes = DayRollup.get_active_minutes(
+                [(self.account.person_id, summary.date)
+                 for summary in summaries])
+            for summary in summaries:
+                summary.active_minutes = active_minutes.get(
+                    (summary.person_id, summary.date), 0)
+            self.metrics.add_rows(*ActivityByDay.upsert(
+                self.account.person_id, summaries, self._get_group_ids()))
 
     def _save_one_day_intraday_data(self, date_string, one_day_data):
-        step_data = self._get_dataset(one_day_data, RES_ID_STEPS, KEY_INTRA_STEPS)
-        calorie_data = self._get_dataset(one_day_data, RES_ID_CALORIES, KEY_INTRA_CALORIES)
-        distance_data = self._get_dataset(one_day_data, RES_ID_DISTANCE, KEY_INTRA_DISTANCE)
+        activity_date = self._get_date(date_string)
+        activities_1m_in_1d = self._get_activities_1m(
+            self.account.person_id, activity_date, one_day_data)
+
+        with self.metrics.time_db_write():
+            if MINUTE_STORAGE != MINUTE_STORAGE_PACKED:
+                self.metrics.add_rows(*ActivityByMinute.upsert(
+                    self.account.person_id,
+                    activity_date,
+                    activities_1m_in_1d))
+            if MINUTE_STORAGE != MINUTE_STORAGE_ROWS:
+                self.metrics.add_rows(*ActivityMinutesByDay.upsert(
+                    self.account.person_id,
+                    activity_date,
+                    activities_1m_in_1d))
+
+    @staticmethod
+    def _get_activities_1m(person_id, activity_date, one_day_data):
+        """
+        :return: a list of unsaved ActivityByMinute from one day's intraday
+        responses
+        """
+        step_data = PersonActivity._get_dataset(one_day_data, RES_ID_STEPS, KEY_INTRA_STEPS)
+        calorie_data = PersonActivity._get_dataset(one_day_data, RES_ID_CALORIES, KEY_INTRA_CALORIES)
+        distance_data = PersonActivity._get_dataset(one_day_data, RES_ID_DISTANCE, KEY_INTRA_DISTANCE)
 
         activities_1m_in_1d = list()
         for steps, cals, dist in zip(step_data, calorie_data, distance_data):
-            activity_1m = self._get_activity_1m(date_string, steps, cals, dist)
+            activity_1m = PersonActivity._get_activity_1m(
+                person_id, activity_date, steps, cals, dist)
             activities_1m_in_1d.append(activity_1m)
+        return activities_1m_in_1d
 
-        ActivityByMinute.objects.bulk_create(activities_1m_in_1d)
-
-    def _update_one_day_data(self, date_string):
-        date_tz_aware = self._get_tz_aware(date_string)
-        try:
-            one_day_activity = ActivityByDay.objects.get(
-                date = date_tz_aware,
-                person_id=self.account.person_id
-            )
-        except ActivityByDay.DoesNotExist:
-            one_day_activity = ActivityByDay(
-                date = date_tz_aware,
-                person_id = self.account.person_id
-            )
-
-        one_day_aggregate = ActivityByMinute.objects\
-            .filter(person_id=self.account.person_id, date=date_tz_aware)\
-            .distinct('date', 'time', 'person_id')\
-            .aggregate(total_steps=Sum('steps'),
-                       total_calories=Sum('calories'),
-                       total_distance=Sum('distance'))
-
-        one_day_activity.steps = one_day_aggregate['total_steps']
-        one_day_activity.calories = one_day_aggregate['total_calories']
-        one_day_activity.active_minutes = 0
-        one_day_activity.distance = one_day_aggregate['total_distance']
-        one_day_activity.save()
-
-    def _get_activity_1m(self, activity_date, steps, calories, distance):
+    @staticmethod
+    def _get_activity_1m(person_id, activity_date, steps, calories, distance):
         activity = ActivityByMinute(
-            date=self._get_tz_aware(activity_date),
-            time=self._get_tz_aware(steps["time"]),
-            person_id=self.account.person_id
+            date=activity_date,
+            time=PersonActivity._get_time(steps["time"]),
+            person_id=person_id
         )
         activity.steps = steps["value"]
         activity.calories = calories["value"]
         activity.level = calories["level"]
         activity.distance = distance["value"]
         return activity
-        
-    def _refresh_cb(self, token):
-        """ Called when the OAuth token has been refreshed """
-        self.account.access_token = token['access_token']
-        self.account.refresh_token = token['refresh_token']
-        self.account.set_expires_at_in_unix(token['expires_at'])
-        self.account.save()
+
+    def _call_api(self, method, *args, **kwargs):
+        """
+        Call a Fitbit API *method* once the throttle allows it. If the token
+        expired in the meantime, it is refreshed and the call made again.
+        """
+        for is_retry in (False, True):
+            if self.throttle is not None:
+                self.throttle.acquire()
+            try:
+                with self.metrics.time_api_call():
+                    return method(*args, **kwargs)
+            except TokenExpiredError:
+                if is_retry:
+                    raise
+                self._refresh_token()
+
+    def _refresh_token_if_expiring(self):
+        """
+        Refresh the OAuth token up front if it is about to expire, so the
+        concurrent intraday requests do not all try to refresh it at once.
+        The refresh is shared with any other sync of the same Account.
+        """
+        expires_at = self.fitbit.client.session.token.get('expires_at')
+        if expires_at and \
+                float(expires_at) - time.time() < TOKEN_REFRESH_LEAD_SECONDS:
+            self._refresh_token()
+
+    def _refresh_token(self):
+        """
+        Refresh the OAuth token through the TokenManager. The concurrent
+        requests of this sync, and the other syncs of the Account, share
+        one refresh made with the Account row locked, so the single-use
+        refresh token is only spent once.
+        :return: the new token
+        """
+        token = get_token_manager().refresh(self.account.pk).result()
+        self.fitbit.client.session.token = token
+        return token
 
     @staticmethod
     def _get_list_of_dates(start_datetime, end_datetime):
@@ -182,10 +398,11 @@ class PersonActivity(object):
         INVARIANT: start_datetime is always before end_datetime
         """
         dates = list()
-        for date in rrule(DAILY, dtstart=start_datetime, until=end_datetime):
+        for date in rrule(DAILY, dtstart=start_datetime.date(),
+                          until=end_datetime.date()):
             dates.append({
                 'date': date.strftime("%Y-%m-%d"),
-                'start_time': date.strftime("%H:%M"),
+                'start_time': TIME_START_OF_DAY,
                 'end_time': TIME_END_OF_DAY
             })
 
@@ -212,6 +429,28 @@ class PersonActivity(object):
         return timezone.make_aware(activity_datetime,
             timezone.get_current_timezone())
 
+    def _get_group_ids(self):
+        """
+        :return: the ids of the person's Groups, looked up once per pull
+        rather than on every write that invalidates their caches
+        """
+        if self.group_ids is None:
+            self.group_ids = get_group_ids(self.account.person_id)
+        return self.group_ids
+
+    @staticmethod
+    def _get_date(date_string):
+        """ Parse a Fitbit "%Y-%m-%d" date """
+        return datetime.strptime(date_string, DATE_FORMAT).date()
+
+    @staticmethod
+    def _get_time(time_string):
+        """ Parse a Fitbit "%H:%M:%S" time, usually from MINUTES_OF_DAY """
+        try:
+            return MINUTES_OF_DAY[time_string]
+        except KeyError:
+            return datetime.strptime(time_string, TIME_FORMAT).time()
+
     @staticmethod
     def _get_tz_aware(datetime_string):
         datetime = parser.parse(datetime_string)
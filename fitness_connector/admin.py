@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Account
+from .models import Account, SyncJob
 
 # Register your models here.
 class AccountAdmin(admin.ModelAdmin):
@@ -9,3 +9,14 @@ class AccountAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Account, AccountAdmin)
+
+
+class SyncJobAdmin(admin.ModelAdmin):
+    list_display = ('account', 'status', 'run_after', 'attempts', 'leased_by', 'last_error')
+    list_display_links = ('account', 'status')
+    list_filter = ('status',)
+    ordering = ('-run_after',)
+    search_fields = ['account__fullname', 'account__person__name']
+
+
+admin.site.register(SyncJob, SyncJobAdmin)
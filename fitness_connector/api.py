@@ -1,85 +1,102 @@
-import time
+from datetime import timedelta
 from django.http import Http404
+from django.utils import timezone
 from fitbit import Fitbit
-from oauthlib.oauth2 import InvalidGrantError, TokenExpiredError
+from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from fitness_connector.activity import PersonActivity
 from fitness_connector.classes import PersonFitnessSyncResult
-from fitness_connector.models import Account
+from fitness_connector.metrics import get_sync_report, METRICS_WINDOW
+from fitness_connector.models import Account, SyncJob
+from fitness_connector.planner import PullPlanner
 from fitness_connector.serializers import PersonFitnessSyncResultSerializer
+from fitness_connector.tokens import get_token_manager
 from people.models import Person
 
 
-SECONDS_BEFORE_NEXT_SYNC = 2  # type: int
-SECONDS_BEFORE_NEXT_TOKEN_REFRESH = 0.1  # type: float
-
 # CLASSES
 class PersonFitnessDataSync(APIView):
     """
-    Download the latest fitness data of the person id
+    Queue a download of the latest fitness data of the person id. The
+    response carries the last pull time known so far.
     """
 
     def get(self, request, person_id, format=None):
-        person_activity = get_person_activity(person_id)
-        last_sync_time = person_activity.pull_recent_data()
-        person_fitness_sync = PersonFitnessSyncResult(person_id, last_sync_time)
+        account = get_account(person_id)
+        SyncJob.enqueue(account)
+        person_fitness_sync = PersonFitnessSyncResult(person_id,
+                                                      account.last_pull_time)
         serializer = PersonFitnessSyncResultSerializer(person_fitness_sync)
-        return Response(serializer.data)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 class AllUsersFitnessDataSync(APIView):
+    """
+    Queue a download of the latest fitness data of every person that has an
+    Account. Accounts whose devices sync rarely are polled less often.
+    """
 
     def get (self, request, format=None):
-        all_people_with_account = Account.objects.all()
+        all_people_with_account = PullPlanner.get_due_accounts(
+            Account.objects.filter(person__isnull=False))
 
         sync_results = dict()  # type: dict
 
         for account in all_people_with_account:
-            person_activity = PersonActivity(account.person.id)
-            last_sync_time = self.__try_pull_recent_data(person_activity)
-            sync_results[str(person_activity.person_id)] = last_sync_time
-            time.sleep(SECONDS_BEFORE_NEXT_SYNC)
+            sync_job = SyncJob.enqueue(account)
+            sync_results[str(account.person_id)] = sync_job.get_status_display()
 
-        return Response(sync_results)
-
-    def __try_pull_recent_data(self, person_activity):
-        # type: (PersonActivity) -> str
-        try:
-            return person_activity.pull_recent_data()
-        except TokenExpiredError:
-            return "TokenExpiredError"
-        except InvalidGrantError:
-            return "InvalidGrantError"
+        return Response(sync_results, status=status.HTTP_202_ACCEPTED)
 
 
 class RefreshAllToken(APIView):
+    """
+    Refresh every token that is about to expire, then list the tokens'
+    expiration times
+    """
 
     def get (self, request, format=None):
-        all_people_with_account = Account.objects.all()
+        errors = get_token_manager().refresh_expiring()
+        all_people_with_account = Account.objects \
+            .filter(person__isnull=False) \
+            .select_related("person")
 
         refresh_results = dict()  # type: dict
 
         for account in all_people_with_account:
-            person_activity = PersonActivity(account.person.id)
             refresh_results[str(account.person.id)] = {
                 "person_name": account.person.name,
-                "expires_at": person_activity.account.expires_at,
-                "last_pull_time": person_activity.account.last_pull_time,
+                "expires_at": account.expires_at,
+                "last_pull_time": account.last_pull_time,
+                "error": errors.get(account.id),
             }
 
-            time.sleep(SECONDS_BEFORE_NEXT_TOKEN_REFRESH)
-
         return Response(refresh_results)
 
 
 
+class SyncMetricsReport(APIView):
+    """
+    Report the timings, Fitbit calls, rows written and errors of the syncs
+    in the last *hours* hours, and the sync lag of every Account
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request, format=None):
+        window = METRICS_WINDOW
+        if request.query_params.get("hours", "").isdigit():
+            window = timedelta(hours=int(request.query_params["hours"]))
+        report = get_sync_report(timezone.now() - window)
+        return Response(report)
+
+
 # HELPER METHODS
-def get_person_activity(person_id):
+def get_account(person_id):
+    # type: (int) -> Account
     if Person.objects.filter(id=person_id).exists() == False:
         raise Http404
-    elif Account.objects.filter(person_id=person_id).exists() == False:
+    account = Account.objects.filter(person_id=person_id).first()
+    if account is None:
         raise Http404
-    else:
-        return PersonActivity(person_id)
\ No newline at end of file
+    return account
\ No newline at end of file
@@ -1,5 +1,7 @@
 class PersonFitnessSyncResult():
 
-    def __init__(self, person_id, last_sync_time):
+    def __init__(self, person_id, last_sync_time, error=None, metrics=None):
         self.person_id = person_id
-        self.last_sync_time = last_sync_time
\ No newline at end of file
+        self.last_sync_time = last_sync_time
+        self.error = error
+        self.metrics = metrics
\ No newline at end of file
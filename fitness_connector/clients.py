@@ -0,0 +1,88 @@
+import threading
+
+from fitbit.api import Fitbit
+from requests.adapters import HTTPAdapter
+
+from fitness_connector import settings as fitbit_settings
+
+# CONSTANTS
+API_ENDPOINT = getattr(
+    fitbit_settings, "API_ENDPOINT", Fitbit.API_ENDPOINT)  # type: str
+HTTP_POOL_CONNECTIONS = getattr(
+    fitbit_settings, "HTTP_POOL_CONNECTIONS", 4)  # type: int
+HTTP_POOL_MAXSIZE = getattr(
+    fitbit_settings, "HTTP_POOL_MAXSIZE", 32)  # type: int
+HTTP_TIMEOUT = getattr(fitbit_settings, "TIMEOUT", None)  # type: float
+TOKEN_PATH = "/oauth2/token"
+
+
+# CLASSES
+class FitbitClientFactory(object):
+    """
+    Builds the Fitbit clients of the Accounts. Every client keeps its own
+    OAuth session, so credentials stay per Account, but all the sessions
+    share one pooled HTTPAdapter. Keep-alive connections to Fitbit are
+    reused from one Account to the next instead of being set up per sync.
+    *pool_maxsize* should cover the concurrent requests of the sync engine,
+    i.e. SYNC_MAX_WORKERS times INTRADAY_MAX_WORKERS.
+    """
+
+    def __init__(self, api_endpoint=API_ENDPOINT,
+                 pool_connections=HTTP_POOL_CONNECTIONS,
+                 pool_maxsize=HTTP_POOL_MAXSIZE, timeout=HTTP_TIMEOUT):
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize)
+        self.timeout = timeout
+        self.set_api_endpoint(api_endpoint)
+
+    def set_api_endpoint(self, api_endpoint):
+        # type: (str) -> None
+        """
+        Send the calls of the clients built from now on to *api_endpoint*,
+        e.g. the url of a FitbitStandIn. OAuth refuses plain HTTP unless
+        OAUTHLIB_INSECURE_TRANSPORT is set, which is left to the caller.
+        """
+        self.api_endpoint = api_endpoint.rstrip("/")
+
+    def get_fitbit(self, account, refresh_cb=None):
+        # type: (Account, callable) -> Fitbit
+        """
+        :return: a Fitbit client with the credentials of *account*. Tokens
+        are not refreshed on their own: an expired token raises
+        TokenExpiredError, and client.refresh_token() passes the new token
+        to *refresh_cb*.
+        """
+        fitbit = Fitbit(
+            fitbit_settings.CLIENT_ID,
+            fitbit_settings.CLIENT_SECRET,
+            access_token=account.access_token,
+            refresh_token=account.refresh_token,
+            expires_at=account.get_expires_at(),
+            refresh_cb=refresh_cb,
+            timeout=self.timeout,
+        )
+
+        token_url = self.api_endpoint + TOKEN_PATH
+        fitbit.API_ENDPOINT = self.api_endpoint
+        fitbit.client.refresh_token_url = token_url
+        # Refreshes go through the TokenManager, see fitness_connector.tokens
+        fitbit.client.session.auto_refresh_url = None
+        fitbit.client.session.mount(self.api_endpoint, self.adapter)
+        return fitbit
+
+
+# HELPER METHODS
+_client_factory = None
+_client_factory_lock = threading.Lock()
+
+
+def get_client_factory():
+    # type: () -> FitbitClientFactory
+    """
+    :return: the FitbitClientFactory shared by every sync in this process
+    """
+    global _client_factory
+    with _client_factory_lock:
+        if _client_factory is None:
+            _client_factory = FitbitClientFactory()
+        return _client_factory
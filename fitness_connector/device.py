@@ -4,17 +4,26 @@ FITBIT_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
 
 class Device:
    
-    def __init__(self, fitbit, account):
-        self._device = self._get_fitbit_device(fitbit, account.device_version)
+    def __init__(self, fitbit, account, throttle=None, metrics=None):
+        self._device = self._get_fitbit_device(fitbit, account.device_version,
+                                               throttle, metrics)
         self.id = self._device["id"]
         self.device_version = self._device["deviceVersion"]
         self.last_sync_time = self.get_datetime(self._device["lastSyncTime"])
         
     @staticmethod
-    def _get_fitbit_device(fitbit, device_version):
+    def _get_fitbit_device(fitbit, device_version, throttle=None,
+                           metrics=None):
+        if throttle is not None:
+            throttle.acquire()
+        if metrics is not None:
+            with metrics.time_api_call():
+                devices = fitbit.get_devices()
+        else:
+            devices = fitbit.get_devices()
         fitbit_device = filter(
             lambda x: x["deviceVersion"] == device_version,
-            fitbit.get_devices())
+            devices)
         fitbit_device = list(fitbit_device)[0]
         return fitbit_device
         
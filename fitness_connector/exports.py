@@ -0,0 +1,318 @@
+import csv
+import heapq
+import json
+import os
+import re
+from datetime import date
+
+from django.db import transaction
+
+from fitness.models import ActivityByMinute, ActivityByDay, \
+    ActivityMinutesByDay
+from fitness.rollup import get_activity_by_day
+from fitness_connector.activity import PersonActivity, MINUTE_STORAGE, \
+    MINUTE_STORAGE_ROWS, MINUTE_STORAGE_PACKED
+
+# CONSTANTS
+JSON_CHUNK_SIZE = 64 * 1024  # type: int
+IMPORT_BATCH_SIZE = 10000  # type: int
+RESOURCE_STEPS = "steps"
+RESOURCE_CALORIES = "calories"
+RESOURCE_DISTANCE = "distance"
+RESOURCES = (RESOURCE_STEPS, RESOURCE_CALORIES, RESOURCE_DISTANCE)
+RESOURCE_MODERATELY_ACTIVE = "moderately_active_minutes"
+RESOURCE_VERY_ACTIVE = "very_active_minutes"
+ACTIVE_MINUTES_RESOURCES = (RESOURCE_MODERATELY_ACTIVE, RESOURCE_VERY_ACTIVE)
+EXPORT_FILE_NAME = re.compile(
+    r"^(?P<resource>steps|calories|distance|moderately_active_minutes|"
+    r"very_active_minutes)-(?P<period>.+)\.(json|csv)$")
+KEY_DATE_TIME = "dateTime"
+KEY_VALUE = "value"
+KEY_LEVEL = "level"
+CENTIMETERS_PER_MILE = 160934.4  # type: float
+CENTIMETERS_PER_KILOMETER = 100000.0  # type: float
+DISTANCE_UNITS = {
+    "cm": 1.0,
+    "km": CENTIMETERS_PER_KILOMETER,
+    "mi": CENTIMETERS_PER_MILE,
+}
+
+
+# CLASSES
+class ExportImporter(object):
+    """
+    Streams the minute data of a Fitbit account export into ActivityByMinute
+    and ActivityByDay. The export has one file per resource and period,
+    e.g. steps-2019-01-01.json, holding an array of {"dateTime", "value"} in
+    time order; CSV files with the same columns are read too. The three
+    resources of a period are merged minute by minute, so memory does not
+    grow with the size of the export.
+
+    The minutes of the export have no activity level, so the active minutes
+    of a day are the sum of its moderately_active_minutes and
+    very_active_minutes, the daily totals the export has for them.
+
+    Minutes are written in transactions of about *batch_size* rows. After
+    each one the last written date is saved to *checkpoint_path*, so an
+    interrupted import carries on from there.
+    """
+
+    def __init__(self, person_id, checkpoint_path=None,
+                 batch_size=IMPORT_BATCH_SIZE, export_distance_unit="cm",
+                 distance_unit="mi"):
+        self.person_id = person_id
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.distance_scale = DISTANCE_UNITS[export_distance_unit] \
+            / DISTANCE_UNITS[distance_unit]
+        self.num_minutes = 0
+        self.num_days = 0
+        self._checkpoint = self._load_checkpoint()
+        self._days = list()  # type: list
+        self._active_minutes = dict()  # type: dict
+
+    def import_paths(self, paths, stdout=None):
+        # type: (list(str), object) -> None
+        """
+        Import every export file found in *paths*, which are files or
+        directories
+        """
+        files_by_period = get_export_files(paths)
+        self._active_minutes = get_active_minutes(files_by_period)
+        for period, files in sorted(files_by_period.items()):
+            files = dict((resource, path) for resource, path in files.items()
+                         if resource in RESOURCES)
+            if not files or period in self._checkpoint["periods"]:
+                continue
+            self.import_period(period, files)
+            if stdout:
+                stdout.write("Imported %s" % period)
+
+    def import_period(self, period, files):
+        # type: (str, dict) -> None
+        """
+        :param files: a dict of resource name to the path of its file
+        """
+        last_date = self._checkpoint["dates"].get(period)
+        day = None
+        for activity_date, activity_time, values in merge_resources(files):
+            if last_date and activity_date.isoformat() <= last_date:
+                continue
+            if day is None or day[0] != activity_date:
+                day = (activity_date, list())
+                self._days.append(day)
+                if self._get_num_buffered() >= self.batch_size:
+                    self._flush(period, keep_last=True)
+            day[1].append(self._get_activity(activity_date, activity_time,
+                                             values))
+        self._flush(period)
+        self._checkpoint["periods"].append(period)
+        self._checkpoint["dates"].pop(period, None)
+        self._save_checkpoint()
+
+    def _get_activity(self, activity_date, activity_time, values):
+        # type: (date, time, dict) -> ActivityByMinute
+        calories = values.get(RESOURCE_CALORIES, {})
+        return ActivityByMinute(
+            date=activity_date,
+            time=activity_time,
+            person_id=self.person_id,
+            steps=int(float(values.get(RESOURCE_STEPS, {}).get(KEY_VALUE, 0))),
+            calories=float(calories.get(KEY_VALUE, 0)),
+            level=int(calories.get(KEY_LEVEL, 0)),
+            distance=float(values.get(RESOURCE_DISTANCE, {})
+                           .get(KEY_VALUE, 0)) * self.distance_scale)
+
+    def _get_num_buffered(self):
+        # type: () -> int
+        return sum(len(activities) for _, activities in self._days)
+
+    def _flush(self, period, keep_last=False):
+        # type: (str, bool) -> None
+        """
+        Write the buffered days. With *keep_last*, the day still being read
+        stays in the buffer.
+        """
+        days = self._days[:-1] if keep_last else self._days
+        if not days:
+            return
+
+        activities_by_day = [get_activity_by_day(self.person_id, *day)
+                             for day in days]
+        for activity in activities_by_day:
+            activity.active_minutes = self._active_minutes.get(
+                activity.date, activity.active_minutes)
+
+        with transaction.atomic():
+            for activity_date, activities in days:
+                if MINUTE_STORAGE != MINUTE_STORAGE_PACKED:
+                    ActivityByMinute.upsert(self.person_id, activity_date,
+                                            activities)
+                if MINUTE_STORAGE != MINUTE_STORAGE_ROWS:
+                    ActivityMinutesByDay.upsert(self.person_id, activity_date,
+                                                activities)
+            ActivityByDay.upsert(self.person_id, activities_by_day)
+
+        self.num_days += len(days)
+        self.num_minutes += sum(len(activities) for _, activities in days)
+        self._checkpoint["dates"][period] = days[-1][0].isoformat()
+        self._save_checkpoint()
+        self._days = self._days[-1:] if keep_last else list()
+
+    def _load_checkpoint(self):
+        # type: () -> dict
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint:
+                return json.load(checkpoint)
+        return {"periods": [], "dates": {}}
+
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        temporary_path = self.checkpoint_path + ".tmp"
+        with open(temporary_path, "w") as checkpoint:
+            json.dump(self._checkpoint, checkpoint)
+        os.replace(temporary_path, self.checkpoint_path)
+
+
+# HELPER METHODS
+def get_export_files(paths):
+    # type: (list(str)) -> dict
+    """
+    :return: a dict of period to a dict of resource name to file path
+    """
+    files = dict()  # type: dict
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths = (os.path.join(directory, file_name)
+                          for directory, _, file_names in os.walk(path)
+                          for file_name in file_names)
+        else:
+            file_paths = [path]
+        for file_path in file_paths:
+            match = EXPORT_FILE_NAME.match(os.path.basename(file_path))
+            if match:
+                files.setdefault(match.group("period"), dict())[
+                    match.group("resource")] = file_path
+    return files
+
+
+def get_active_minutes(files_by_period):
+    # type: (dict) -> dict
+    """
+    :return: a dict of date to the active minutes of the daily
+    moderately_active_minutes and very_active_minutes files
+    """
+    active_minutes = dict()  # type: dict
+    for files in files_by_period.values():
+        for resource in ACTIVE_MINUTES_RESOURCES:
+            if resource not in files:
+                continue
+            for activity_date, _, _, record in iter_records(
+                    resource, files[resource]):
+                active_minutes[activity_date] = active_minutes.get(
+                    activity_date, 0) + int(float(record[KEY_VALUE]))
+    return active_minutes
+
+
+def merge_resources(files):
+    # type: (dict) -> iter
+    """
+    Merge the time-ordered records of each resource's file
+    :return: an iterator of (date, time, dict of resource name to record)
+    """
+    streams = [iter_records(resource, path)
+               for resource, path in sorted(files.items())]
+    current_key, values = None, dict()
+    for activity_date, activity_time, resource, record in \
+            heapq.merge(*streams, key=lambda item: item[:2]):
+        if (activity_date, activity_time) != current_key:
+            if current_key is not None:
+                yield current_key[0], current_key[1], values
+            current_key, values = (activity_date, activity_time), dict()
+        values[resource] = record
+    if current_key is not None:
+        yield current_key[0], current_key[1], values
+
+
+def iter_records(resource, path):
+    # type: (str, str) -> iter
+    """
+    :return: an iterator of (date, time, resource, record) of one file
+    """
+    with open(path) as export_file:
+        if path.endswith(".csv"):
+            records = csv.DictReader(export_file)
+        else:
+            records = iter_json_array(export_file)
+        for record in records:
+            activity_date, activity_time = get_date_and_time(
+                record[KEY_DATE_TIME])
+            yield activity_date, activity_time, resource, record
+
+
+def iter_json_array(stream, chunk_size=JSON_CHUNK_SIZE):
+    # type: (object, int) -> iter
+    """
+    :return: an iterator of the items of the JSON array in *stream*, read
+    *chunk_size* characters at a time
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = "", 0
+    is_started, is_eof = False, False
+
+    while True:
+        position = skip_whitespace(buffer, position)
+        if position < len(buffer):
+            if not is_started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                is_started = True
+                continue_at = position + 1
+            elif buffer[position] == "]":
+                return
+            elif buffer[position] == ",":
+                continue_at = position + 1
+            else:
+                try:
+                    item, continue_at = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if is_eof:
+                        raise
+                    continue_at = None
+                else:
+                    yield item
+            if continue_at is not None:
+                position = continue_at
+                continue
+
+        if is_eof:
+            raise ValueError("Unexpected end of the JSON array")
+        chunk = stream.read(chunk_size)
+        is_eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def skip_whitespace(buffer, position):
+    # type: (str, int) -> int
+    while position < len(buffer) and buffer[position] in " \t\r\n":
+        position += 1
+    return position
+
+
+def get_date_and_time(date_time_string):
+    # type: (str) -> tuple
+    """
+    Parse the "MM/DD/YY HH:MM:SS" timestamps of Fitbit exports, or ISO ones
+    :return: a tuple of (date, time)
+    """
+    if date_time_string[2] == "/":
+        activity_date = date(2000 + int(date_time_string[6:8]),
+                             int(date_time_string[0:2]),
+                             int(date_time_string[3:5]))
+        return activity_date, PersonActivity._get_time(date_time_string[9:17])
+    activity_date = date(int(date_time_string[0:4]),
+                         int(date_time_string[5:7]),
+                         int(date_time_string[8:10]))
+    return activity_date, PersonActivity._get_time(date_time_string[11:19])
+
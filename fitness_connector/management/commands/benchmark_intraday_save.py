@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from fitness.models import ActivityByMinute
+from fitness_connector.activity import PersonActivity, MINUTES_OF_DAY, \
+    RES_ID_STEPS, RES_ID_CALORIES, RES_ID_DISTANCE, KEY_INTRA_STEPS, \
+    KEY_INTRA_CALORIES, KEY_INTRA_DISTANCE
+
+# CONSTANTS
+DEFAULT_REPEAT = 20  # type: int
+BENCHMARK_DATE = "2017-05-01"
+BENCHMARK_PERSON_ID = 1
+
+
+class Command(BaseCommand):
+    help = "Time how long it takes to turn one day of intraday responses " \
+           "into ActivityByMinute rows, with the generic timestamp parser " \
+           "and with the fixed-format fast path. Nothing is saved."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                            help="Number of days to convert with each path")
+
+    def handle(self, *args, **options):
+        one_day_data = get_synthetic_one_day_data()
+        repeat = options["repeat"]
+
+        before = self.__time(repeat, lambda: get_activities_1m_generic(
+            BENCHMARK_PERSON_ID, BENCHMARK_DATE, one_day_data))
+        after = self.__time(repeat, lambda: PersonActivity._get_activities_1m(
+            BENCHMARK_PERSON_ID, PersonActivity._get_date(BENCHMARK_DATE),
+            one_day_data))
+
+        self.stdout.write("Generic parser: %.2f ms per day" % (before * 1000))
+        self.stdout.write("Fast path:      %.2f ms per day" % (after * 1000))
+        self.stdout.write("Speed-up:       %.1fx" % (before / after))
+
+    @staticmethod
+    def __time(repeat, convert_one_day):
+        start = time.time()
+        for _ in range(repeat):
+            convert_one_day()
+        return (time.time() - start) / repeat
+
+
+# HELPER METHODS
+def get_synthetic_one_day_data():
+    # type: () -> dict
+    """
+    :return: intraday responses of a whole day, shaped like Fitbit's
+    """
+    steps, calories, distance = [], [], []
+    for time_string in sorted(MINUTES_OF_DAY):
+        num_steps = random.choice([0, 0, 0, random.randint(1, 120)])
+        steps.append({"time": time_string, "value": num_steps})
+        calories.append({"time": time_string, "level": min(num_steps // 40, 3),
+                         "value": 1.2 + num_steps * 0.05})
+        distance.append({"time": time_string, "value": num_steps * 0.0005})
+    return {
+        RES_ID_STEPS: {KEY_INTRA_STEPS: {"dataset": steps}},
+        RES_ID_CALORIES: {KEY_INTRA_CALORIES: {"dataset": calories}},
+        RES_ID_DISTANCE: {KEY_INTRA_DISTANCE: {"dataset": distance}},
+    }
+
+
+def get_activities_1m_generic(person_id, date_string, one_day_data):
+    """
+    The conversion as it was before the fast path: every row parses its date
+    and time with dateutil and makes them timezone-aware
+    """
+    activities_1m_in_1d = list()
+    for steps, cals, dist in zip(
+            one_day_data[RES_ID_STEPS][KEY_INTRA_STEPS]["dataset"],
+            one_day_data[RES_ID_CALORIES][KEY_INTRA_CALORIES]["dataset"],
+            one_day_data[RES_ID_DISTANCE][KEY_INTRA_DISTANCE]["dataset"]):
+        activity = ActivityByMinute(
+            date=PersonActivity._get_tz_aware(date_string),
+            time=PersonActivity._get_tz_aware(steps["time"]),
+            person_id=person_id
+        )
+        activity.steps = steps["value"]
+        activity.calories = cals["value"]
+        activity.level = cals["level"]
+        activity.distance = dist["value"]
+        activities_1m_in_1d.append(activity)
+    return activities_1m_in_1d
@@ -0,0 +1,141 @@
+import os
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fitness.models import ActivityByMinute, ActivityByDay, \
+    ActivityMinutesByDay
+from fitness_connector.clients import get_client_factory
+from fitness_connector.models import Account
+from fitness_connector.quota import QuotaScheduler, TokenBucket, \
+    CLIENT_REQUESTS_PER_SECOND, CLIENT_REQUESTS_BURST, USER_REQUESTS_PER_HOUR
+from fitness_connector.standin import FitbitStandIn, \
+    STANDIN_DEVICE_VERSION, STANDIN_TOKEN_SECONDS
+from fitness_connector.sync import BulkFitnessDataSync, SYNC_MAX_WORKERS
+from people.models import Person
+
+# CONSTANTS
+DEFAULT_NUM_ACCOUNTS = 10  # type: int
+DEFAULT_NUM_DAYS = 2  # type: int
+DEFAULT_LATENCY = 0.05  # type: float
+BENCHMARK_NAME = "Sync benchmark"
+INSECURE_TRANSPORT = "OAUTHLIB_INSECURE_TRANSPORT"
+
+
+class Command(BaseCommand):
+    help = "Sync N synthetic Accounts against a local Fitbit stand-in and " \
+           "report calls/s, rows/s and wall time. The Accounts and their " \
+           "data are deleted afterwards unless --keep is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int,
+                            default=DEFAULT_NUM_ACCOUNTS,
+                            help="Number of synthetic Accounts")
+        parser.add_argument("--days", type=int, default=DEFAULT_NUM_DAYS,
+                            help="Days of data each Account catches up on")
+        parser.add_argument("--workers", type=int, default=SYNC_MAX_WORKERS,
+                            help="Number of Accounts synced concurrently")
+        parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                            help="Seconds the stand-in waits per response")
+        parser.add_argument("--error-rate", type=float, default=0.0,
+                            help="Fraction of responses that are 500s")
+        parser.add_argument("--rate-limit", type=int,
+                            default=USER_REQUESTS_PER_HOUR,
+                            help="Calls per user per hour before 429s")
+        parser.add_argument("--client-rate", type=float,
+                            default=CLIENT_REQUESTS_PER_SECOND,
+                            help="Calls per second allowed by the client's "
+                                 "TokenBucket")
+        parser.add_argument("--fixtures",
+                            help="Directory of recorded days to replay")
+        parser.add_argument("--keep", action="store_true",
+                            help="Keep the synthetic Accounts and data")
+
+    def handle(self, *args, **options):
+        standin = FitbitStandIn(latency=options["latency"],
+                                error_rate=options["error_rate"],
+                                rate_limit=options["rate_limit"],
+                                fixtures_dir=options["fixtures"])
+        accounts = self.__create_accounts(options["accounts"],
+                                          options["days"])
+        person_ids = [account.person_id for account in accounts]
+        scheduler = QuotaScheduler(TokenBucket(
+            options["client_rate"],
+            max(CLIENT_REQUESTS_BURST, options["client_rate"])))
+        bulk_sync = BulkFitnessDataSync(max_workers=options["workers"],
+                                        scheduler=scheduler)
+
+        # The stand-in serves plain HTTP, which OAuth only allows with
+        # INSECURE_TRANSPORT set. It is unset again once the run is over.
+        insecure_transport = os.environ.get(INSECURE_TRANSPORT)
+        os.environ[INSECURE_TRANSPORT] = "1"
+        client_factory = get_client_factory()
+        api_endpoint = client_factory.api_endpoint
+        client_factory.set_api_endpoint(standin.start())
+        try:
+            start = time.time()
+            results = bulk_sync.run(accounts)
+            wall_time = time.time() - start
+            num_rows = self.__count_rows(person_ids)
+            packed_sizes = [packed_day.get_size() for packed_day in
+                            ActivityMinutesByDay.objects
+                            .filter(person_id__in=person_ids)]
+        finally:
+            standin.stop()
+            client_factory.set_api_endpoint(api_endpoint)
+            if insecure_transport is None:
+                del os.environ[INSECURE_TRANSPORT]
+            else:
+                os.environ[INSECURE_TRANSPORT] = insecure_transport
+            if not options["keep"]:
+                Account.objects.filter(person_id__in=person_ids).delete()
+                Person.objects.filter(id__in=person_ids).delete()
+
+        errors = [result.error for result in results if result.error]
+        self.stdout.write("Accounts:   %d (%d failed)" % (len(results),
+                                                          len(errors)))
+        for error in sorted(set(errors)):
+            self.stdout.write("  %s: %d" % (error, errors.count(error)))
+        self.stdout.write("Wall time:  %.2f s" % wall_time)
+        self.stdout.write("API calls:  %d (%.1f calls/s, %d errors, "
+                          "%d rate-limited)" % (
+                              standin.num_requests,
+                              standin.num_requests / wall_time,
+                              standin.num_errors, standin.num_rate_limited))
+        self.stdout.write("Rows:       %d (%.1f rows/s)" % (
+            num_rows, num_rows / wall_time))
+        if packed_sizes:
+            self.stdout.write("Packed:     %d days (%.0f bytes per day)" % (
+                len(packed_sizes), sum(packed_sizes) / len(packed_sizes)))
+
+    @staticmethod
+    def __create_accounts(num_accounts, num_days):
+        # type: (int, int) -> list(Account)
+        now = timezone.now()
+        accounts = list()
+        for i in range(num_accounts):
+            person = Person.objects.create(name="%s %d" % (BENCHMARK_NAME, i),
+                                           internal_name=BENCHMARK_NAME,
+                                           birth_date=date(2000, 1, 1))
+            accounts.append(Account.objects.create(
+                fullname=person.name,
+                user_id="benchmark-%s" % uuid.uuid4().hex[:16],
+                access_token=uuid.uuid4().hex,
+                refresh_token=uuid.uuid4().hex,
+                expires_at=now + timedelta(seconds=STANDIN_TOKEN_SECONDS),
+                person=person,
+                last_pull_time=now - timedelta(days=num_days),
+                device_version=STANDIN_DEVICE_VERSION))
+        return accounts
+
+    @staticmethod
+    def __count_rows(person_ids):
+        # type: (list(int)) -> int
+        return ActivityByMinute.objects \
+            .filter(person_id__in=person_ids).count() \
+            + ActivityMinutesByDay.objects \
+            .filter(person_id__in=person_ids).count() \
+            + ActivityByDay.objects.filter(person_id__in=person_ids).count()
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fitness_connector.exports import ExportImporter, IMPORT_BATCH_SIZE, \
+    DISTANCE_UNITS
+from people.models import Person
+
+
+class Command(BaseCommand):
+    help = "Import a person's minute-by-minute steps, calories and " \
+           "distance from the files of a Fitbit account export, instead of " \
+           "pulling the history through the rate-limited API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("person_id", type=int)
+        parser.add_argument("paths", nargs="+",
+                            help="Export files, or directories to search "
+                                 "for steps-*, calories-*, distance-*, "
+                                 "moderately_active_minutes-* and "
+                                 "very_active_minutes-* files")
+        parser.add_argument("--checkpoint",
+                            help="File that records the progress, so the "
+                                 "import can be resumed")
+        parser.add_argument("--batch-size", type=int,
+                            default=IMPORT_BATCH_SIZE,
+                            help="Number of minutes written per transaction")
+        parser.add_argument("--export-distance-unit", default="cm",
+                            choices=sorted(DISTANCE_UNITS),
+                            help="Unit of the distances in the export")
+        parser.add_argument("--distance-unit", default="mi",
+                            choices=sorted(DISTANCE_UNITS),
+                            help="Unit of the distances pulled from the API")
+
+    def handle(self, *args, **options):
+        if not Person.objects.filter(id=options["person_id"]).exists():
+            raise CommandError("Person %s does not exist"
+                               % options["person_id"])
+
+        importer = ExportImporter(
+            options["person_id"],
+            checkpoint_path=options["checkpoint"],
+            batch_size=options["batch_size"],
+            export_distance_unit=options["export_distance_unit"],
+            distance_unit=options["distance_unit"])
+        start = time.time()
+        importer.import_paths(options["paths"], stdout=self.stdout)
+        self.stdout.write("Imported %d minutes on %d days in %.1f s" % (
+            importer.num_minutes, importer.num_days, time.time() - start))
@@ -0,0 +1,41 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from dateutil import parser as date_parser
+
+from fitness_connector.activity import PersonActivity, RES_IDS_INTRADAY, \
+    KEY_DETAIL_LEVEL, DATE_FORMAT
+
+
+class Command(BaseCommand):
+    help = "Save a person's real intraday responses as fixtures that the " \
+           "Fitbit stand-in can replay, one file per resource and date."
+
+    def add_arguments(self, parser):
+        parser.add_argument("person_id", type=int)
+        parser.add_argument("dates", nargs="+",
+                            help="Dates to record, as YYYY-MM-DD")
+        parser.add_argument("--output", required=True,
+                            help="Directory to save the fixtures in")
+
+    def handle(self, *args, **options):
+        person_activity = PersonActivity(options["person_id"])
+        for date_string in options["dates"]:
+            date_string = date_parser.parse(date_string).strftime(DATE_FORMAT)
+            for res_id in RES_IDS_INTRADAY:
+                response = person_activity.fitbit.intraday_time_series(
+                    res_id, base_date=date_string,
+                    detail_level=KEY_DETAIL_LEVEL)
+                self.__save(options["output"], res_id.split("/")[-1],
+                            date_string, response)
+            self.stdout.write("Recorded %s" % date_string)
+
+    @staticmethod
+    def __save(output, resource, date_string, response):
+        directory = os.path.join(output, resource)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(os.path.join(directory, date_string + ".json"), "w") \
+                as fixture:
+            json.dump(response, fixture)
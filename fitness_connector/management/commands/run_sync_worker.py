@@ -0,0 +1,129 @@
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from fitness_connector.models import SyncJob, ERROR_ACCOUNT_WITHOUT_PERSON
+from fitness_connector.sync import BulkFitnessDataSync, SYNC_MAX_WORKERS
+
+# CONSTANTS
+DEFAULT_LEASE_SECONDS = 10 * 60  # type: int
+DEFAULT_POLL_SECONDS = 5  # type: int
+HEARTBEATS_PER_LEASE = 3  # type: int
+
+
+class Command(BaseCommand):
+    help = "Lease queued SyncJobs and pull the Accounts' recent data. Any " \
+           "number of workers may run at once, on one or more hosts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=SYNC_MAX_WORKERS,
+                            help="Number of Accounts synced concurrently")
+        parser.add_argument("--lease-seconds", type=int,
+                            default=DEFAULT_LEASE_SECONDS,
+                            help="How long a leased job stays with this "
+                                 "worker before others may take it")
+        parser.add_argument("--poll-seconds", type=int,
+                            default=DEFAULT_POLL_SECONDS,
+                            help="Seconds to wait when the queue is empty")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit when the queue is empty")
+
+    def handle(self, *args, **options):
+        worker_id = "%s:%d" % (socket.gethostname(), os.getpid())
+        bulk_sync = BulkFitnessDataSync(max_workers=options["workers"])
+        self.stdout.write("Sync worker %s started" % worker_id)
+
+        while True:
+            close_old_connections()
+            jobs = SyncJob.lease(worker_id, options["workers"],
+                                 options["lease_seconds"])
+            if not jobs:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_seconds"])
+                continue
+
+            for job in jobs:
+                if not job.account.person_id:
+                    job.set_as_failed(ERROR_ACCOUNT_WITHOUT_PERSON)
+            jobs = [job for job in jobs if job.account.person_id]
+
+            jobs_by_account = self.__group_by_account(jobs)
+            accounts = [account_jobs[0].account
+                        for account_jobs in jobs_by_account.values()]
+            dates_by_account = self.__get_dates_by_account(jobs_by_account)
+
+            with LeaseHeartbeat(worker_id, jobs, options["lease_seconds"]):
+                results = bulk_sync.run(accounts, dates_by_account)
+            for account, result in zip(accounts, results):
+                for i, job in enumerate(jobs_by_account[account.pk]):
+                    # One sync serves all of the Account's jobs, so its
+                    # metrics are recorded once
+                    self.__finish(job, result,
+                                  result.metrics if i == 0 else None)
+
+    @staticmethod
+    def __group_by_account(jobs):
+        jobs_by_account = OrderedDict()  # type: OrderedDict
+        for job in jobs:
+            jobs_by_account.setdefault(job.account_id, []).append(job)
+        return jobs_by_account
+
+    @staticmethod
+    def __get_dates_by_account(jobs_by_account):
+        """
+        Accounts with only dated jobs pull just those dates. A job without a
+        date makes its Account pull everything since the last pull.
+        """
+        dates_by_account = dict()  # type: dict
+        for account_id, account_jobs in jobs_by_account.items():
+            dates = [job.date for job in account_jobs]
+            if None not in dates:
+                dates_by_account[account_id] = sorted(set(dates))
+        return dates_by_account
+
+    def __finish(self, job, result, metrics):
+        if result.error:
+            job.set_as_failed(result.error, metrics)
+        else:
+            job.set_as_done(metrics)
+        self.stdout.write("%s: %s %s" % (job, result.last_sync_time or "",
+                                         result.error or ""))
+
+
+class LeaseHeartbeat(object):
+    """
+    Renews the leases of *jobs* HEARTBEATS_PER_LEASE times per
+    *lease_seconds* on a background thread while the block runs, so a sync
+    that outlasts its lease is not leased again by another worker
+    """
+
+    def __init__(self, worker_id, jobs, lease_seconds):
+        # type: (str, list(SyncJob), int) -> None
+        self.worker_id = worker_id
+        self.jobs = jobs
+        self.lease_seconds = lease_seconds
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.__run)
+        self._thread.daemon = True
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stopped.set()
+        self._thread.join()
+
+    def __run(self):
+        try:
+            while not self._stopped.wait(self.lease_seconds
+                                         / float(HEARTBEATS_PER_LEASE)):
+                SyncJob.renew(self.worker_id, self.jobs, self.lease_seconds)
+        finally:
+            connection.close()
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from fitness_connector.tokens import TokenManager, TOKEN_POLL_SECONDS, \
+    TOKEN_REFRESH_LEAD_SECONDS, TOKEN_REFRESH_MAX_WORKERS
+
+
+class Command(BaseCommand):
+    help = "Refresh the Accounts' OAuth tokens shortly before they expire, " \
+           "so syncs rarely have to refresh them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int,
+                            default=TOKEN_REFRESH_MAX_WORKERS,
+                            help="Number of tokens refreshed concurrently")
+        parser.add_argument("--lead-seconds", type=int,
+                            default=TOKEN_REFRESH_LEAD_SECONDS,
+                            help="Refresh tokens that expire within this "
+                                 "many seconds")
+        parser.add_argument("--poll-seconds", type=int,
+                            default=TOKEN_POLL_SECONDS,
+                            help="Longest wait before reloading the queue")
+        parser.add_argument("--once", action="store_true",
+                            help="Refresh the due tokens once, then exit")
+
+    def handle(self, *args, **options):
+        token_manager = TokenManager(options["workers"],
+                                     options["lead_seconds"])
+        self.stdout.write("Token manager started")
+        token_manager.run(options["poll_seconds"], once=options["once"])
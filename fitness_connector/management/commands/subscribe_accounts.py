@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from fitbit.exceptions import HTTPException
+
+from fitness_connector.activity import PersonActivity
+from fitness_connector.models import Account
+from fitness_connector.quota import get_quota_scheduler
+from fitness_connector.subscriptions import COLLECTION_ACTIVITIES, \
+    SUBSCRIBER_ID
+
+
+class Command(BaseCommand):
+    help = "Subscribe every Account to Fitbit's activity notifications, so " \
+           "they are synced when their data changes instead of by polling."
+
+    def handle(self, *args, **options):
+        if not SUBSCRIBER_ID:
+            raise CommandError("SUBSCRIBER_ID is not set in "
+                               "fitness_connector.settings")
+
+        scheduler = get_quota_scheduler()
+        for account in Account.objects.filter(person__isnull=False):
+            throttle = scheduler.for_account(account.user_id)
+            person_activity = PersonActivity(account.person_id,
+                                             throttle=throttle)
+            try:
+                person_activity.subscribe(SUBSCRIBER_ID, COLLECTION_ACTIVITIES)
+                self.stdout.write("Subscribed %s" % account)
+            except HTTPException as error:
+                self.stderr.write("Could not subscribe %s: %s" % (account,
+                                                                   error))
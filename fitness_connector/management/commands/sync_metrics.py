@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from fitness_connector.metrics import get_sync_report, METRICS_WINDOW
+
+# CONSTANTS
+ROW_FORMAT = "%-24s %8s %6s %8s %8s %8s %10s %10s"
+
+
+class Command(BaseCommand):
+    help = "Print the timings, Fitbit calls, rows written and errors of " \
+           "recent syncs, and the sync lag of every Account."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int,
+                            default=int(METRICS_WINDOW.total_seconds() // 3600),
+                            help="Report the syncs of the last N hours")
+
+    def handle(self, *args, **options):
+        report = get_sync_report(
+            timezone.now() - timedelta(hours=options["hours"]))
+
+        self.stdout.write("Jobs: %d (%d done, %d failed)" % (
+            report["jobs"], report["jobs_done"], report["jobs_failed"]))
+        self.stdout.write("API calls: %d, rows inserted: %d, updated: %d" % (
+            report["api_calls"], report["rows_inserted"],
+            report["rows_updated"]))
+        for error, count in sorted(report["errors"].items()):
+            self.stdout.write("  %s: %d" % (error, count))
+
+        self.stdout.write("")
+        self.stdout.write(ROW_FORMAT % ("Person", "Lag (h)", "Syncs",
+                                        "Mean (s)", "Max (s)", "Calls",
+                                        "Inserted", "Updated"))
+        accounts = sorted(report["accounts"],
+                          key=lambda account: -(account["lag_seconds"] or 0))
+        for account in accounts:
+            self.stdout.write(ROW_FORMAT % (
+                account["person_name"][:24],
+                format_number(account["lag_seconds"], 3600),
+                account["syncs"],
+                format_number(account["mean_duration"]),
+                format_number(account["max_duration"]),
+                account["api_calls"],
+                account["rows_inserted"],
+                account["rows_updated"]))
+
+
+# HELPER METHODS
+def format_number(value, divisor=1):
+    # type: (float, float) -> str
+    if value is None:
+        return "-"
+    return "%.1f" % (value / divisor)
@@ -0,0 +1,132 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db.models import Count, Max, Sum, Avg
+from django.utils import timezone
+
+from fitness_connector.models import Account, SyncJob, STATUS_DONE, \
+    STATUS_FAILED
+
+# CONSTANTS
+METRICS_WINDOW = timedelta(hours=24)  # type: timedelta
+
+
+# CLASSES
+class SyncMetrics(object):
+    """
+    Timings and counters of one Account's sync. Thread-safe, since the
+    intraday resources are fetched on several threads at once.
+    """
+
+    def __init__(self):
+        self.api_calls = 0
+        self.api_seconds = 0.0
+        self.db_writes = 0
+        self.db_seconds = 0.0
+        self.rows_inserted = 0
+        self.rows_updated = 0
+        self.duration = None  # type: float
+        self._started_at = time.time()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time_api_call(self):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.api_calls += 1
+                self.api_seconds += time.time() - start
+
+    @contextmanager
+    def time_db_write(self):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.db_writes += 1
+                self.db_seconds += time.time() - start
+
+    def add_rows(self, inserted, updated):
+        # type: (int, int) -> None
+        with self._lock:
+            self.rows_inserted += inserted
+            self.rows_updated += updated
+
+    def finish(self):
+        # type: () -> SyncMetrics
+        self.duration = time.time() - self._started_at
+        return self
+
+
+# HELPER METHODS
+def get_sync_report(since=None, now=None):
+    # type: (datetime, datetime) -> dict
+    """
+    Summarize the SyncJobs finished since *since*, one day ago by default,
+    and the sync lag of every Account, i.e. how long ago its data was
+    last pulled
+    """
+    now = now or timezone.now()
+    since = since or now - METRICS_WINDOW
+    finished_jobs = SyncJob.objects \
+        .filter(updated_datetime__gte=since,
+                status__in=(STATUS_DONE, STATUS_FAILED))
+
+    stats_by_account = dict(
+        (stats["account_id"], stats) for stats in finished_jobs
+        .values("account_id")
+        .annotate(jobs=Count("id"),
+                  syncs=Count("duration"),
+                  mean_duration=Avg("duration"),
+                  max_duration=Max("duration"),
+                  api_calls=Sum("api_calls"),
+                  api_seconds=Sum("api_seconds"),
+                  db_seconds=Sum("db_seconds"),
+                  rows_inserted=Sum("rows_inserted"),
+                  rows_updated=Sum("rows_updated"))
+        .order_by())
+    errors = dict(
+        (row["last_error"], row["count"]) for row in finished_jobs
+        .exclude(last_error="")
+        .values("last_error")
+        .annotate(count=Count("id"))
+        .order_by())
+
+    accounts = list()
+    for account in Account.objects.filter(person__isnull=False) \
+            .select_related("person").order_by("person_id"):
+        stats = stats_by_account.get(account.id, {})
+        lag = (now - account.last_pull_time).total_seconds() \
+            if account.last_pull_time else None
+        accounts.append({
+            "person_id": account.person_id,
+            "person_name": account.person.name,
+            "last_pull_time": account.last_pull_time,
+            "lag_seconds": lag,
+            "jobs": stats.get("jobs", 0),
+            "syncs": stats.get("syncs", 0),
+            "mean_duration": stats.get("mean_duration"),
+            "max_duration": stats.get("max_duration"),
+            "api_calls": stats.get("api_calls") or 0,
+            "api_seconds": stats.get("api_seconds") or 0.0,
+            "db_seconds": stats.get("db_seconds") or 0.0,
+            "rows_inserted": stats.get("rows_inserted") or 0,
+            "rows_updated": stats.get("rows_updated") or 0,
+        })
+
+    return {
+        "since": since,
+        "jobs": finished_jobs.count(),
+        "jobs_done": finished_jobs.filter(status=STATUS_DONE).count(),
+        "jobs_failed": finished_jobs.filter(status=STATUS_FAILED).count(),
+        "api_calls": sum(account["api_calls"] for account in accounts),
+        "rows_inserted": sum(account["rows_inserted"] for account in accounts),
+        "rows_updated": sum(account["rows_updated"] for account in accounts),
+        "errors": errors,
+        "accounts": accounts,
+    }
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 03:39
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_connector', '0002_add_syncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncjob',
+            name='date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 03:39
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_connector', '0003_add_syncjob_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='next_pull_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='poll_interval',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 03:51
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_connector', '0004_add_account_pull_plan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncjob',
+            name='api_calls',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='api_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='db_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='rows_inserted',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='syncjob',
+            name='rows_updated',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 04:16
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fitness_connector', '0005_add_syncjob_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='sync_leased_by',
+            field=models.CharField(blank=True, default='', editable=False, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='sync_leased_until',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,8 +1,28 @@
-from django.db import models
+import calendar
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from people.models import Person
-from datetime import datetime
+from datetime import datetime, timedelta
 
 DEFAULT_START_DATE = datetime(2017, 5, 1, 0, 0)
+SYNC_JOB_MAX_ATTEMPTS = 5  # type: int
+SYNC_JOB_BACKOFF_SECONDS = 60  # type: int
+SYNC_JOB_MAX_BACKOFF_SECONDS = 60 * 60  # type: int
+ERROR_ACCOUNT_WITHOUT_PERSON = "AccountWithoutPerson"
+TOKEN_FIELDS = ["access_token", "refresh_token", "expires_at"]
+SYNC_JOB_PERMANENT_ERRORS = ("InvalidGrantError", ERROR_ACCOUNT_WITHOUT_PERSON)
+
+STATUS_QUEUED = "Q"
+STATUS_RUNNING = "R"
+STATUS_DONE = "D"
+STATUS_FAILED = "F"
+SYNC_JOB_STATUS = (
+    (STATUS_QUEUED, "Queued"),
+    (STATUS_RUNNING, "Running"),
+    (STATUS_DONE, "Done"),
+    (STATUS_FAILED, "Failed"),
+)
 
 class Account(models.Model):
     MEMBERSHIP_STRING = "{0} connected to {1}"
@@ -14,6 +34,13 @@ class Account(models.Model):
     person = models.ForeignKey(Person, blank=True, null=True)
     last_pull_time = models.DateTimeField(blank=True, null=True, default=DEFAULT_START_DATE)
     device_version = models.CharField(max_length=64)
+    next_pull_time = models.DateTimeField(blank=True, null=True)
+    poll_interval = models.PositiveIntegerField(blank=True, null=True)
+    # The run_sync_worker that is syncing the Account, see SyncJob.lease
+    sync_leased_by = models.CharField(max_length=128, blank=True, default="",
+                                      editable=False)
+    sync_leased_until = models.DateTimeField(blank=True, null=True,
+                                             editable=False)
     
     def __str__(self):
         person_name = "none"
@@ -32,4 +59,178 @@ class Account(models.Model):
         """
         Return token's expiration time in Unix time
         """
-        return self.expires_at.strftime("%s")
\ No newline at end of file
+        if timezone.is_aware(self.expires_at):
+            return str(calendar.timegm(self.expires_at.utctimetuple()))
+        return self.expires_at.strftime("%s")
+
+
+class SyncJob(models.Model):
+    """
+    A request to pull an Account's recent data, or only its data on *date*
+    when it is set. Jobs are leased by the run_sync_worker processes, and
+    retried with an exponential backoff.
+    """
+    MEMBERSHIP_STRING = "Sync of {0} ({1})"
+    account = models.ForeignKey(Account, on_delete=models.CASCADE)
+    date = models.DateField(blank=True, null=True)
+    status = models.CharField(max_length=1, choices=SYNC_JOB_STATUS,
+                              default=STATUS_QUEUED)
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    leased_by = models.CharField(max_length=128, blank=True, default="")
+    leased_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.CharField(max_length=200, blank=True, default="")
+    duration = models.FloatField(blank=True, null=True)
+    api_calls = models.PositiveIntegerField(default=0)
+    api_seconds = models.FloatField(default=0)
+    db_seconds = models.FloatField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    created_datetime = models.DateTimeField(auto_now_add=True)
+    updated_datetime = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        index_together = ("status", "run_after")
+
+    def __str__(self):
+        return SyncJob.MEMBERSHIP_STRING.format(self.account,
+                                                self.get_status_display())
+
+    def set_as_done(self, metrics=None):
+        # type: (SyncMetrics) -> None
+        self.status = STATUS_DONE
+        self.leased_until = None
+        self.last_error = ""
+        self.set_metrics(metrics)
+        self.save()
+        self.release_account()
+
+    def set_as_failed(self, error, metrics=None):
+        # type: (str, SyncMetrics) -> None
+        """
+        Requeue this job after a backoff, or give up on it when *error* is
+        permanent or the job has used all its attempts
+        """
+        self.last_error = error[:200]
+        self.set_metrics(metrics)
+        self.leased_until = None
+        if error in SYNC_JOB_PERMANENT_ERRORS \
+                or self.attempts >= SYNC_JOB_MAX_ATTEMPTS:
+            self.status = STATUS_FAILED
+        else:
+            backoff_seconds = min(
+                SYNC_JOB_BACKOFF_SECONDS * 2 ** max(self.attempts - 1, 0),
+                SYNC_JOB_MAX_BACKOFF_SECONDS)
+            self.status = STATUS_QUEUED
+            self.run_after = timezone.now() + timedelta(seconds=backoff_seconds)
+        self.save()
+        self.release_account()
+
+    def release_account(self):
+        # type: () -> None
+        """ Let other workers sync the Account, if this job's worker has it """
+        if self.leased_by:
+            Account.objects \
+                .filter(pk=self.account_id, sync_leased_by=self.leased_by) \
+                .update(sync_leased_by="", sync_leased_until=None)
+
+    def set_metrics(self, metrics):
+        # type: (SyncMetrics) -> None
+        """ Record the SyncMetrics of the latest attempt """
+        if metrics is None:
+            return
+        self.duration = metrics.duration
+        self.api_calls = metrics.api_calls
+        self.api_seconds = metrics.api_seconds
+        self.db_seconds = metrics.db_seconds
+        self.rows_inserted = metrics.rows_inserted
+        self.rows_updated = metrics.rows_updated
+
+    @staticmethod
+    def enqueue(account, date=None):
+        # type: (Account, date) -> SyncJob
+        """
+        :return: the Account's queued SyncJob for *date*, or a new one if
+        there is none. The Account row is locked meanwhile, so a webhook and
+        the poller enqueueing at once do not both create one.
+        """
+        with transaction.atomic():
+            list(Account.objects.select_for_update()
+                 .filter(pk=account.pk)
+                 .values_list("pk", flat=True))
+            queued_job = SyncJob.objects \
+                .filter(account=account, date=date, status=STATUS_QUEUED) \
+                .first()
+            if queued_job:
+                return queued_job
+            return SyncJob.objects.create(account=account, date=date)
+
+    @staticmethod
+    def lease(worker_id, limit, lease_seconds):
+        # type: (str, int, int) -> list(SyncJob)
+        """
+        Lease up to *limit* jobs that are due to *worker_id* for
+        *lease_seconds*. Jobs whose lease has expired are leased again.
+        A job is only leased along with its Account: the Account row is
+        taken with a conditional UPDATE, which the database runs one worker
+        at a time, so an Account is never synced by two workers at once.
+        """
+        now = timezone.now()
+        leased_until = now + timedelta(seconds=lease_seconds)
+        leasable = Q(status=STATUS_QUEUED, run_after__lte=now) | \
+            Q(status=STATUS_RUNNING, leased_until__lte=now)
+        candidates = SyncJob.objects \
+            .filter(leasable) \
+            .order_by("run_after")
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+
+        with transaction.atomic():
+            jobs = list(candidates[:limit])
+            # In order of id, so two workers never wait on each other's rows
+            leased_accounts = set(
+                account_id for account_id in sorted(set(job.account_id
+                                                        for job in jobs))
+                if Account.objects
+                .filter(Q(sync_leased_until__isnull=True) |
+                        Q(sync_leased_until__lte=now) |
+                        Q(sync_leased_by=worker_id),
+                        pk=account_id)
+                .update(sync_leased_by=worker_id,
+                        sync_leased_until=leased_until))
+            # Without SKIP LOCKED, the conditional UPDATE also decides which
+            # worker wins each job
+            job_ids = [job.id for job in jobs
+                       if job.account_id in leased_accounts
+                       and SyncJob.objects.filter(leasable, id=job.id)
+                       .update(status=STATUS_RUNNING,
+                               leased_by=worker_id,
+                               leased_until=leased_until,
+                               attempts=F("attempts") + 1)]
+            Account.objects \
+                .filter(pk__in=leased_accounts - set(
+                    job.account_id for job in jobs if job.id in job_ids),
+                        sync_leased_by=worker_id) \
+                .update(sync_leased_by="", sync_leased_until=None)
+
+        return list(SyncJob.objects
+                    .filter(id__in=job_ids, leased_by=worker_id,
+                            leased_until=leased_until)
+                    .select_related("account"))
+
+    @staticmethod
+    def renew(worker_id, jobs, lease_seconds):
+        # type: (str, list(SyncJob), int) -> None
+        """
+        Extend the leases of *jobs* and of their Accounts by *lease_seconds*
+        from now, as long as *worker_id* still holds them
+        """
+        leased_until = timezone.now() + timedelta(seconds=lease_seconds)
+        SyncJob.objects \
+            .filter(id__in=[job.id for job in jobs], leased_by=worker_id,
+                    status=STATUS_RUNNING) \
+            .update(leased_until=leased_until)
+        Account.objects \
+            .filter(pk__in=set(job.account_id for job in jobs),
+                    sync_leased_by=worker_id) \
+            .update(sync_leased_until=leased_until)
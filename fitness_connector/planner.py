@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from fitness_connector import settings as fitbit_settings
+
+# CONSTANTS
+POLL_INTERVAL_MIN_SECONDS = getattr(
+    fitbit_settings, "POLL_INTERVAL_MIN_SECONDS", 15 * 60)  # type: int
+POLL_INTERVAL_MAX_SECONDS = getattr(
+    fitbit_settings, "POLL_INTERVAL_MAX_SECONDS", 12 * 60 * 60)  # type: int
+MIN_NEW_DATA = timedelta(minutes=1)  # type: timedelta
+PLAN_FIELDS = ["next_pull_time", "poll_interval"]
+
+
+# CLASSES
+class PullPlanner(object):
+    """
+    Decides when an Account is worth polling. An Account whose device has not
+    synced since the last pull is skipped, and its poll interval doubles.
+    The interval halves whenever there is new data, so it settles around
+    how often the device actually syncs.
+    """
+
+    @staticmethod
+    def get_due_accounts(accounts, now=None):
+        # type: (QuerySet, datetime) -> QuerySet
+        """
+        :return: the *accounts* whose next pull time has come
+        """
+        now = now or timezone.now()
+        return accounts.filter(Q(next_pull_time__isnull=True) |
+                               Q(next_pull_time__lte=now))
+
+    @staticmethod
+    def has_new_data(account, device_sync_time):
+        # type: (Account, datetime) -> bool
+        if account.last_pull_time is None:
+            return True
+        return device_sync_time - account.last_pull_time >= MIN_NEW_DATA
+
+    @staticmethod
+    def plan_next_pull(account, device_sync_time, now=None):
+        # type: (Account, datetime, datetime) -> None
+        """
+        Set the Account's poll interval and next pull time after its device
+        was seen to last sync at *device_sync_time*. The Account is not saved.
+        """
+        now = now or timezone.now()
+        interval = account.poll_interval or POLL_INTERVAL_MIN_SECONDS
+
+        if PullPlanner.has_new_data(account, device_sync_time):
+            interval = interval / 2
+        else:
+            interval = interval * 2
+
+        account.poll_interval = int(min(max(interval,
+                                            POLL_INTERVAL_MIN_SECONDS),
+                                        POLL_INTERVAL_MAX_SECONDS))
+        account.next_pull_time = now + timedelta(seconds=account.poll_interval)
@@ -0,0 +1,217 @@
+import threading
+import time
+
+from fitness_connector import settings as fitbit_settings
+
+# CONSTANTS
+CLIENT_REQUESTS_PER_SECOND = getattr(
+    fitbit_settings, "CLIENT_REQUESTS_PER_SECOND", 5.0)  # type: float
+CLIENT_REQUESTS_BURST = getattr(
+    fitbit_settings, "CLIENT_REQUESTS_BURST", 10)  # type: int
+USER_REQUESTS_PER_HOUR = 150  # type: int
+SECONDS_PER_QUOTA_WINDOW = 60 * 60  # type: int
+QUOTA_RESERVE = getattr(fitbit_settings, "QUOTA_RESERVE", 2)  # type: int
+QUOTA_MAX_WAIT_SECONDS = getattr(
+    fitbit_settings, "QUOTA_MAX_WAIT_SECONDS", 30)  # type: float
+HEADER_RATE_LIMIT_LIMIT = "Fitbit-Rate-Limit-Limit"
+HEADER_RATE_LIMIT_REMAINING = "Fitbit-Rate-Limit-Remaining"
+HEADER_RATE_LIMIT_RESET = "Fitbit-Rate-Limit-Reset"
+HEADER_RETRY_AFTER = "Retry-After"
+STATUS_TOO_MANY_REQUESTS = 429
+
+
+# CLASSES
+class TokenBucket(object):
+    """
+    A thread-safe token bucket that paces the Fitbit calls made by this client.
+    The bucket holds at most *capacity* tokens and gains *rate* tokens per
+    second. Every API call spends one token.
+    """
+
+    def __init__(self, rate=CLIENT_REQUESTS_PER_SECOND,
+                 capacity=CLIENT_REQUESTS_BURST):
+        # type: (float, int) -> None
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last_refill = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        # type: (int) -> float
+        """
+        Block until *tokens* tokens are available, then spend them.
+        :return: the number of seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait_seconds = (tokens - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+            waited += wait_seconds
+
+    def _refill(self):
+        now = time.time()
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+
+class QuotaExhausted(Exception):
+    """
+    Raised when an Account would have to wait too long for its Fitbit quota
+    """
+
+    def __init__(self, account_key, wait_seconds):
+        super(QuotaExhausted, self).__init__(
+            "Quota of %s is exhausted for %d seconds" % (account_key,
+                                                         wait_seconds))
+        self.account_key = account_key
+        self.wait_seconds = wait_seconds
+
+
+class AccountQuota(object):
+    """
+    The last known Fitbit quota of one Account
+    """
+
+    def __init__(self, limit=USER_REQUESTS_PER_HOUR):
+        # type: (int) -> None
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = time.time() + SECONDS_PER_QUOTA_WINDOW
+
+    def get_wait_seconds(self, now):
+        # type: (float) -> float
+        if now >= self.reset_at:
+            return 0.0
+        elif self.remaining > QUOTA_RESERVE:
+            return 0.0
+        else:
+            return self.reset_at - now
+
+    def spend(self, now):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + SECONDS_PER_QUOTA_WINDOW
+        self.remaining -= 1
+
+
+class QuotaScheduler(object):
+    """
+    Tracks the Fitbit quota of every Account from the Fitbit-Rate-Limit
+    headers, and paces the whole client with a TokenBucket. Calls that would
+    hit a 429 are delayed, or refused with QuotaExhausted when the wait is
+    longer than *max_wait_seconds*.
+    """
+
+    def __init__(self, bucket=None, max_wait_seconds=QUOTA_MAX_WAIT_SECONDS):
+        # type: (TokenBucket, float) -> None
+        self.bucket = bucket if bucket is not None else TokenBucket()
+        self.max_wait_seconds = max_wait_seconds
+        self._quotas = dict()  # type: dict
+        self._lock = threading.Lock()
+
+    def for_account(self, account_key):
+        # type: (str) -> AccountThrottle
+        return AccountThrottle(self, account_key)
+
+    def get_wait_seconds(self, account_key):
+        # type: (str) -> float
+        """
+        :return: seconds until *account_key* may make its next call
+        """
+        with self._lock:
+            return self._get_quota(account_key).get_wait_seconds(time.time())
+
+    def order(self, accounts):
+        # type: (list) -> list
+        """
+        :return: *accounts* sorted so the ones that can sync right away are
+        first, and the ones waiting for their quota to reset are last
+        """
+        return sorted(accounts,
+                      key=lambda account: self.get_wait_seconds(account.user_id))
+
+    def acquire(self, account_key):
+        # type: (str) -> None
+        """
+        Block until *account_key* and the client both have quota for one call
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                quota = self._get_quota(account_key)
+                wait_seconds = quota.get_wait_seconds(now)
+                if wait_seconds <= 0:
+                    quota.spend(now)
+                    break
+            if wait_seconds > self.max_wait_seconds:
+                raise QuotaExhausted(account_key, wait_seconds)
+            time.sleep(wait_seconds)
+        self.bucket.acquire()
+
+    def observe(self, account_key, response):
+        """
+        Update the quota of *account_key* using the headers of *response*
+        """
+        headers = response.headers
+        now = time.time()
+        with self._lock:
+            quota = self._get_quota(account_key)
+            if HEADER_RATE_LIMIT_LIMIT in headers:
+                quota.limit = int(headers[HEADER_RATE_LIMIT_LIMIT])
+            if HEADER_RATE_LIMIT_REMAINING in headers:
+                quota.remaining = int(headers[HEADER_RATE_LIMIT_REMAINING])
+            if HEADER_RATE_LIMIT_RESET in headers:
+                quota.reset_at = now + int(headers[HEADER_RATE_LIMIT_RESET])
+            if response.status_code == STATUS_TOO_MANY_REQUESTS:
+                quota.remaining = 0
+                if HEADER_RETRY_AFTER in headers:
+                    quota.reset_at = now + int(headers[HEADER_RETRY_AFTER])
+
+    def _get_quota(self, account_key):
+        # type: (str) -> AccountQuota
+        if account_key not in self._quotas:
+            self._quotas[account_key] = AccountQuota()
+        return self._quotas[account_key]
+
+
+class AccountThrottle(object):
+    """
+    The view of a QuotaScheduler for one Account. PersonActivity calls
+    acquire() before every Fitbit call and observe() with every response.
+    """
+
+    def __init__(self, scheduler, account_key):
+        # type: (QuotaScheduler, str) -> None
+        self.scheduler = scheduler
+        self.account_key = account_key
+
+    def acquire(self):
+        self.scheduler.acquire(self.account_key)
+
+    def observe(self, response, *args, **kwargs):
+        self.scheduler.observe(self.account_key, response)
+        return response
+
+
+# HELPER METHODS
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_quota_scheduler():
+    # type: () -> QuotaScheduler
+    """
+    :return: the QuotaScheduler shared by every sync in this process
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = QuotaScheduler()
+        return _scheduler
@@ -0,0 +1,316 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from fitness_connector.quota import USER_REQUESTS_PER_HOUR, \
+    SECONDS_PER_QUOTA_WINDOW, HEADER_RATE_LIMIT_LIMIT, \
+    HEADER_RATE_LIMIT_REMAINING, HEADER_RATE_LIMIT_RESET, \
+    HEADER_RETRY_AFTER, STATUS_TOO_MANY_REQUESTS
+
+# CONSTANTS
+STANDIN_DEVICE_VERSION = "Charge 2"
+STANDIN_TOKEN_SECONDS = 8 * 60 * 60  # type: int
+STANDIN_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000"
+STANDIN_UTC_OFFSET = timedelta(hours=-5)  # type: timedelta
+MINUTES_PER_DAY = 24 * 60  # type: int
+RESOURCES = ("steps", "calories", "distance")
+PATH_DEVICES = re.compile(r"^/1/user/-/devices\.json$")
+PATH_PROFILE = re.compile(r"^/1/user/[^/]+/profile\.json$")
+PATH_INTRADAY = re.compile(
+    r"^/1/user/-/activities/(?P<resource>\w+)/date/(?P<date>[\d-]+)/1d/1min"
+    r"(/time/(?P<start>\d\d:\d\d)/(?P<end>\d\d:\d\d))?\.json$")
+PATH_RANGE = re.compile(
+    r"^/1/user/[^/]+/activities/(?P<resource>\w+)/date/(?P<start>[\d-]+)/"
+    r"(?P<end>[\d-]+)\.json$")
+PATH_SUBSCRIPTION = re.compile(r"^/1/user/-/(\w+/)?apiSubscriptions/")
+PATH_TOKEN = re.compile(r"^/oauth2/token$")
+
+
+# CLASSES
+class FitbitStandIn(object):
+    """
+    A local HTTP server that answers the Fitbit endpoints used by
+    fitness_connector: devices, profile, intraday and range time series,
+    subscriptions and the OAuth token endpoint. Days are replayed from
+    *fixtures_dir* when a recording exists, and synthesized otherwise.
+    Every response waits *latency* seconds, fails with a 500 at
+    *error_rate*, and carries Fitbit's rate-limit headers, answering 429 once
+    a user has made *rate_limit* calls in the hour.
+
+    A recording is one day of an intraday response, as returned by
+    Fitbit.intraday_time_series(), saved as
+    *fixtures_dir*/<resource>/<YYYY-MM-DD>.json.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0,
+                 rate_limit=USER_REQUESTS_PER_HOUR, fixtures_dir=None,
+                 seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.fixtures_dir = fixtures_dir
+        self.seed = seed
+        self.num_requests = 0
+        self.num_errors = 0
+        self.num_rate_limited = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._calls_by_user = dict()  # type: dict
+        self._window_start = time.time()
+        self._days = dict()  # type: dict
+        self._server = _ThreadingHTTPServer((host, port), _Handler)
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        # type: () -> str
+        host, port = self._server.server_address[:2]
+        return "http://%s:%d" % (host, port)
+
+    def start(self):
+        # type: () -> str
+        """
+        Serve on a background thread
+        :return: the base URL of the server
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, method, path, headers):
+        # type: (str, str, dict) -> tuple
+        """
+        :return: a tuple of (status code, dict of headers, JSON-able body)
+        """
+        time.sleep(self.latency)
+        if PATH_TOKEN.match(path):
+            return 200, {}, self.get_token()
+
+        user = headers.get("Authorization", "")
+        with self._lock:
+            self.num_requests += 1
+            remaining, reset = self._spend(user)
+            is_error = self._random.random() < self.error_rate
+            if remaining < 0:
+                self.num_rate_limited += 1
+            elif is_error:
+                self.num_errors += 1
+
+        rate_headers = {
+            HEADER_RATE_LIMIT_LIMIT: str(self.rate_limit),
+            HEADER_RATE_LIMIT_REMAINING: str(max(remaining, 0)),
+            HEADER_RATE_LIMIT_RESET: str(reset),
+        }
+        if remaining < 0:
+            rate_headers[HEADER_RETRY_AFTER] = str(reset)
+            return STATUS_TOO_MANY_REQUESTS, rate_headers, get_errors(
+                "system", "Too Many Requests")
+        if is_error:
+            return 500, rate_headers, get_errors("system", "Stand-in error")
+
+        body = self._route(method, path)
+        if body is None:
+            return 404, rate_headers, get_errors("not_found", path)
+        return 200, rate_headers, body
+
+    def get_token(self):
+        # type: () -> dict
+        return {
+            "access_token": uuid.uuid4().hex,
+            "refresh_token": uuid.uuid4().hex,
+            "expires_in": STANDIN_TOKEN_SECONDS,
+            "token_type": "Bearer",
+            "scope": "activity profile settings",
+            "user_id": "-",
+        }
+
+    def get_day(self, resource, date_string):
+        # type: (str, str) -> list(dict)
+        """
+        :return: the whole-day intraday dataset of *resource* on the date
+        """
+        key = (resource, date_string)
+        with self._lock:
+            if key not in self._days:
+                self._days[key] = self._load_day(resource, date_string) \
+                    or self._synthesize_day(resource, date_string)
+            return self._days[key]
+
+    def _route(self, method, path):
+        # type: (str, str) -> object
+        if PATH_SUBSCRIPTION.match(path):
+            return {} if method == "DELETE" else {"subscriptionId": path}
+        if PATH_DEVICES.match(path):
+            last_sync_time = datetime.utcnow() + STANDIN_UTC_OFFSET
+            return [{
+                "id": "1",
+                "deviceVersion": STANDIN_DEVICE_VERSION,
+                "lastSyncTime": last_sync_time.strftime(
+                    STANDIN_DATETIME_FORMAT),
+                "type": "TRACKER",
+            }]
+        if PATH_PROFILE.match(path):
+            return {"user": {"encodedId": "-", "fullName": "Stand-in"}}
+
+        match = PATH_INTRADAY.match(path)
+        if match and match.group("resource") in RESOURCES:
+            return self._get_intraday(match.group("resource"),
+                                      match.group("date"),
+                                      match.group("start") or "00:00",
+                                      match.group("end") or "23:59")
+
+        match = PATH_RANGE.match(path)
+        if match and match.group("resource") in RESOURCES:
+            return self._get_range(match.group("resource"),
+                                   match.group("start"), match.group("end"))
+        return None
+
+    def _get_intraday(self, resource, date_string, start, end):
+        # type: (str, str, str, str) -> dict
+        dataset = self.get_day(resource, date_string)
+        first, last = get_minute(start), get_minute(end)
+        return {
+            "activities-%s" % resource: [{
+                "dateTime": date_string,
+                "value": str(get_total(dataset)),
+            }],
+            "activities-%s-intraday" % resource: {
+                "dataset": dataset[first:last + 1],
+                "datasetInterval": 1,
+                "datasetType": "minute",
+            },
+        }
+
+    def _get_range(self, resource, start, end):
+        # type: (str, str, str) -> dict
+        date = datetime.strptime(start, "%Y-%m-%d")
+        end_date = datetime.strptime(end, "%Y-%m-%d")
+        days = list()
+        while date <= end_date:
+            date_string = date.strftime("%Y-%m-%d")
+            days.append({
+                "dateTime": date_string,
+                "value": str(get_total(self.get_day(resource, date_string))),
+            })
+            date += timedelta(days=1)
+        return {"activities-%s" % resource: days}
+
+    def _load_day(self, resource, date_string):
+        # type: (str, str) -> list(dict)
+        if not self.fixtures_dir:
+            return None
+        path = os.path.join(self.fixtures_dir, resource,
+                            date_string + ".json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as fixture:
+            recording = json.load(fixture)
+        return recording["activities-%s-intraday" % resource]["dataset"]
+
+    def _synthesize_day(self, resource, date_string):
+        # type: (str, str) -> list(dict)
+        """
+        The three resources of a date are made from the same steps, so they
+        agree with each other like real data does
+        """
+        day_random = random.Random("%s %s" % (self.seed, date_string))
+        dataset = list()
+        for minute in range(MINUTES_PER_DAY):
+            steps = day_random.choice([0, 0, 0, day_random.randint(1, 120)])
+            point = {"time": "%02d:%02d:00" % (minute // 60, minute % 60)}
+            if resource == "steps":
+                point["value"] = steps
+            elif resource == "calories":
+                point["level"] = min(steps // 40, 3)
+                point["value"] = round(1.2 + steps * 0.05, 4)
+            else:
+                point["value"] = round(steps * 0.0005, 4)
+            dataset.append(point)
+        return dataset
+
+    def _spend(self, user):
+        # type: (str) -> tuple
+        """
+        Count one call of *user* in the current hour
+        :return: a tuple of (calls remaining, seconds until the hour resets)
+        """
+        now = time.time()
+        if now - self._window_start >= SECONDS_PER_QUOTA_WINDOW:
+            self._window_start = now
+            self._calls_by_user = dict()
+        num_calls = self._calls_by_user.get(user, 0) + 1
+        self._calls_by_user[user] = num_calls
+        reset = int(self._window_start + SECONDS_PER_QUOTA_WINDOW - now) + 1
+        return self.rate_limit - num_calls, reset
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    standin = None  # type: FitbitStandIn
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def do_DELETE(self):
+        self._respond("DELETE")
+
+    def _respond(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        path = self.path.split("?")[0]
+        status, headers, body = self.server.standin.handle(
+            method, path, self.headers)
+
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# HELPER METHODS
+def get_minute(time_string):
+    # type: (str) -> int
+    hours, minutes = time_string.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def get_total(dataset):
+    # type: (list(dict)) -> object
+    return round(sum(point["value"] for point in dataset), 4)
+
+
+def get_errors(error_type, message):
+    # type: (str, str) -> dict
+    return {"errors": [{"errorType": error_type, "message": message}],
+            "success": False}
@@ -0,0 +1,95 @@
+import base64
+import hashlib
+import hmac
+from datetime import datetime
+
+from fitness_connector.models import Account, SyncJob
+from fitness_connector import settings as fitbit_settings
+
+# CONSTANTS
+SUBSCRIBER_ID = getattr(fitbit_settings, "SUBSCRIBER_ID", None)
+SUBSCRIBER_VERIFICATION_CODE = getattr(
+    fitbit_settings, "SUBSCRIBER_VERIFICATION_CODE", None)
+COLLECTION_ACTIVITIES = "activities"
+HEADER_SIGNATURE = "HTTP_X_FITBIT_SIGNATURE"
+KEY_COLLECTION_TYPE = "collectionType"
+KEY_DATE = "date"
+DATE_FORMAT = "%Y-%m-%d"
+KEY_OWNER_ID = "ownerId"
+KEY_OWNER_TYPE = "ownerType"
+KEY_SUBSCRIPTION_ID = "subscriptionId"
+OWNER_TYPE_USER = "user"
+
+
+# HELPER METHODS
+def get_signature(body, client_secret=None):
+    # type: (bytes, str) -> str
+    """
+    :return: the X-Fitbit-Signature of a notification *body*
+    """
+    client_secret = client_secret or fitbit_settings.CLIENT_SECRET
+    key = (client_secret + "&").encode("utf-8")
+    digest = hmac.new(key, body, hashlib.sha1).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+def is_valid_signature(body, signature):
+    # type: (bytes, str) -> bool
+    if not signature:
+        return False
+    return hmac.compare_digest(get_signature(body), signature)
+
+
+def is_valid_verification_code(code):
+    # type: (str) -> bool
+    if not SUBSCRIBER_VERIFICATION_CODE or not code:
+        return False
+    return hmac.compare_digest(SUBSCRIBER_VERIFICATION_CODE, code)
+
+
+def enqueue_notifications(notifications):
+    # type: (list) -> list(SyncJob)
+    """
+    Queue one SyncJob for every (Account, date) that Fitbit says has changed.
+    Notifications of unknown users or of other collections are ignored, and
+    so are malformed ones.
+    """
+    changed = set()
+    for notification in notifications:
+        changed_day = get_changed_day(notification)
+        if changed_day:
+            changed.add(changed_day)
+
+    accounts = Account.objects \
+        .filter(user_id__in=set(user_id for user_id, _ in changed),
+                person__isnull=False)
+    accounts = dict((account.user_id, account) for account in accounts)
+
+    sync_jobs = list()
+    for user_id, date in sorted(changed):
+        if user_id in accounts:
+            sync_jobs.append(SyncJob.enqueue(accounts[user_id], date))
+    return sync_jobs
+
+
+def get_changed_day(notification):
+    # type: (dict) -> tuple
+    """
+    :return: a tuple of (Fitbit user id, date) of an activities
+    *notification*, or None if it is of another collection or malformed
+    """
+    if not isinstance(notification, dict):
+        return None
+    if notification.get(KEY_COLLECTION_TYPE) != COLLECTION_ACTIVITIES:
+        return None
+    if notification.get(KEY_OWNER_TYPE, OWNER_TYPE_USER) != OWNER_TYPE_USER:
+        return None
+    user_id = notification.get(KEY_OWNER_ID)
+    date = notification.get(KEY_DATE)
+    if not isinstance(user_id, str) or not user_id \
+            or not isinstance(date, str):
+        return None
+    try:
+        return user_id, datetime.strptime(date, DATE_FORMAT).date()
+    except ValueError:
+        return None
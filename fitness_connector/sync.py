@@ -0,0 +1,84 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from fitbit.exceptions import HTTPException, Timeout
+from oauthlib.oauth2 import InvalidGrantError, TokenExpiredError
+
+from fitness_connector.activity import PersonActivity
+from fitness_connector.classes import PersonFitnessSyncResult
+from fitness_connector.metrics import SyncMetrics
+from fitness_connector.quota import QuotaExhausted, get_quota_scheduler
+from fitness_connector import settings as fitbit_settings
+
+logger = logging.getLogger(__name__)
+
+# CONSTANTS
+SYNC_MAX_WORKERS = getattr(fitbit_settings, "SYNC_MAX_WORKERS", 8)  # type: int
+
+
+# CLASSES
+class BulkFitnessDataSync(object):
+    """
+    Pulls the recent fitness data of many Accounts at once on a bounded pool
+    of worker threads. All workers share one QuotaScheduler, so the pace of
+    the whole sync is set by the Fitbit quota instead of by fixed sleeps.
+    """
+
+    def __init__(self, max_workers=SYNC_MAX_WORKERS, scheduler=None):
+        # type: (int, QuotaScheduler) -> None
+        self.max_workers = max_workers
+        if scheduler is None:
+            scheduler = get_quota_scheduler()
+        self.scheduler = scheduler
+
+    def run(self, accounts, dates_by_account=None):
+        # type: (list, dict) -> list(PersonFitnessSyncResult)
+        """
+        :param accounts: the Accounts to sync
+        :param dates_by_account: optional dict of Account pk to the list of
+        dates to pull. Accounts not in it pull their data since the last pull.
+        :return: one PersonFitnessSyncResult per Account with a person, in
+        the same order. Accounts that can sync right away are started first,
+        the ones short on quota last.
+        """
+        accounts = [account for account in accounts if account.person_id]
+        if not accounts:
+            return []
+
+        num_workers = min(self.max_workers, len(accounts))
+        dates_by_account = dates_by_account or dict()
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = dict()  # type: dict
+            for account in self.scheduler.order(accounts):
+                futures[account.pk] = executor.submit(
+                    self._sync_one, account, dates_by_account.get(account.pk))
+            return [futures[account.pk].result() for account in accounts]
+
+    def _sync_one(self, account, dates=None):
+        # type: (Account, list) -> PersonFitnessSyncResult
+        person_id = account.person_id
+        metrics = SyncMetrics()
+        try:
+            throttle = self.scheduler.for_account(account.user_id)
+            person_activity = PersonActivity(person_id, throttle=throttle,
+                                             metrics=metrics)
+            if dates:
+                last_sync_time = person_activity.pull_dates(dates)
+            else:
+                last_sync_time = person_activity.pull_recent_data()
+            return PersonFitnessSyncResult(person_id, last_sync_time,
+                                           metrics=metrics.finish())
+        except (TokenExpiredError, InvalidGrantError, HTTPException,
+                Timeout, QuotaExhausted) as error:
+            return PersonFitnessSyncResult(person_id, None,
+                                           type(error).__name__,
+                                           metrics.finish())
+        except Exception as error:
+            logger.exception("Sync failed for person %s", person_id)
+            return PersonFitnessSyncResult(person_id, None,
+                                           type(error).__name__,
+                                           metrics.finish())
+        finally:
+            # Each worker thread has its own database connection
+            connection.close()
@@ -1,3 +1,90 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from fitness_connector.models import Account, SyncJob
+from fitness_connector.subscriptions import get_signature, \
+    COLLECTION_ACTIVITIES, HEADER_SIGNATURE, KEY_COLLECTION_TYPE, KEY_DATE, \
+    KEY_OWNER_ID, KEY_OWNER_TYPE, KEY_SUBSCRIPTION_ID, OWNER_TYPE_USER
+from people.models import Person
+
+
+# CLASSES
+class LocalSubscriptionPublisher(object):
+    """
+    A stand-in for Fitbit's subscription publisher. It sends signed
+    notifications to our subscriber endpoint through a Django test Client,
+    so the webhook can be exercised without Fitbit.
+    """
+
+    def __init__(self, client=None, path=None):
+        self.client = client or Client()
+        self.path = path or reverse("subscription")
+
+    def verify(self, code):
+        # type: (str) -> HttpResponse
+        return self.client.get(self.path, {"verify": code})
+
+    def publish(self, notifications, signature=None):
+        # type: (list, str) -> HttpResponse
+        body = json.dumps(notifications).encode("utf-8")
+        if signature is None:
+            signature = get_signature(body)
+        return self.client.post(self.path, body,
+                                content_type="application/json",
+                                **{HEADER_SIGNATURE: signature})
+
+    @staticmethod
+    def get_notification(account, date):
+        # type: (Account, date) -> dict
+        return {
+            KEY_COLLECTION_TYPE: COLLECTION_ACTIVITIES,
+            KEY_DATE: date.strftime("%Y-%m-%d"),
+            KEY_OWNER_ID: account.user_id,
+            KEY_OWNER_TYPE: OWNER_TYPE_USER,
+            KEY_SUBSCRIPTION_ID: str(account.pk),
+        }
+
+
+class SubscriptionTests(TestCase):
+
+    def setUp(self):
+        person = Person.objects.create(name="Subscriber",
+                                       internal_name="Subscriber",
+                                       birth_date=date(2000, 1, 1))
+        self.account = Account.objects.create(
+            fullname=person.name, user_id="subscriber",
+            access_token="access", refresh_token="refresh",
+            expires_at=timezone.now() + timedelta(hours=8), person=person)
+        self.publisher = LocalSubscriptionPublisher()
+
+    def test_publish_enqueues_changed_day(self):
+        notification = self.publisher.get_notification(self.account,
+                                                        date(2019, 6, 1))
+        response = self.publisher.publish([notification, notification])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(SyncJob.objects.values_list("account", "date")),
+                         [(self.account.pk, date(2019, 6, 1))])
+
+    def test_publish_skips_malformed_notifications(self):
+        notification = self.publisher.get_notification(self.account,
+                                                        date(2019, 6, 1))
+        response = self.publisher.publish([
+            "activities", None, [notification],
+            dict(notification, date="yesterday"),
+            dict(notification, date=20190602),
+            dict(notification, ownerId=["subscriber"]),
+            notification])
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(SyncJob.objects.values_list("account", "date")),
+                         [(self.account.pk, date(2019, 6, 1))])
+
+    def test_publish_rejects_bad_signature(self):
+        notification = self.publisher.get_notification(self.account,
+                                                        date(2019, 6, 1))
+        response = self.publisher.publish([notification], signature="bad")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(SyncJob.objects.exists())
@@ -0,0 +1,193 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+from fitness_connector.clients import get_client_factory
+from fitness_connector.models import Account, TOKEN_FIELDS
+from fitness_connector import settings as fitbit_settings
+
+# CONSTANTS
+TOKEN_REFRESH_LEAD_SECONDS = getattr(
+    fitbit_settings, "TOKEN_REFRESH_LEAD_SECONDS", 10 * 60)  # type: int
+TOKEN_REFRESH_MAX_WORKERS = getattr(
+    fitbit_settings, "TOKEN_REFRESH_MAX_WORKERS", 4)  # type: int
+TOKEN_POLL_SECONDS = 60  # type: int
+
+logger = logging.getLogger(__name__)
+
+
+# CLASSES
+class TokenManager(object):
+    """
+    Refreshes the Accounts' OAuth tokens shortly before they expire, on a
+    small pool of worker threads. Accounts are kept in a priority queue
+    ordered by expiry. Concurrent requests to refresh the same Account share
+    one in-flight refresh, and the Account row is locked while refreshing so
+    other processes do not spend the same refresh token twice.
+    """
+
+    def __init__(self, max_workers=TOKEN_REFRESH_MAX_WORKERS,
+                 lead_seconds=TOKEN_REFRESH_LEAD_SECONDS):
+        self.lead_seconds = lead_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.RLock()
+        self._in_flight = dict()  # type: dict
+
+    def refresh(self, account_id):
+        # type: (int) -> Future
+        """
+        :return: a Future of the Account's new token. If the Account is
+        already being refreshed, the Future of that refresh is returned.
+        """
+        with self._lock:
+            future = self._in_flight.get(account_id)
+            if future is None:
+                future = self._executor.submit(self._refresh, account_id)
+                self._in_flight[account_id] = future
+                future.add_done_callback(
+                    lambda done: self._forget(account_id, done))
+            return future
+
+    def refresh_expiring(self, now=None):
+        # type: (float) -> dict
+        """
+        Refresh every token that expires within the lead time and wait for
+        all of them
+        :return: a dict of Account id to None, or to the error's type name
+        """
+        now = now or time.time()
+        queue = self.get_expiry_queue()
+        futures = dict((account_id, self.refresh(account_id))
+                       for account_id in self._pop_due(queue, now))
+
+        results = dict()  # type: dict
+        for account_id, future in futures.items():
+            error = future.exception()
+            results[account_id] = type(error).__name__ if error else None
+        return results
+
+    def run(self, poll_seconds=TOKEN_POLL_SECONDS, once=False):
+        # type: (int, bool) -> None
+        """
+        Keep refreshing tokens as they come due. The queue is reloaded at
+        least every *poll_seconds* to pick up new and refreshed Accounts.
+        """
+        while True:
+            results = self.refresh_expiring()
+            for account_id, error in results.items():
+                if error:
+                    logger.warning("Could not refresh Account %s: %s",
+                                   account_id, error)
+            if once:
+                return
+
+            queue = self.get_expiry_queue()
+            sleep_seconds = poll_seconds
+            if queue:
+                due_time = queue[0][0] - self.lead_seconds
+                sleep_seconds = min(poll_seconds, due_time - time.time())
+            time.sleep(max(sleep_seconds, 0))
+
+    def is_expiring(self, account, now=None):
+        # type: (Account, float) -> bool
+        now = now or time.time()
+        return get_expires_at_in_unix(account) - now < self.lead_seconds
+
+    @staticmethod
+    def get_expiry_queue():
+        # type: () -> list(tuple)
+        """
+        :return: a heap of (expiry in Unix time, Account id)
+        """
+        accounts = Account.objects \
+            .filter(expires_at__isnull=False) \
+            .exclude(refresh_token="") \
+            .only("id", "expires_at")
+        queue = [(get_expires_at_in_unix(account), account.id)
+                 for account in accounts]
+        heapq.heapify(queue)
+        return queue
+
+    def _pop_due(self, queue, now):
+        # type: (list(tuple), float) -> list(int)
+        due = list()
+        while queue and queue[0][0] - now < self.lead_seconds:
+            due.append(heapq.heappop(queue)[1])
+        return due
+
+    def _forget(self, account_id, future):
+        with self._lock:
+            if self._in_flight.get(account_id) is future:
+                del self._in_flight[account_id]
+
+    def _refresh(self, account_id):
+        # type: (int) -> dict
+        try:
+            with transaction.atomic():
+                account = Account.objects.select_for_update() \
+                    .get(pk=account_id)
+                if not self.is_expiring(account):
+                    # Refreshed by another process while we waited
+                    return get_token(account)
+
+                fitbit = get_client_factory().get_fitbit(
+                    account, lambda token: save_token(account, token))
+                token = fitbit.client.refresh_token()
+                return {
+                    "access_token": token["access_token"],
+                    "refresh_token": token["refresh_token"],
+                    "expires_at": token["expires_at"],
+                }
+        finally:
+            # Runs on executor threads, which open their own connections
+            connection.close()
+
+
+# HELPER METHODS
+def get_expires_at_in_unix(account):
+    # type: (Account) -> float
+    return float(account.get_expires_at())
+
+
+def get_token(account):
+    # type: (Account) -> dict
+    """
+    :return: the Account's token, shaped like an OAuth2Session token
+    """
+    return {
+        "access_token": account.access_token,
+        "refresh_token": account.refresh_token,
+        "expires_at": get_expires_at_in_unix(account),
+    }
+
+
+def save_token(account, token):
+    # type: (Account, dict) -> None
+    """
+    Write a refreshed *token* to the Account. Only the token fields are
+    written, so a concurrent pull's last_pull_time is not overwritten.
+    """
+    account.access_token = token["access_token"]
+    account.refresh_token = token["refresh_token"]
+    account.set_expires_at_in_unix(token["expires_at"])
+    account.save(update_fields=TOKEN_FIELDS)
+
+
+_token_manager = None
+_token_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    # type: () -> TokenManager
+    """
+    :return: the TokenManager shared by every sync in this process
+    """
+    global _token_manager
+    with _token_manager_lock:
+        if _token_manager is None:
+            _token_manager = TokenManager()
+        return _token_manager
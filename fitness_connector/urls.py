@@ -8,4 +8,6 @@ urlpatterns = [
     url(r'^oauth/authorize/$', views.authorize, name='authorize'),
     # ex: /fitbit/update/person
     url(r'^update/person/(?P<person_id>[0-9]+)/$', views.update, name='update'),
+    # ex: /fitbit/subscription/ (Fitbit's subscriber endpoint)
+    url(r'^subscription/$', views.subscription, name='subscription'),
 ]
\ No newline at end of file
@@ -1,9 +1,11 @@
-from django.http import HttpResponse
-from rest_framework.response import Response
+import json
+from django.http import HttpResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
 from fitness_connector import authenticate as fitbit_authenticate
-from fitness_connector.activity import PersonActivity
-from fitness_connector.classes import PersonFitnessSyncResult
-from fitness_connector.serializers import PersonFitnessSyncResultSerializer
+from fitness_connector import subscriptions
+from fitness_connector.models import Account, SyncJob
 
 
 # Views
@@ -18,9 +20,31 @@ def authorize(request):
     return HttpResponse(fitbit_authenticate.authenticate(code))
     
 def update (request, person_id):
-    person_activity = PersonActivity(person_id)
-    #last_sync_time = person_activity.pull_recent_data()
-    #person_fitness_sync = PersonFitnessSyncResult(person_id, last_sync_time)
-    #serializer = PersonFitnessSyncResultSerializer(person_fitness_sync)
-    #return Response(serializer.data)
-    return HttpResponse(person_activity.pull_recent_data())
\ No newline at end of file
+    account = get_object_or_404(Account, person_id=person_id)
+    sync_job = SyncJob.enqueue(account)
+    return HttpResponse(sync_job.get_status_display(), status=202)
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def subscription (request):
+    """
+    Fitbit's subscriber endpoint. A GET verifies the subscriber with its
+    verification code. A POST carries signed notifications of changed data,
+    which are queued as SyncJobs before answering Fitbit.
+    """
+    if request.method == "GET":
+        if subscriptions.is_valid_verification_code(request.GET.get('verify')):
+            return HttpResponse(status=204)
+        raise Http404
+
+    signature = request.META.get(subscriptions.HEADER_SIGNATURE)
+    if not subscriptions.is_valid_signature(request.body, signature):
+        raise Http404
+    try:
+        notifications = json.loads(request.body.decode('utf-8'))
+    except ValueError:
+        return HttpResponse(status=400)
+    if not isinstance(notifications, list):
+        return HttpResponse(status=400)
+    subscriptions.enqueue_notifications(notifications)
+    return HttpResponse(status=204)
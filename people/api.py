@@ -9,6 +9,8 @@ from rest_framework.response import Response
 from people.models import Person, Group, Circle, Membership, PersonMeta
 from people.serializers import PersonSerializer, GroupSerializer, \
     GroupListSerializer, CircleSerializer
+from people.versions import GroupVersions, RESOURCE_INFO, \
+    get_not_modified_response, set_validators
 from fitness_connector.activity import PersonActivity
 
 # CONSTANTS
@@ -78,8 +80,14 @@ class UserGroupInfo(APIView):
     def get(self, request, format=None):
         person = get_person_by_user_id(request.user.id)
         group = get_group(person)
+        etag, last_modified = GroupVersions.get_validators(
+            [(group.id, RESOURCE_INFO)])
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+
         serializer = GroupSerializer(group)
-        return Response(serializer.data)
+        return set_validators(Response(serializer.data), etag, last_modified)
 
 
 class UserCircleInfo(APIView):
@@ -0,0 +1,64 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from fitness_connector.models import Account, TOKEN_FIELDS
+from fitness_connector.planner import PLAN_FIELDS
+from people.models import Person, PersonMeta, Group, Membership
+from people.versions import GroupVersions, RESOURCE_ACTIVITIES, \
+    RESOURCE_INFO, RESOURCE_STORIES, ALL_GROUPS
+from story_manager.models import Story, GroupStory
+
+
+# HELPER METHODS
+def get_group_ids(person_id):
+    # type: (int) -> list(int)
+    return list(Membership.objects
+                .filter(person_id=person_id)
+                .values_list("group_id", flat=True))
+
+
+# RECEIVERS
+@receiver([post_save, post_delete], sender=Group)
+def on_group_changed(sender, instance, **kwargs):
+    GroupVersions.bump([instance.id], [RESOURCE_INFO, RESOURCE_ACTIVITIES])
+
+
+@receiver([post_save, post_delete], sender=Membership)
+def on_membership_changed(sender, instance, **kwargs):
+    GroupVersions.bump([instance.group_id],
+                       [RESOURCE_INFO, RESOURCE_ACTIVITIES])
+
+
+@receiver(post_save, sender=Person)
+def on_person_changed(sender, instance, **kwargs):
+    GroupVersions.bump(get_group_ids(instance.id),
+                       [RESOURCE_INFO, RESOURCE_ACTIVITIES])
+
+
+@receiver([post_save, post_delete], sender=PersonMeta)
+def on_person_meta_changed(sender, instance, **kwargs):
+    GroupVersions.bump(get_group_ids(instance.person_id), [RESOURCE_INFO])
+
+
+@receiver([post_save, post_delete], sender=Account)
+def on_account_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    A pull changes last_pull_time, which both endpoints show. Refreshing
+    the tokens or planning the next poll changes neither.
+    """
+    if update_fields and \
+            set(update_fields) <= set(TOKEN_FIELDS + PLAN_FIELDS):
+        return
+    if instance.person_id:
+        GroupVersions.bump(get_group_ids(instance.person_id),
+                           [RESOURCE_INFO, RESOURCE_ACTIVITIES])
+
+
+@receiver([post_save, post_delete], sender=GroupStory)
+def on_group_story_changed(sender, instance, **kwargs):
+    GroupVersions.bump([instance.group_id], [RESOURCE_STORIES])
+
+
+@receiver([post_save, post_delete], sender=Story)
+def on_story_changed(sender, instance, **kwargs):
+    GroupVersions.bump([ALL_GROUPS], [RESOURCE_STORIES])
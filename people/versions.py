@@ -0,0 +1,139 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+# CONSTANTS
+VERSION_KEY = "people:group_version:{0}:{1}"
+MODIFIED_KEY = "people:group_modified:{0}:{1}"
+RESOURCE_ACTIVITIES = "activities"
+RESOURCE_INFO = "info"
+RESOURCE_STORIES = "stories"
+ALL_GROUPS = "all"
+PROCESS_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+# CLASSES
+class GroupVersions(object):
+    """
+    Version stamps of what a Group's endpoints return, kept in Django's
+    cache. Every *resource* of a Group has a counter that is incremented
+    when something it is made of changes, see people.signals, and the time
+    of that change. ALL_GROUPS stands for the changes seen by every Group.
+    A stamp that is missing from the cache starts again from the current
+    time in milliseconds, so it does not repeat an ETag given out before.
+    The stamps are bumped by the sync workers too, which run in processes
+    of their own, so they are only used when the cache is shared, see
+    is_shared_cache().
+    """
+
+    @staticmethod
+    def bump(group_ids, resources):
+        # type: (iter, list(str)) -> None
+        """
+        Increment the stamps of *resources* of *group_ids* once the current
+        transaction commits, so a concurrent read can not tag the data from
+        before the change with the new stamp
+        """
+        keys = [(group_id, resource) for group_id in set(group_ids)
+                for resource in resources]
+        if keys:
+            transaction.on_commit(lambda: GroupVersions._increment(keys))
+
+    @staticmethod
+    def get_version(group_id, resource):
+        # type: (object, str) -> int
+        version = cache.get(VERSION_KEY.format(group_id, resource))
+        if version is None:
+            version = GroupVersions._start(group_id, resource)
+        return version
+
+    @staticmethod
+    def get_validators(stamps, *parts):
+        # type: (list(tuple), object) -> tuple
+        """
+        :param stamps: a list of (group id, resource) whose stamps make up
+        the response
+        :param parts: anything else the response depends on, e.g. its dates
+        :return: a tuple of (ETag, Last-Modified as a Unix time), or of
+        (None, None) when the cache is not shared
+        """
+        if not is_shared_cache():
+            return None, None
+        version_keys = [VERSION_KEY.format(*stamp) for stamp in stamps]
+        modified_keys = [MODIFIED_KEY.format(*stamp) for stamp in stamps]
+        values = cache.get_many(version_keys + modified_keys)
+        for stamp, key in zip(stamps, version_keys):
+            if key not in values:
+                values[key] = GroupVersions._start(*stamp)
+
+        versions = [str(values[key]) for key in version_keys]
+        digest = hashlib.md5(":".join(
+            versions + [str(part) for part in parts]).encode("utf-8"))
+        last_modified = max(values.get(key) or 0 for key in modified_keys)
+        return quote_etag(digest.hexdigest()), int(last_modified) or None
+
+    @staticmethod
+    def _increment(keys):
+        # type: (list(tuple)) -> None
+        now = time.time()
+        for group_id, resource in keys:
+            try:
+                cache.incr(VERSION_KEY.format(group_id, resource))
+            except ValueError:
+                GroupVersions._start(group_id, resource)
+            cache.set(MODIFIED_KEY.format(group_id, resource), now, None)
+
+    @staticmethod
+    def _start(group_id, resource):
+        # type: (object, str) -> int
+        key = VERSION_KEY.format(group_id, resource)
+        cache.add(key, int(time.time() * 1000), None)
+        return cache.get(key)
+
+
+# HELPER METHODS
+def is_shared_cache():
+    # type: () -> bool
+    """
+    :return: whether every process sees the same default cache, i.e. its
+    backend is not one of PROCESS_CACHE_BACKENDS
+    """
+    return settings.CACHES[DEFAULT_CACHE_ALIAS]["BACKEND"] \
+        not in PROCESS_CACHE_BACKENDS
+
+
+def get_not_modified_response(request, etag, last_modified):
+    # type: (Request, str, int) -> HttpResponse
+    """
+    :return: a 304 response if the client's If-None-Match or
+    If-Modified-Since says it has the current version, or None
+    """
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    # type: (HttpResponse, str, int) -> HttpResponse
+    """
+    Last-Modified has a resolution of one second, so it is only sent once
+    its second is over. Until then a change could come with the same value.
+    """
+    if etag is None:
+        return response
+    response["ETag"] = etag
+    if last_modified and time.time() >= last_modified + 1:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
@@ -3,9 +3,11 @@ from rest_framework import permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from people.models import Person, Group
+from people.versions import GroupVersions, RESOURCE_STORIES, ALL_GROUPS, \
+    get_not_modified_response, set_validators
 from story_manager.models import GroupStory, GroupStoryList
 from story_manager.serializers import GroupStorySerializer, \
-    GroupStoryListSerializer
+    FAST_GROUP_STORY_LIST_SERIALIZER
 
 
 class UserStoryList(APIView):
@@ -18,15 +20,23 @@ class UserStoryList(APIView):
 
     def get(self, request, format=None):
         group = StoryHelper.get_group(request.user.id)
+        etag, last_modified = GroupVersions.get_validators(
+            [(group.id, RESOURCE_STORIES), (ALL_GROUPS, RESOURCE_STORIES)])
+        not_modified = get_not_modified_response(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+
         group_stories = GroupStory.objects\
+            .select_related("story")\
             .filter(group=group)\
             .order_by("story__order")
         current_story_id = UserStoryList.get_current_story_id(group_stories)
 
         group_story_list = GroupStoryList(group_stories, current_story_id)
-        serializer = GroupStoryListSerializer(group_story_list)
+        data = FAST_GROUP_STORY_LIST_SERIALIZER.to_representation(
+            group_story_list)
 
-        return Response(serializer.data)
+        return set_validators(Response(data), etag, last_modified)
 
     @staticmethod
     def get_current_story_id(group_stories):
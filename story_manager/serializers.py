@@ -1,4 +1,6 @@
 from rest_framework import serializers
+
+from api.fast_serializers import FastSerializer
 from story_manager.models import Story, GroupStory
 
 
@@ -31,3 +33,7 @@ class GroupStorySerializer(serializers.ModelSerializer):
 class GroupStoryListSerializer(serializers.Serializer):
     current_story_id = serializers.ReadOnlyField()
     stories = GroupStorySerializer(many=True, read_only=True)
+
+
+# FAST SERIALIZERS
+FAST_GROUP_STORY_LIST_SERIALIZER = FastSerializer(GroupStoryListSerializer)